@@ -0,0 +1,51 @@
+"""
+JWT authentication that rebuilds request.user from a short-lived cache.
+
+The fields permission checks read on nearly every request are cached per
+user for AUTH_USER_CACHE_TIMEOUT seconds, and request.user is built from
+them without touching the database. Any other field is loaded on first
+access, like a deferred field. Saving or deleting the user drops the entry
+(accounts.signals); the timeout bounds how long another process can keep a
+stale copy when the cache is not shared.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from config import metrics
+
+CACHED_FIELDS = ('id', 'username', 'user_type', 'is_staff', 'is_superuser', 'is_active')
+
+
+def user_cache_key(user_id):
+    return f'accounts:auth-user:{user_id}'
+
+
+def forget_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        # Revocation compares the password hash, which is not cached
+        if user_id is None or api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != 'id':
+            return super().get_user(validated_token)
+
+        values = cache.get(user_cache_key(user_id))
+        if values is not None:
+            metrics.increment('auth_user_cache_hits')
+            # from_db() takes the loaded columns in model field order
+            fields = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in values]
+            return self.user_model.from_db(DEFAULT_DB_ALIAS, fields, [values[field] for field in fields])
+
+        # Raises for unknown and inactive users, which are never cached
+        user = super().get_user(validated_token)
+        metrics.increment('auth_user_cache_misses')
+        cache.set(
+            user_cache_key(user_id), {field: getattr(user, field) for field in CACHED_FIELDS},
+            settings.AUTH_USER_CACHE_TIMEOUT,
+        )
+        return user
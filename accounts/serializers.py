@@ -28,8 +28,5 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        password = validated_data.pop('password')
-        user = User.objects.create(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
\ No newline at end of file
+        # Hashed before the row is written: one INSERT
+        return User.objects.create_user(**validated_data)
\ No newline at end of file
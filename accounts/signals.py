@@ -0,0 +1,12 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import forget_user
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    '''Requests authenticated after this point see the saved user'''
+    forget_user(instance.pk)
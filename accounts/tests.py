@@ -1,3 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 from django.test import TestCase
+from config import metrics
+from .authentication import CachedJWTAuthentication
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(
+            username='seller_test', password='test123', user_type='seller', email='seller@example.com'
+        )
+        self.token = str(AccessToken.for_user(self.user))
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        user, _ = CachedJWTAuthentication().authenticate(Request(request))
+        return user
+
+    def test_repeat_requests_skip_the_user_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.is_seller)
+        self.assertFalse(user.is_staff)
+        self.assertEqual(metrics.get('auth_user_cache_hits'), 1)
+
+        # Columns outside the cached summary still load on demand
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'seller@example.com')
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        self.authenticate()
+        self.user.user_type = 'customer'
+        self.user.save()
+        self.assertFalse(self.authenticate().is_seller)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_profile_returns_every_field(self):
+        self.authenticate()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['email'], response.data['user_type']), ('seller@example.com', 'seller'))
+
+
+class RegistrationAndLoginTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, username, password, address='10.0.0.1'):
+        return self.client.post(
+            '/api/token/', {'username': username, 'password': password}, format='json', REMOTE_ADDR=address
+        )
+
+    def test_registration_writes_the_user_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/auth/register/', {
+                'username': 'new_user', 'email': 'new@example.com',
+                'password': 'long-enough-1', 'password_confirm': 'long-enough-1',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        writes = [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 1)
+        user = User.objects.get(username='new_user')
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password('long-enough-1'))
+
+    def test_login_rehashes_older_hashes(self):
+        user = User.objects.create(username='old_user', password=make_password('test1234', hasher='pbkdf2_sha256'))
+        self.assertEqual(self.login('old_user', 'test1234').status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertEqual(self.login('old_user', 'test1234').status_code, 200)
+
+    def test_login_attempts_are_throttled_per_username(self):
+        User.objects.create_user(username='target', password='test1234')
+        # Spread over addresses, as a credential stuffing run would be
+        for attempt in range(5):
+            self.assertEqual(self.login('Target', f'guess-{attempt}', f'10.0.1.{attempt}').status_code, 401)
+        self.assertEqual(self.login('target', 'test1234', '10.0.2.1').status_code, 429)
+        self.assertEqual(self.login('someone_else', 'guess', '10.0.2.1').status_code, 401)
+
+    def test_login_attempts_are_throttled_per_address(self):
+        for attempt in range(20):
+            self.assertNotEqual(self.login(f'user{attempt}', 'guess').status_code, 429)
+        self.assertEqual(self.login('user_x', 'guess').status_code, 429)
@@ -0,0 +1,25 @@
+import hashlib
+
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle
+
+
+class LoginIPThrottle(AnonRateThrottle):
+    """Login attempts per client address"""
+    scope = 'login_ip'
+
+
+class LoginUsernameThrottle(SimpleRateThrottle):
+    """Login attempts per account, whichever addresses they come from"""
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username:
+            return None
+        ident = hashlib.sha256(str(username).lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class RegistrationThrottle(AnonRateThrottle):
+    """Sign-ups per client address"""
+    scope = 'register'
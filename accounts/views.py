@@ -2,7 +2,9 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import UserSerializer, UserRegistrationSerializer
+from .throttles import LoginIPThrottle, LoginUsernameThrottle, RegistrationThrottle
 
 User = get_user_model()
 
@@ -11,6 +13,12 @@ class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegistrationThrottle]
+
+
+class LoginView(TokenObtainPairView):
+    """Token pair for a username and password; throttled before any password is hashed"""
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
@@ -18,4 +26,5 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user may be the cached summary; the profile needs every column
+        return User.objects.get(pk=self.request.user.pk)
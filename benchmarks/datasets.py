@@ -0,0 +1,124 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from benchmarks.utils import get_bench_user
+from config.seeding import backdated
+
+from dashboard import rollups
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from products.search import refresh_search_vectors
+
+
+ADJECTIVES = [
+    'fresh', 'organic', 'ripe', 'local', 'sweet', 'green', 'red', 'golden',
+    'wild', 'heirloom', 'smoked', 'raw', 'aged', 'crisp', 'juicy',
+]
+PRODUCE = [
+    'tomatoes', 'carrots', 'apples', 'bananas', 'lettuce', 'strawberries', 'milk',
+    'eggs', 'cheese', 'rice', 'wheat', 'basil', 'oregano', 'potatoes', 'onions',
+    'garlic', 'peppers', 'cucumbers', 'pears', 'plums', 'honey', 'butter',
+    'yogurt', 'oats', 'barley', 'spinach', 'kale', 'beets', 'cabbage', 'mint',
+]
+
+
+def product_text(i):
+    """Deterministic, varied product name and description for row number i"""
+    adjective = ADJECTIVES[i % len(ADJECTIVES)]
+    produce = PRODUCE[(i // len(ADJECTIVES)) % len(PRODUCE)]
+    name = f'{adjective.title()} {produce} #{i}'
+    description = f'{adjective} {produce} grown on farm {i % 997}, packed to order'
+    return name, description
+
+
+def ensure_products(seller, count, batch_size=5000):
+    """Make sure `seller` owns at least `count` products and return their (id, price) pairs"""
+    existing = Product.objects.filter(seller=seller).count()
+    if existing < count:
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        for start in range(existing, count, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    seller=seller,
+                    category=category,
+                    name=product_text(i)[0],
+                    description=product_text(i)[1],
+                    price=Decimal('1.00') + i % 100,
+                    quantity=1000,
+                )
+                for i in range(start, min(start + batch_size, count))
+            ])
+    return list(Product.objects.filter(seller=seller).values_list('id', 'price')[:count])
+
+
+def generate_order_items(customers, products, count, days=365, items_per_order=4,
+                         batch_size=10000, seed=0):
+    """
+    Bulk insert roughly `count` order items spread over the last `days` days.
+    Signals are bypassed, so rollups must be rebuilt afterwards.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+    orders_per_batch = max(1, batch_size // items_per_order)
+    created = 0
+
+    while created < count:
+        orders, lines = [], []
+        for _ in range(min(orders_per_batch, -(-(count - created) // items_per_order))):
+            picked = [
+                (product_id, price, rng.randint(1, 5))
+                for product_id, price in rng.sample(products, min(items_per_order, len(products)))
+            ]
+            orders.append(Order(
+                user=rng.choice(customers),
+                status=rng.choice(statuses),
+                total_amount=sum(price * quantity for _, price, quantity in picked),
+                created_at=now - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400)),
+            ))
+            lines.append(picked)
+
+        with backdated(Order):
+            Order.objects.bulk_create(orders)
+        items = [
+            OrderItem(order=order, product_id=product_id, quantity=quantity, price=price)
+            for order, picked in zip(orders, lines)
+            for product_id, price, quantity in picked
+        ]
+        OrderItem.objects.bulk_create(items)
+        created += len(items)
+
+    return created
+
+
+def build_dataset(sellers, customers, products, orders, items_per_order=4, days=365, seed=0):
+    """
+    Create (or top up) a marketplace of the given size and return its users and
+    products. Re-running with the same arguments reuses what already exists.
+    """
+    seller_users = [get_bench_user(f'bench_seller_{i}', 'seller') for i in range(sellers)]
+    customer_users = [get_bench_user(f'bench_customer_{i}', 'customer') for i in range(customers)]
+
+    per_seller = -(-products // sellers)
+    catalog = []
+    for seller in seller_users:
+        catalog.extend(ensure_products(seller, per_seller))
+
+    wanted_items = orders * items_per_order
+    existing = OrderItem.objects.filter(product__seller__in=seller_users).count()
+    if existing < wanted_items:
+        generate_order_items(
+            customer_users, catalog, wanted_items - existing,
+            days=days, items_per_order=items_per_order, seed=seed + existing,
+        )
+        rollups.rebuild()
+    refresh_search_vectors(Product.objects.filter(search_vector__isnull=True))
+
+    return {
+        'sellers': seller_users,
+        'customers': customer_users,
+        'products': [product_id for product_id, _ in catalog],
+    }
\ No newline at end of file
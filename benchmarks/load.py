@@ -0,0 +1,111 @@
+"""
+Minimal asyncio HTTP/1.1 load client for the server benchmarks (bench_asgi,
+bench_workers): N keep-alive connections issuing the same request back to back.
+"""
+import asyncio
+import socket
+import time
+
+from django.core.management.base import CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .datasets import ensure_products
+from .utils import get_bench_user, summarize
+
+# name -> (path under the API prefix, which benchmark user calls it)
+ENDPOINTS = {
+    'products': ('products/products/', 'customer'),
+    'product': ('products/products/{product_id}/', 'customer'),
+    'categories': ('products/categories/', 'customer'),
+    'dashboard': ('dashboard/seller/', 'seller'),
+    'revenue': ('dashboard/seller/revenue/', 'seller'),
+}
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server on port {port} did not start within {timeout}s')
+
+
+async def read_response(reader):
+    """Status code and whether the server keeps the connection open"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by server')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        headers['connection'] = 'close'
+    return int(status_line.split()[1]), headers.get('connection', '').lower() != 'close'
+
+
+async def client(port, request, deadline, timings, errors):
+    """One keep-alive connection issuing requests back to back until the deadline"""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append(None)
+            keep_alive = False
+        else:
+            timings.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors.append(status)
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, request, connections, duration):
+    """Latencies, errors and wall time, which includes draining requests still in flight at the deadline"""
+    timings, errors = [], []
+    started = time.monotonic()
+    await asyncio.gather(*(client(port, request, started + duration, timings, errors) for _ in range(connections)))
+    return timings, errors, time.monotonic() - started
+
+
+def prepare(products):
+    """(product id, {'seller'|'customer': bearer token}) for the benchmark users"""
+    # A seller of its own: the other benchmarks grow bench_seller's catalog to 500k products
+    seller = get_bench_user('bench_asgi_seller', 'seller')
+    users = {'seller': seller, 'customer': get_bench_user('bench_customer', 'customer')}
+    product_id = ensure_products(seller, products)[0][0]
+    return product_id, {kind: str(AccessToken.for_user(user)) for kind, user in users.items()}
+
+
+def build_request(prefix, endpoint, product_id, tokens):
+    path, user = ENDPOINTS[endpoint]
+    return (
+        f"GET {prefix}{path.format(product_id=product_id)} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\n"
+        f"Authorization: Bearer {tokens[user]}\r\n\r\n"
+    ).encode()
+
+
+def run_endpoint(port, request, connections, duration, warmup):
+    """Warm up, then load one endpoint; returns req/s, latency percentiles and error count"""
+    asyncio.run(load(port, request, min(connections, 20), warmup))
+    timings, errors, elapsed = asyncio.run(load(port, request, connections, duration))
+    summary = summarize(timings)
+    return {'rps': len(timings) / elapsed, 'p50': summary['p50'], 'p99': summary['p99'], 'errors': len(errors)}
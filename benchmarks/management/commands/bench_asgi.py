@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.load import ENDPOINTS, build_request, prepare, run_endpoint, wait_for_port
+
+
+def server_command(kind, port, workers):
+    """(argv, API prefix) serving the sync DRF views over WSGI or the async views over ASGI"""
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ], '/api/'
+    return [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port),
+        '--no-access-log', '--log-level', 'warning',
+    ], '/api/async/'
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the read endpoints with many concurrent connections, '
+        'sync DRF views under gunicorn (WSGI) vs. async views under uvicorn (ASGI)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per endpoint and server')
+        parser.add_argument('--warmup', type=float, default=2.0)
+        parser.add_argument('--workers', type=int, default=4, help='Server processes for both servers')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('endpoints', nargs='*', default=list(ENDPOINTS), help=', '.join(ENDPOINTS))
+
+    def handle(self, *args, **options):
+        unknown = set(options['endpoints']) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        product_id, tokens = prepare(options['products'])
+
+        self.stdout.write(
+            f"{options['connections']} connections, {options['workers']} workers, "
+            f"{options['duration']:.0f}s per run\n"
+        )
+        self.stdout.write(f"{'endpoint':<12} {'server':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        results = {name: {} for name in options['endpoints']}
+        for kind in options['servers']:
+            argv, prefix = server_command(kind, options['port'], options['workers'])
+            server = subprocess.Popen(argv, env=os.environ.copy())
+            try:
+                wait_for_port(options['port'])
+                for name in options['endpoints']:
+                    result = run_endpoint(
+                        options['port'], build_request(prefix, name, product_id, tokens),
+                        options['connections'], options['duration'], options['warmup'],
+                    )
+                    results[name][kind] = result['rps']
+                    self.stdout.write(
+                        f"{name:<12} {kind:<6} {result['rps']:9.1f} "
+                        f"{result['p50']:9.2f} {result['p99']:9.2f} {result['errors']:7d}"
+                    )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        if {'wsgi', 'asgi'} <= set(options['servers']):
+            self.stdout.write('')
+            for name, rates in results.items():
+                if rates.get('wsgi'):
+                    self.stdout.write(f"{name:<12} ASGI/WSGI throughput: {rates['asgi'] / rates['wsgi']:.2f}x")
@@ -0,0 +1,47 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import CachedJWTAuthentication, forget_user
+from benchmarks.utils import get_bench_user, request_factory, summarize
+
+
+class Command(BaseCommand):
+    help = 'Per-request cost of JWT authentication, with and without the user cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        user = get_bench_user('bench_customer', 'customer')
+        header = f'Bearer {AccessToken.for_user(user)}'
+        factory = request_factory()
+        runs = [
+            ('JWTAuthentication', JWTAuthentication(), False),
+            ('CachedJWTAuthentication, cold', CachedJWTAuthentication(), True),
+            ('CachedJWTAuthentication, warm', CachedJWTAuthentication(), False),
+        ]
+
+        self.stdout.write(f"{options['requests']} requests per run, cache: {cache.__class__.__name__}")
+        self.stdout.write(f"{'':<32} {'mean us':>8} {'p50 us':>8} {'p99 us':>8} {'queries':>8}")
+        for label, authentication, cold in runs:
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(options['requests']):
+                    if cold:
+                        forget_user(user.pk)
+                    request = Request(factory.get('/api/products/products/', HTTP_AUTHORIZATION=header))
+                    started = time.perf_counter()
+                    authentication.authenticate(request)
+                    timings.append((time.perf_counter() - started) * 1_000_000)
+            summary = summarize(timings)
+            self.stdout.write(
+                f"{label:<32} {summary['mean']:8.1f} {summary['p50']:8.1f} {summary['p99']:8.1f} "
+                f"{len(queries) / options['requests']:8.2f}"
+            )
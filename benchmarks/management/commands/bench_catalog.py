@@ -0,0 +1,64 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import force_authenticate
+
+from benchmarks.datasets import ensure_products
+from benchmarks.utils import get_bench_user, measure, request_factory, summarize
+from products.models import Product
+from products.serializers import ProductSerializer
+from products.views import ProductViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the product catalog listing (query count and latency per page)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000,
+                            help='Catalog size to benchmark against (created if missing)')
+        parser.add_argument('--page-size', type=int, default=24)
+        parser.add_argument('--pages', type=int, default=50,
+                            help='Number of pages to walk through the cursor')
+        parser.add_argument('--legacy-rows', type=int, default=1000,
+                            help='Rows to serialize through the old unpaginated, un-joined path (0 to skip)')
+
+    def handle(self, *args, **options):
+        seller = get_bench_user('bench_seller', 'seller')
+        customer = get_bench_user('bench_customer', 'customer')
+        ensure_products(seller, options['products'])
+
+        factory = request_factory()
+        view = ProductViewSet.as_view({'get': 'list'})
+        params = {'page_size': options['page_size']}
+        timings, query_counts = [], []
+
+        for _ in range(options['pages']):
+            request = factory.get('/api/products/products/', params)
+            force_authenticate(request, user=customer)
+            response, elapsed, queries = measure(lambda: view(request).render())
+            timings.append(elapsed)
+            query_counts.append(queries)
+
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+        stats = summarize(timings)
+        self.stdout.write(f"Catalog size: {Product.objects.filter(is_active=True).count()} active products")
+        self.stdout.write(
+            f"Cursor pages: {stats['count']} x {options['page_size']} rows, "
+            f"queries/page min={min(query_counts)} max={max(query_counts)}"
+        )
+        self.stdout.write(
+            f"Latency ms: p50={stats['p50']:.2f} p95={stats['p95']:.2f} "
+            f"p99={stats['p99']:.2f} max={stats['max']:.2f}"
+        )
+        self.stdout.write(f"Body size of last page: {len(response.content)} bytes")
+
+        if options['legacy_rows']:
+            legacy = Product.objects.filter(is_active=True)[:options['legacy_rows']]
+            data, elapsed, queries = measure(lambda: ProductSerializer(legacy, many=True).data)
+            self.stdout.write(
+                f"Legacy path ({len(data)} rows, no joins): {queries} queries in {elapsed:.2f} ms "
+                f"(grows linearly with catalog size)"
+            )
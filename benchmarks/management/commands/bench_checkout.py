@@ -0,0 +1,109 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from benchmarks.utils import get_bench_user, summarize
+from orders.checkout import CheckoutError, checkout_cart
+from orders.models import Cart, CartItem, OrderItem
+from products.models import Category, Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent checkouts against a small set of hot products and check for overselling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=50, help='Parallel buyer threads')
+        parser.add_argument('--rounds', type=int, default=10, help='Checkouts attempted per buyer')
+        parser.add_argument('--lines', type=int, default=5, help='Products in every cart')
+        parser.add_argument('--stock', type=int,
+                            help='Starting stock of every hot product (default: enough for every checkout)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            # SQLite serializes every write, so there is no row locking to measure
+            raise CommandError('The checkout benchmark needs PostgreSQL')
+
+        stock = options['stock'] or options['buyers'] * options['rounds']
+        seller = get_bench_user('bench_seller', 'seller')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        products = Product.objects.bulk_create([
+            Product(
+                seller=seller,
+                category=category,
+                name=f'Hot product {i}',
+                description='Checkout benchmark product',
+                price=Decimal('2.50'),
+                quantity=stock,
+            )
+            for i in range(options['lines'])
+        ])
+        buyers = [get_bench_user(f'bench_buyer_{i}', 'customer') for i in range(options['buyers'])]
+        carts = {buyer.id: Cart.objects.get_or_create(user=buyer)[0] for buyer in buyers}
+        CartItem.objects.filter(cart__in=carts.values()).delete()
+
+        barrier = threading.Barrier(len(buyers))
+        lock = threading.Lock()
+        timings, outcomes, errors = [], {'ok': 0, 'rejected': 0}, []
+
+        def buy(buyer):
+            try:
+                barrier.wait()
+                for _ in range(options['rounds']):
+                    CartItem.objects.bulk_create([
+                        CartItem(cart=carts[buyer.id], product=product, quantity=1) for product in products
+                    ])
+                    started = time.perf_counter()
+                    try:
+                        checkout_cart(buyer)
+                        outcome = 'ok'
+                    except CheckoutError:
+                        CartItem.objects.filter(cart=carts[buyer.id]).delete()
+                        outcome = 'rejected'
+                    with lock:
+                        timings.append((time.perf_counter() - started) * 1000)
+                        outcomes[outcome] += 1
+            except Exception as e:
+                with lock:
+                    errors.append(f'{buyer.username}: {e!r}')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(buyer,)) for buyer in buyers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            # Counts of a run with dead buyers prove nothing
+            raise CommandError(f'{len(errors)} buyer threads failed:\n' + '\n'.join(errors))
+
+        stats = summarize(timings)
+        self.stdout.write(
+            f"{options['buyers']} buyers x {options['rounds']} rounds, {options['lines']} lines per cart: "
+            f"{outcomes['ok']} orders, {outcomes['rejected']} rejected for stock"
+        )
+        self.stdout.write(f"Throughput: {outcomes['ok'] / elapsed:.1f} orders/s over {elapsed:.2f} s")
+        self.stdout.write(
+            f"Checkout latency ms: p50={stats['p50']:.2f} p95={stats['p95']:.2f} p99={stats['p99']:.2f}"
+        )
+
+        oversold = False
+        for product in Product.objects.filter(pk__in=[p.pk for p in products]):
+            sold = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            if product.quantity < 0 or sold + product.quantity != stock:
+                oversold = True
+                self.stderr.write(f'{product.name}: sold {sold}, remaining {product.quantity}')
+
+        if oversold:
+            raise CommandError('Stock accounting mismatch detected')
+        self.stdout.write(self.style.SUCCESS('No overselling: sold + remaining == starting stock for every product'))
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from rest_framework.test import force_authenticate
+
+from benchmarks.datasets import ensure_products
+from benchmarks.utils import get_bench_user, request_factory, summarize
+from config import metrics
+from products.views import ProductViewSet
+
+
+def request_cycle(view, request, **kwargs):
+    """A view call wrapped in the signals the request handler sends, which open and close connections"""
+    request_started.send(sender=None)
+    try:
+        return view(request, **kwargs)
+    finally:
+        request_finished.send(sender=None)
+
+
+class Command(BaseCommand):
+    help = 'Per-request latency of a product detail request with and without persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--conn-max-age', type=int, default=60, help='CONN_MAX_AGE of the persistent runs')
+        parser.add_argument('--pooler', metavar='HOST:PORT',
+                            help='Also run through a transaction-mode pooler (e.g. PgBouncer) at this address')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Connection benchmarks need PostgreSQL')
+
+        seller = get_bench_user('bench_seller', 'seller')
+        product_id = ensure_products(seller, 1)[0][0]
+        view = ProductViewSet.as_view({'get': 'retrieve'})
+
+        direct = (connection.settings_dict['HOST'], connection.settings_dict['PORT'])
+        runs = [
+            ('new connection per request', direct, 0),
+            (f'persistent (CONN_MAX_AGE={options["conn_max_age"]})', direct, options['conn_max_age']),
+        ]
+        if options['pooler']:
+            host, _, port = options['pooler'].rpartition(':')
+            runs += [
+                ('pooler, new connection per request', (host, port), 0),
+                ('pooler, persistent', (host, port), options['conn_max_age']),
+            ]
+
+        original = {key: connection.settings_dict[key] for key in ('HOST', 'PORT', 'CONN_MAX_AGE')}
+        self.stdout.write(f"{options['requests']} requests per run")
+        self.stdout.write(
+            f"{'':<36} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'opened':>7} {'connect ms':>11}"
+        )
+        try:
+            for label, (host, port), max_age in runs:
+                connection.close()
+                connection.settings_dict.update(HOST=host, PORT=port, CONN_MAX_AGE=max_age)
+                metrics.reset()
+
+                timings = []
+                for _ in range(options['requests']):
+                    request = request_factory().get(f'/api/products/products/{product_id}/')
+                    force_authenticate(request, user=seller)
+                    # Not benchmarks.utils.measure(): capturing queries opens a connection up front
+                    started = time.perf_counter()
+                    request_cycle(view, request, pk=product_id)
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                summary = summarize(timings)
+                connects = metrics.get_summary('db_connect_seconds', alias='default')
+                connect_ms = connects['sum'] / connects['count'] * 1000 if connects['count'] else 0.0
+                self.stdout.write(
+                    f"{label:<36} {summary['mean']:8.2f} {summary['p50']:8.2f} {summary['p99']:8.2f} "
+                    f"{metrics.get('db_connections_opened', alias='default'):7.0f} {connect_ms:11.2f}"
+                )
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
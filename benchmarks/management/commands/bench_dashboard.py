@@ -0,0 +1,104 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+
+from benchmarks.datasets import ensure_products, generate_order_items
+from benchmarks.utils import get_bench_user, measure, request_factory, summarize
+from dashboard import rollups
+from dashboard.views import SellerDashboardView
+from orders.models import Order, OrderItem
+from products.models import Product
+
+
+def live_dashboard(user):
+    """The pre-rollup dashboard: every figure aggregated straight from OrderItem"""
+    products = Product.objects.filter(seller=user)
+    result = {
+        'total': products.count(),
+        'active': products.filter(is_active=True).count(),
+        'out_of_stock': products.filter(quantity=0).count(),
+        'low_stock': products.filter(quantity__lte=10, quantity__gt=0).count(),
+    }
+
+    revenue = Sum(F('price') * F('quantity'))
+    sold_items = OrderItem.objects.filter(product__seller=user)
+    result['total_sales'] = sold_items.aggregate(total=revenue)['total']
+    result['total_orders'] = sold_items.values('order').distinct().count()
+    result['items_sold'] = sold_items.aggregate(total=Sum('quantity'))['total']
+    result['recent_sales'] = sold_items.filter(
+        order__created_at__gte=timezone.now() - timedelta(days=30)
+    ).aggregate(total=revenue)['total']
+    result['top_products'] = list(sold_items.values('product__name').annotate(
+        total_sold=Sum('quantity'), revenue=revenue
+    ).order_by('-total_sold')[:5])
+
+    result['monthly_sales'] = []
+    for i in range(6):
+        month_start = timezone.now() - timedelta(days=30 * (i + 1))
+        month_end = timezone.now() - timedelta(days=30 * i)
+        result['monthly_sales'].append(sold_items.filter(
+            order__created_at__gte=month_start,
+            order__created_at__lt=month_end
+        ).aggregate(total=revenue)['total'])
+
+    result['order_statuses'] = list(Order.objects.filter(
+        items__product__seller=user
+    ).values('status').annotate(count=Count('id', distinct=True)).order_by('status'))
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Compare seller dashboard latency computed live vs. served from the sales rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000000,
+                            help='Order items sold by the benchmark seller (created if missing)')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--customers', type=int, default=200)
+        parser.add_argument('--days', type=int, default=365, help='Spread order history over this many days')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        seller = get_bench_user('bench_seller', 'seller')
+        products = ensure_products(seller, options['products'])
+
+        existing = OrderItem.objects.filter(product__seller=seller).count()
+        if existing < options['items']:
+            customers = [
+                get_bench_user(f'bench_customer_{i}', 'customer') for i in range(options['customers'])
+            ]
+            self.stdout.write(f"Creating {options['items'] - existing} order items...")
+            generate_order_items(customers, products, options['items'] - existing, days=options['days'])
+
+        started = time.perf_counter()
+        rollups.rebuild()
+        self.stdout.write(f'Rollup backfill: {time.perf_counter() - started:.2f} s')
+
+        live_timings, live_queries = [], 0
+        for _ in range(options['repeat']):
+            _, elapsed, live_queries = measure(live_dashboard, seller)
+            live_timings.append(elapsed)
+
+        factory = request_factory()
+        view = SellerDashboardView.as_view()
+        rollup_timings, rollup_queries = [], 0
+        for _ in range(options['repeat']):
+            request = factory.get('/api/dashboard/seller/')
+            force_authenticate(request, user=seller)
+            _, elapsed, rollup_queries = measure(lambda: view(request).render())
+            rollup_timings.append(elapsed)
+
+        items = OrderItem.objects.filter(product__seller=seller).count()
+        self.stdout.write(f'Seller has {items} order items')
+        for label, timings, queries in (
+            ('Live aggregation', live_timings, live_queries),
+            ('Rollups', rollup_timings, rollup_queries),
+        ):
+            stats = summarize(timings)
+            self.stdout.write(
+                f"{label:<17} {queries:>3} queries  p50={stats['p50']:.2f} ms  max={stats['max']:.2f} ms"
+            )
@@ -0,0 +1,59 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import force_authenticate
+
+from benchmarks.utils import get_bench_user, request_factory
+from orders.checkout import place_order
+from orders.views import OrderViewSet
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = 'Moving a batch of orders to shipped: one update_status request per order vs. one bulk request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+
+    def handle(self, *args, **options):
+        seller = get_bench_user('bench_fulfilment_seller', 'seller')
+        buyer = get_bench_user('bench_buyer_0', 'customer')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        product = Product.objects.create(
+            seller=seller, category=category, name='Fulfilment product',
+            description='Fulfilment benchmark product', price=Decimal('2.50'), quantity=options['orders'] * 2,
+        )
+        factory = request_factory()
+
+        def place_batch():
+            return [place_order(buyer, [(product.id, 1)]).id for _ in range(options['orders'])]
+
+        self.stdout.write(f"{options['orders']} orders, pending -> shipped")
+        one_by_one = OrderViewSet.as_view({'patch': 'update_status'})
+        order_ids = place_batch()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for order_id in order_ids:
+                request = factory.patch(f'/api/orders/orders/{order_id}/update_status/', {'status': 'shipped'}, format='json')
+                force_authenticate(request, user=seller)
+                assert one_by_one(request, pk=order_id).status_code == 200
+            elapsed = time.perf_counter() - started
+        self.report('one request per order', options['orders'], elapsed, len(queries))
+
+        bulk = OrderViewSet.as_view({'post': 'bulk_update_status'})
+        order_ids = place_batch()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            request = factory.post(
+                '/api/orders/orders/bulk_update_status/', {'order_ids': order_ids, 'status': 'shipped'}, format='json'
+            )
+            force_authenticate(request, user=seller)
+            assert bulk(request).status_code == 200
+            elapsed = time.perf_counter() - started
+        self.report('one bulk request', 1, elapsed, len(queries))
+
+    def report(self, label, requests, elapsed, queries):
+        self.stdout.write(f"{label:<24} {requests:5d} requests {elapsed * 1000:9.1f} ms {queries:6d} queries")
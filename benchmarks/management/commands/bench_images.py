@@ -0,0 +1,105 @@
+import io
+import random
+import tempfile
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from PIL import Image, ImageDraw
+from rest_framework.test import force_authenticate
+
+from benchmarks.utils import get_bench_user, request_factory
+from config import images
+from products.cache import get_cache
+from products.models import Category, Product
+from products.views import ProductViewSet
+
+
+def photo(width, height, seed):
+    """A JPEG with detail at every scale, so it compresses roughly like a photo"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = int(width * rng.uniform(0.005, 0.15))
+        draw.ellipse((x, y, x + size, y + size), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    grain = Image.effect_noise((width, height), 24).convert('RGB')
+    buffer = io.BytesIO()
+    Image.blend(image, grain, 0.1).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def pick(srcset, slot_width):
+    """(url, width) a browser would fetch from a srcset for an image slot `slot_width` device pixels wide"""
+    candidates = sorted(
+        (int(descriptor[:-1]), url)
+        for url, descriptor in (entry.rsplit(' ', 1) for entry in srcset.split(', '))
+    )
+    width, url = next(((w, u) for w, u in candidates if w >= slot_width), candidates[-1])
+    return url, width
+
+
+class Command(BaseCommand):
+    help = 'Bytes a catalog page of product cards downloads, original images vs. resized srcset candidates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=24, help='Product cards on the page')
+        parser.add_argument('--width', type=int, default=2400, help='Width of the uploaded photos')
+        parser.add_argument('--height', type=int, default=1600)
+        parser.add_argument('--card-width', type=int, default=320, help='CSS pixels of the card image')
+        parser.add_argument('--dpr', type=float, default=2.0, help='Device pixel ratio of the client')
+
+    def handle(self, *args, **options):
+        seller = get_bench_user('bench_image_seller', 'seller')
+        customer = get_bench_user('bench_customer', 'customer')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        slot = round(options['card_width'] * options['dpr'])
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            products = []
+            for i in range(options['products']):
+                product = Product(
+                    seller=seller, category=category, name=f'Photo product {i}',
+                    description='Image benchmark product', price=Decimal('1.00'), quantity=10,
+                )
+                product.image.save(f'bench_{i}.jpg', ContentFile(photo(options['width'], options['height'], i)), save=False)
+                products.append(product)
+            try:
+                Product.objects.bulk_create(products)
+                for product in products:
+                    images.generate(product.image.name)
+                get_cache().clear()
+
+                request = request_factory().get('/api/products/products/', {'page_size': options['products']})
+                force_authenticate(request, user=customer)
+                response = ProductViewSet.as_view({'get': 'list'})(request).render()
+
+                original_bytes = resized_bytes = 0
+                chosen = set()
+                for card in response.data['results']:
+                    name = Product.objects.only('image').get(pk=card['id']).image.name
+                    original_bytes += default_storage.size(name)
+                    srcset = (card['image_srcset'] or {}).get('webp')
+                    if not srcset:
+                        resized_bytes += default_storage.size(name)
+                        continue
+                    _, width = pick(srcset, slot)
+                    chosen.add(width)
+                    resized_bytes += default_storage.size(images.derivative_name(name, width, 'webp'))
+            finally:
+                Product.objects.filter(pk__in=[product.pk for product in products if product.pk]).delete()
+
+        cards = len(response.data['results'])
+        self.stdout.write(
+            f"{cards} cards, {options['width']}x{options['height']} uploads, "
+            f"{options['card_width']} px slots at {options['dpr']:g}x ({slot} device px)"
+        )
+        self.stdout.write(f"JSON body: {len(response.content)} bytes")
+        self.stdout.write(f"Images, originals: {original_bytes / 1024:.0f} KiB")
+        self.stdout.write(
+            f"Images, srcset webp {'/'.join(map(str, sorted(chosen))) or '-'}w: {resized_bytes / 1024:.0f} KiB "
+            f"({resized_bytes / max(original_bytes, 1):.1%} of the originals)"
+        )
@@ -0,0 +1,57 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from accounts.hashers import TunedArgon2PasswordHasher
+from accounts.views import LoginView
+from benchmarks.utils import get_bench_user, request_factory, summarize
+
+
+class Command(BaseCommand):
+    help = 'CPU cost of a password check per hasher, and of a credential stuffing run with and without throttling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=20, help='Password checks per hasher')
+        parser.add_argument('--attempts', type=int, default=200, help='Login attempts in the stuffing run')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'hasher':<34} {'p50 ms':>8} {'checks/s per core':>18}")
+        for label, hasher in [
+            ('PBKDF2 (Django default)', PBKDF2PasswordHasher()),
+            ('Argon2 (Django default cost)', Argon2PasswordHasher()),
+            ('Argon2 (ARGON2_* settings)', TunedArgon2PasswordHasher()),
+        ]:
+            encoded = hasher.encode('correct horse', hasher.salt())
+            timings = []
+            for _ in range(options['checks']):
+                started = time.process_time()
+                hasher.verify('wrong guess', encoded)
+                timings.append((time.process_time() - started) * 1000)
+            p50 = summarize(timings)['p50']
+            self.stdout.write(f"{label:<34} {p50:8.1f} {1000 / p50 if p50 else 0:18.1f}")
+
+        user = get_bench_user('bench_login_target', 'customer')
+        user.set_password('correct horse')
+        user.save(update_fields=['password'])
+        factory = request_factory()
+        self.stdout.write(f"\nCredential stuffing: {options['attempts']} wrong passwords for one account")
+        for label, throttle_classes in [('unthrottled', []), ('throttled', LoginView.throttle_classes)]:
+            cache.clear()
+            view = LoginView.as_view()
+            statuses = {}
+            with mock.patch.object(LoginView, 'throttle_classes', throttle_classes):
+                started = time.process_time()
+                for attempt in range(options['attempts']):
+                    request = factory.post(
+                        '/api/token/', {'username': user.username, 'password': f'guess {attempt}'},
+                        format='json', REMOTE_ADDR=f'10.{attempt // 250}.{attempt % 250}.1',
+                    )
+                    code = view(request).status_code
+                    statuses[code] = statuses.get(code, 0) + 1
+                cpu = time.process_time() - started
+            self.stdout.write(
+                f"{label:<12} CPU {cpu:6.2f} s, statuses {dict(sorted(statuses.items()))}"
+            )
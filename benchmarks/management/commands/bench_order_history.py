@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import force_authenticate
+
+from benchmarks.utils import get_bench_user, measure, request_factory
+from orders.checkout import place_order
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from orders.views import OrderViewSet
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = "A customer's order history: the old unpaginated nested list vs. the compact paginated one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=300, help='Orders of the benchmark customer (created if missing)')
+        parser.add_argument('--lines', type=int, default=3, help='Items per order')
+
+    def handle(self, *args, **options):
+        seller = get_bench_user('bench_fulfilment_seller', 'seller')
+        customer = get_bench_user('bench_history_buyer', 'customer')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        missing = options['orders'] - Order.objects.filter(user=customer).count()
+        if missing > 0:
+            products = [
+                Product.objects.create(
+                    seller=seller, category=category, name=f'History product {i}',
+                    description='Order history benchmark product', price=Decimal('2.50'), quantity=missing,
+                )
+                for i in range(options['lines'])
+            ]
+            for _ in range(missing):
+                place_order(customer, [(product.id, 1) for product in products])
+
+        # What the list endpoint used to run: every order, nested items, no joins
+        legacy = Order.objects.filter(user=customer)
+        data, elapsed, queries = measure(lambda: OrderSerializer(legacy, many=True).data)
+        self.stdout.write(f"{len(data)} orders of {options['lines']} items")
+        self.stdout.write(f"{'old list (all orders)':<28} {elapsed:9.1f} ms {queries:6d} queries")
+
+        view = OrderViewSet.as_view({'get': 'list'})
+        request = request_factory().get('/api/orders/orders/')
+        force_authenticate(request, user=customer)
+        response, elapsed, queries = measure(lambda: view(request).render())
+        self.stdout.write(
+            f"{'compact list (first page)':<28} {elapsed:9.1f} ms {queries:6d} queries, "
+            f"{len(response.data['results'])} rows, {len(response.content)} bytes"
+        )
+
+        order_id = response.data['results'][0]['id']
+        view = OrderViewSet.as_view({'get': 'retrieve'})
+        request = request_factory().get(f'/api/orders/orders/{order_id}/')
+        force_authenticate(request, user=customer)
+        response, elapsed, queries = measure(lambda: view(request, pk=order_id).render())
+        self.stdout.write(f"{'detail':<28} {elapsed:9.1f} ms {queries:6d} queries")
@@ -0,0 +1,72 @@
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.utils import get_bench_user, summarize
+
+
+class Command(BaseCommand):
+    help = 'Which database catalog, dashboard and profile requests read from once DB_REPLICAS is set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per scenario')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured; set DB_REPLICAS (e.g. DB_REPLICAS=127.0.0.1 on one server)')
+
+        seller = get_bench_user('bench_replica_seller', 'seller')
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(seller)}'}
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost').lstrip('.')
+        client = Client(HTTP_HOST=host)
+        profile_update = lambda: client.patch(
+            '/api/auth/profile/', {'first_name': 'Bench'}, content_type='application/json', **auth
+        )
+
+        scenarios = [
+            ('catalog', lambda: client.get('/api/products/products/', **auth), None),
+            ('seller dashboard', lambda: client.get('/api/dashboard/seller/', **auth), None),
+            ('seller revenue', lambda: client.get('/api/dashboard/seller/revenue/', {'days': 30}, **auth), None),
+            ('profile update', profile_update, None),
+            ('profile read after an update', lambda: client.get('/api/auth/profile/', **auth), profile_update),
+        ]
+
+        aliases = ['default', *settings.DATABASE_REPLICAS]
+        self.stdout.write(f"{options['requests']} requests per scenario, replicas: {', '.join(settings.DATABASE_REPLICAS)}")
+        self.stdout.write(f"{'':<30} {'mean ms':>8} {'p95 ms':>8}" + ''.join(f' {alias:>9}' for alias in aliases))
+        for label, call, before in scenarios:
+            queries = Counter()
+
+            def count(alias):
+                def wrapper(execute, sql, params, many, context):
+                    queries[alias] += 1
+                    return execute(sql, params, many, context)
+                return wrapper
+
+            timings = []
+            for _ in range(options['requests']):
+                cache.clear()
+                if before:
+                    before()
+                with ExitStack() as stack:
+                    for alias in aliases:
+                        stack.enter_context(connections[alias].execute_wrapper(count(alias)))
+                    started = time.perf_counter()
+                    response = call()
+                    timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    raise CommandError(f'{label}: HTTP {response.status_code}')
+
+            summary = summarize(timings)
+            self.stdout.write(
+                f"{label:<30} {summary['mean']:8.2f} {summary['p95']:8.2f}"
+                + ''.join(f" {queries[alias] / options['requests']:9.2f}" for alias in aliases)
+            )
+        self.stdout.write('Columns per alias: queries per request')
@@ -0,0 +1,65 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from benchmarks.datasets import ensure_products
+from benchmarks.utils import get_bench_user, measure
+from products.models import Product
+from products.search import refresh_search_vectors, search_enabled, search_products
+
+
+def naive_search(queryset, text):
+    """What a SearchFilter on name/description would run: ILIKE '%term%' per word"""
+    condition = Q()
+    for term in text.split():
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition).order_by('-created_at', 'id')
+
+
+def describe_plan(queryset):
+    plan = queryset.explain(analyze=True)
+    scans = sorted(set(re.findall(r'((?:Parallel )?(?:Seq Scan|Bitmap Index Scan|Index Scan|Index Only Scan) on \w+)', plan)))
+    execution = re.search(r'Execution Time: ([\d.]+) ms', plan)
+    return ', '.join(scans), float(execution.group(1)) if execution else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text search against the naive ILIKE filter on a large catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500000)
+        parser.add_argument('--page-size', type=int, default=24)
+        parser.add_argument('queries', nargs='*', default=['tomatoes', 'organic straw', 'heirloom pepp', 'farm 42'])
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError('Full-text search benchmarks need PostgreSQL')
+
+        seller = get_bench_user('bench_seller', 'seller')
+        ensure_products(seller, options['products'])
+
+        missing = Product.objects.filter(search_vector__isnull=True)
+        if missing.exists():
+            self.stdout.write('Computing search vectors...')
+            refresh_search_vectors(missing)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Product._meta.db_table}')
+
+        active = Product.objects.filter(is_active=True)
+        self.stdout.write(f'Catalog: {active.count()} active products')
+        limit = options['page_size']
+
+        for text in options['queries']:
+            self.stdout.write(f'\n"{text}"')
+            for label, queryset in (
+                ('ILIKE filter', naive_search(active, text)[:limit]),
+                ('Full-text', search_products(active, text)[:limit]),
+            ):
+                rows, elapsed, _ = measure(list, queryset)
+                scans, execution = describe_plan(queryset)
+                self.stdout.write(
+                    f'  {label:<12} {len(rows):>3} rows  {elapsed:8.2f} ms  '
+                    f'(db {execution:.2f} ms)  {scans}'
+                )
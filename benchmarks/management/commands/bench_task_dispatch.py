@@ -0,0 +1,99 @@
+import contextlib
+import io
+import re
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from benchmarks.utils import get_bench_user, summarize
+from config import metrics
+from orders import outbox
+from orders.checkout import checkout_cart
+from orders.models import Cart, CartItem, OrderEvent
+from products.models import Category, Product
+
+# Tables of the database broker (kombu) and of the database result backend
+BROKER_TABLES = re.compile(r'kombu_|django_celery_results_|celery_taskmeta', re.IGNORECASE)
+
+
+class Command(BaseCommand):
+    help = 'SQL statements and latency of a checkout including its notification event, then the outbox relay'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--lines', type=int, default=3, help='Products in every cart')
+        parser.add_argument('--batch-size', type=int, default=outbox.RELAY_BATCH_SIZE, help='Outbox relay batch size')
+
+    def handle(self, *args, **options):
+        seller = get_bench_user('bench_seller', 'seller')
+        buyer = get_bench_user('bench_buyer_0', 'customer')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        products = Product.objects.bulk_create([
+            Product(
+                seller=seller,
+                category=category,
+                name=f'Dispatch product {i}',
+                description='Task dispatch benchmark product',
+                price=Decimal('2.50'),
+                quantity=options['orders'],
+            )
+            for i in range(options['lines'])
+        ])
+        cart, _ = Cart.objects.get_or_create(user=buyer)
+        CartItem.objects.filter(cart=cart).delete()
+        # Leftovers of earlier runs would be counted as this run's backlog
+        OrderEvent.objects.filter(published_at__isnull=True).update(published_at=timezone.now())
+        metrics.reset()
+
+        results_before = TaskResult.objects.count()
+        timings, statements, broker_statements = [], 0, 0
+        # An eager task prints its "email"; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(options['orders']):
+                CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products])
+                # checkout_cart commits its own transaction, so the on-commit dispatch is captured too
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    checkout_cart(buyer)
+                    timings.append((time.perf_counter() - started) * 1000)
+                statements += len(queries)
+                broker_statements += sum(1 for query in queries if BROKER_TABLES.search(query['sql']))
+            # Then drain what the checkouts queued, as the relay task does
+            relay_started = time.perf_counter()
+            published, relay_error = 0, None
+            try:
+                while count := outbox.relay(options['batch_size']):
+                    published += count
+            except Exception as e:  # e.g. the broker is down: the events stay queued
+                relay_error = e
+            relay_seconds = time.perf_counter() - relay_started
+        results_written = TaskResult.objects.count() - results_before
+
+        stats = summarize(timings)
+        self.stdout.write(
+            f"broker={settings.CELERY_BROKER_URL.split('@')[-1]} "
+            f"results={settings.CELERY_RESULT_BACKEND or 'none'} eager={settings.CELERY_TASK_ALWAYS_EAGER}"
+        )
+        self.stdout.write(f"{options['orders']} checkouts, {options['lines']} lines per cart")
+        self.stdout.write(
+            f"SQL per checkout: {statements / options['orders']:.1f} "
+            f"({broker_statements / options['orders']:.1f} on broker/result tables)"
+        )
+        self.stdout.write(f"Task result rows written: {results_written}")
+        self.stdout.write(f"Checkout latency ms: p50={stats['p50']:.2f} p99={stats['p99']:.2f}")
+
+        if relay_error is not None:
+            pending = OrderEvent.objects.filter(published_at__isnull=True).count()
+            self.stdout.write(f"Relay failed ({relay_error!r}); {pending} events left in the outbox")
+        else:
+            lag = metrics.get_summary('outbox_lag_seconds', event=outbox.CREATED)
+            self.stdout.write(
+                f"Relay: {published} events in {relay_seconds:.2f} s ({published / relay_seconds:.0f} events/s), "
+                f"lag mean={lag['sum'] / max(lag['count'], 1):.2f} s max={lag['max']:.2f} s"
+            )
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.load import ENDPOINTS, build_request, prepare, run_endpoint, wait_for_port
+
+GUNICORN_CONFIG = Path(settings.BASE_DIR) / 'config' / 'gunicorn.py'
+
+
+def worker_rss_mb(pid):
+    """Resident memory of the server's worker processes, in MB (Linux only)"""
+    try:
+        children = Path(f'/proc/{pid}/task/{pid}/children').read_text().split()
+        total_kb = 0
+        for child in children:
+            for line in Path(f'/proc/{child}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total_kb += int(line.split()[1])
+    except OSError:
+        return None
+    return total_kb / 1024
+
+
+class Command(BaseCommand):
+    help = 'Throughput and latency of the production gunicorn setup (config/gunicorn.py) per worker class'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-classes', nargs='+', choices=['sync', 'gthread', 'uvicorn'],
+                            default=['sync', 'gthread', 'uvicorn'])
+        parser.add_argument('--workers', type=int, help='WEB_CONCURRENCY (default: derived from the CPU count)')
+        parser.add_argument('--connections', type=int, default=100)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per endpoint and worker class')
+        parser.add_argument('--warmup', type=float, default=2.0)
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('endpoints', nargs='*', default=['products', 'product', 'dashboard'],
+                            help=', '.join(ENDPOINTS))
+
+    def handle(self, *args, **options):
+        unknown = set(options['endpoints']) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        product_id, tokens = prepare(options['products'])
+
+        self.stdout.write(f"{options['connections']} connections, {options['duration']:.0f}s per run\n")
+        self.stdout.write(
+            f"{'endpoint':<12} {'workers':<10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>8}"
+        )
+        for kind in options['worker_classes']:
+            env = dict(os.environ, GUNICORN_WORKER_CLASS=kind, PORT=str(options['port']), GUNICORN_ACCESS_LOG='')
+            if options['workers']:
+                env['WEB_CONCURRENCY'] = str(options['workers'])
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', str(GUNICORN_CONFIG), '--log-level', 'warning'],
+                env=env, cwd=settings.BASE_DIR,
+            )
+            try:
+                wait_for_port(options['port'])
+                for name in options['endpoints']:
+                    result = run_endpoint(
+                        options['port'], build_request('/api/', name, product_id, tokens),
+                        options['connections'], options['duration'], options['warmup'],
+                    )
+                    rss = worker_rss_mb(server.pid)
+                    self.stdout.write(
+                        f"{name:<12} {kind:<10} {result['rps']:9.1f} {result['p50']:9.2f} "
+                        f"{result['p99']:9.2f} {result['errors']:7d} {'-' if rss is None else f'{rss:.0f}':>8}"
+                    )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
@@ -0,0 +1,89 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from orders.models import Cart, Order
+from products.models import Product
+from products.tasks import low_stock_products
+from products.views import product_queryset
+
+User = get_user_model()
+
+
+def hot_queries():
+    """(name, table that must not be scanned sequentially, queryset) for each hot query shape"""
+    seller_id = (
+        Product.objects.values('seller').annotate(total=Count('id')).order_by('-total')
+        .values_list('seller', flat=True).first()
+    )
+    customer_id = (
+        Order.objects.values('user').annotate(total=Count('id')).order_by('-total')
+        .values_list('user', flat=True).first()
+    )
+    month_ago = timezone.now() - timedelta(days=30)
+    product_table = Product._meta.db_table
+    order_table = Order._meta.db_table
+    return [
+        ('catalog page', product_table,
+         product_queryset().filter(is_active=True).order_by('-created_at', 'id')[:24]),
+        ("seller's products", product_table,
+         product_queryset().filter(seller_id=seller_id).order_by('-created_at', 'id')[:24]),
+        ('low stock digest', product_table,
+         low_stock_products().order_by('seller_id').values_list('seller_id', flat=True).distinct()[:200]),
+        ("customer's orders", order_table,
+         Order.objects.filter(user_id=customer_id).order_by('-created_at')[:20]),
+        ('pending orders', order_table,
+         Order.objects.filter(status='pending').order_by('created_at')[:50]),
+        ('stale carts', Cart._meta.db_table,
+         Cart.objects.filter(updated_at__lt=month_ago).order_by('updated_at', 'id').values_list('id', flat=True)[:1000]),
+    ]
+
+
+def sequential_scans(plan, vendor):
+    """Tables the plan reads in full"""
+    if vendor == 'postgresql':
+        return set(re.findall(r'Seq Scan on (\w+)', plan))
+    # SQLite: "SCAN products_product" reads the table, "SEARCH ... USING INDEX" does not
+    return {table for table, using in re.findall(r'SCAN (\w+)( USING (?:COVERING )?INDEX)?', plan) if not using}
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN (ANALYZE on PostgreSQL) every hot query and flag the ones that still '
+        'scan their table sequentially. Run against a seeded database, e.g. in CI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warn-only', action='store_true', help='Report sequential scans without failing')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every full plan')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        flagged = []
+        for name, table, queryset in hot_queries():
+            plan = queryset.explain(analyze=True) if vendor == 'postgresql' else queryset.explain()
+            indexes = sorted(set(re.findall(r'(?:[Ii]ndex(?: Only)? Scan(?: Backward)? using|USING (?:COVERING )?INDEX) (\w+)', plan)))
+            execution = re.search(r'Execution Time: ([\d.]+) ms', plan)
+            seq = table in sequential_scans(plan, vendor)
+
+            status = self.style.ERROR('SEQ SCAN') if seq else self.style.SUCCESS('ok')
+            timing = f'{float(execution.group(1)):8.2f} ms' if execution else ''
+            self.stdout.write(f"{name:<20} {status:<8} {timing}  {', '.join(indexes) or '-'}")
+            if options['verbose_plans'] or seq:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+            if seq:
+                flagged.append(name)
+
+        if flagged and not options['warn_only']:
+            raise CommandError(f"Sequential scans in: {', '.join(flagged)}")
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS('Every hot query uses an index'))
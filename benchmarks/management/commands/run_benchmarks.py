@@ -0,0 +1,207 @@
+import json
+import platform
+import random
+import subprocess
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+
+from benchmarks.datasets import build_dataset
+from benchmarks.utils import measure, request_factory, summarize
+from dashboard.views import SellerDashboardView, SellerRevenueView
+from orders.models import Cart, CartItem
+from orders.views import CartViewSet, OrderViewSet
+from products.views import ProductViewSet
+
+SCENARIOS = [
+    'catalog_browse', 'product_search', 'cart_add', 'cart_update',
+    'checkout', 'seller_dashboard', 'revenue_report',
+]
+SEARCH_TERMS = ['tomatoes', 'organic', 'fresh straw', 'honey', 'heirloom pepp', 'farm 42']
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the core API flows against a generated dataset and write latency '
+        'percentiles, queries per request and throughput to a JSON file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sellers', type=int, default=20)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--iterations', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Run only these scenarios (repeatable)')
+        parser.add_argument('--output', default='benchmark-results/latest.json')
+        parser.add_argument('--compare', help='Previous results file to compare against')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='p95 slowdown (percent) reported as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.factory = request_factory()
+        self.cursor = None
+
+        started = time.perf_counter()
+        self.dataset = build_dataset(
+            options['sellers'], options['customers'], options['products'], options['orders'],
+            seed=options['seed'],
+        )
+        self.stdout.write(f'Dataset ready in {time.perf_counter() - started:.1f} s')
+
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            results[name] = self.run_scenario(name, options['iterations'], options['warmup'])
+            self.report(name, results[name])
+
+        payload = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'commit': git_commit(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'dataset': {key: options[key] for key in ('sellers', 'customers', 'products', 'orders')},
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+            },
+            'scenarios': results,
+        }
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(payload, indent=2))
+        self.stdout.write(f'Results written to {output}')
+
+        if options['compare']:
+            regressions = self.compare(json.loads(Path(options['compare']).read_text()), payload, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"Regressions in: {', '.join(regressions)}")
+
+    def run_scenario(self, name, iterations, warmup):
+        runner = getattr(self, name)
+        self.samples, self.errors = [], 0
+        for _ in range(warmup):
+            runner()
+        self.samples, self.errors = [], 0
+        for _ in range(iterations):
+            runner()
+
+        timings = [elapsed for elapsed, _ in self.samples]
+        queries = [count for _, count in self.samples]
+        total_seconds = sum(timings) / 1000
+        return {
+            'latency_ms': summarize(timings),
+            'queries': {'min': min(queries), 'max': max(queries), 'mean': sum(queries) / len(queries)},
+            'throughput_rps': len(timings) / total_seconds if total_seconds else 0.0,
+            'errors': self.errors,
+        }
+
+    def call(self, view, request, user):
+        force_authenticate(request, user=user)
+        response, elapsed, queries = measure(lambda: view(request).render())
+        self.samples.append((elapsed, queries))
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+    # Scenarios: each call performs one measured request
+
+    def catalog_browse(self):
+        """Walk the catalog a few pages deep through the cursor, as a shopper would"""
+        params = {'page_size': 24}
+        if self.cursor:
+            params['cursor'] = self.cursor
+        request = self.factory.get('/api/products/products/', params)
+        response = self.call(ProductViewSet.as_view({'get': 'list'}), request, self.rng.choice(self.dataset['customers']))
+        next_url = response.data.get('next') if response.status_code == 200 else None
+        self.cursor = parse_qs(urlparse(next_url).query)['cursor'][0] if next_url and self.rng.random() < 0.8 else None
+
+    def product_search(self):
+        request = self.factory.get('/api/products/products/search/', {'q': self.rng.choice(SEARCH_TERMS)})
+        self.call(ProductViewSet.as_view({'get': 'search'}), request, self.rng.choice(self.dataset['customers']))
+
+    def cart_add(self):
+        request = self.factory.post(
+            '/api/orders/cart/add/', {'product_id': self.rng.choice(self.dataset['products']), 'quantity': 1},
+            format='json',
+        )
+        self.call(CartViewSet.as_view({'post': 'add_item'}), request, self.rng.choice(self.dataset['customers']))
+
+    def cart_update(self):
+        customer = self.rng.choice(self.dataset['customers'])
+        cart, _ = Cart.objects.get_or_create(user=customer)
+        item, _ = CartItem.objects.get_or_create(cart=cart, product_id=self.rng.choice(self.dataset['products']))
+        request = self.factory.post(
+            '/api/orders/cart/update/', {'item_id': item.id, 'quantity': self.rng.randint(1, 5)}, format='json',
+        )
+        self.call(CartViewSet.as_view({'post': 'update_item'}), request, customer)
+
+    def checkout(self):
+        customer = self.rng.choice(self.dataset['customers'])
+        cart, _ = Cart.objects.get_or_create(user=customer)
+        CartItem.objects.filter(cart=cart).delete()
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product_id=product_id, quantity=1)
+            for product_id in self.rng.sample(self.dataset['products'], 3)
+        ])
+        request = self.factory.post('/api/orders/orders/', {}, format='json')
+        self.call(OrderViewSet.as_view({'post': 'create'}), request, customer)
+
+    def seller_dashboard(self):
+        request = self.factory.get('/api/dashboard/seller/')
+        self.call(SellerDashboardView.as_view(), request, self.rng.choice(self.dataset['sellers']))
+
+    def revenue_report(self):
+        request = self.factory.get('/api/dashboard/seller/revenue/')
+        self.call(SellerRevenueView.as_view(), request, self.rng.choice(self.dataset['sellers']))
+
+    def report(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{name:<17} p50={latency['p50']:8.2f} ms  p95={latency['p95']:8.2f} ms  "
+            f"p99={latency['p99']:8.2f} ms  queries={result['queries']['mean']:5.1f}  "
+            f"{result['throughput_rps']:7.1f} req/s  errors={result['errors']}"
+        )
+
+    def compare(self, previous, current, threshold):
+        """Print p95 and query count changes against an earlier run; return the regressed scenarios"""
+        self.stdout.write(f"\nAgainst {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+        regressions = []
+        for name, result in current['scenarios'].items():
+            before = previous['scenarios'].get(name)
+            if before is None:
+                continue
+            old_p95, new_p95 = before['latency_ms']['p95'], result['latency_ms']['p95']
+            change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+            query_change = result['queries']['max'] - before['queries']['max']
+            regressed = change > threshold or query_change > 0
+            if regressed:
+                regressions.append(name)
+            self.stdout.write(
+                f"{name:<17} p95 {old_p95:8.2f} -> {new_p95:8.2f} ms ({change:+.0f}%)  "
+                f"max queries {before['queries']['max']} -> {result['queries']['max']}"
+                + (self.style.ERROR('  REGRESSION') if regressed else '')
+            )
+        return regressions
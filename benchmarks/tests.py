@@ -0,0 +1,42 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from products.cache import get_cache
+from .management.commands.run_benchmarks import SCENARIOS
+
+
+class RunBenchmarksTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_small_run_writes_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'results.json'
+            call_command(
+                'run_benchmarks', sellers=2, customers=3, products=20, orders=10,
+                iterations=3, warmup=1, output=str(output), stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+
+        self.assertEqual(results['meta']['dataset'], {'sellers': 2, 'customers': 3, 'products': 20, 'orders': 10})
+        self.assertEqual(list(results['scenarios']), SCENARIOS)
+        for name, result in results['scenarios'].items():
+            self.assertEqual(result['latency_ms']['count'], 3, name)
+            self.assertEqual(result['errors'], 0, name)
+        self.assertEqual(results['scenarios']['seller_dashboard']['queries']['max'], 5)
+
+
+class CheckQueryPlansTestCase(TestCase):
+    def test_reports_every_hot_query(self):
+        stdout = StringIO()
+        # Tiny test tables are cheapest to scan, so only the report itself is checked here
+        call_command('check_query_plans', warn_only=True, stdout=stdout)
+        output = stdout.getvalue()
+        for name in ('catalog page', "seller's products", 'low stock digest',
+                     "customer's orders", 'pending orders', 'stale carts'):
+            self.assertIn(name, output)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+User = get_user_model()
+
+
+def measure(func, *args, **kwargs):
+    """Run func once and return (result, elapsed milliseconds, SQL query count)"""
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+    return result, elapsed, len(queries)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(timings):
+    """Latency summary (milliseconds) for a list of samples"""
+    return {
+        'count': len(timings),
+        'mean': statistics.fmean(timings) if timings else 0.0,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'max': max(timings) if timings else 0.0,
+    }
+
+
+def get_bench_user(username, user_type):
+    """Get or create a user reserved for benchmark runs"""
+    user, created = User.objects.get_or_create(
+        username=username,
+        defaults={'user_type': user_type, 'email': f'{username}@example.com'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    return user
+
+
+def request_factory():
+    """APIRequestFactory whose requests pass the ALLOWED_HOSTS check"""
+    host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    return APIRequestFactory(HTTP_HOST=host.lstrip('.'))
@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Each ASGI request runs its database work on a thread of its own that ends with
+# the request, so a connection kept open for reuse would be left behind. Pool
+# outside the process (DB_TRANSACTION_POOLING) instead.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
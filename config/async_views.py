@@ -0,0 +1,120 @@
+"""
+Base for async (ASGI) read-only endpoints.
+
+DRF views are synchronous, so under ASGI each request to one is handed off to
+a worker thread. AsyncAPIView keeps the request on the event loop instead: it
+authenticates with the DRF authentication classes from settings and renders
+with DRF's JSON renderer, using the serializers (with the request in their
+context) of the sync endpoints it mirrors, so the payloads match. Subclasses
+read through Django's async ORM where they can; code that only exists in sync
+form (DRF pagination, serializer fields doing I/O, run_concurrently()'s
+query functions) runs in threads through sync_to_async. Django 4.2's async
+ORM itself still runs every query in a thread.
+
+Each request in flight still occupies a thread and a database connection
+while it runs, so a worker admits at most ASYNC_REQUEST_CONCURRENCY of them at
+once; the rest wait on the event loop, which costs no connection.
+"""
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+_limits = weakref.WeakKeyDictionary()
+
+
+def release_connections():
+    """
+    What request_finished does once the response is sent, done before the
+    request's slot goes to the next one. Connections inside a transaction
+    (tests run views in one) are left alone.
+    """
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close_if_unusable_or_obsolete()
+
+
+def limit(name, size):
+    """Semaphore `name` of the running event loop, i.e. shared by one worker's requests"""
+    limits = _limits.setdefault(asyncio.get_running_loop(), {})
+    if name not in limits:
+        limits[name] = asyncio.Semaphore(size)
+    return limits[name]
+
+
+class AsyncAPIView(View):
+    """Authenticated, read-only JSON view; subclasses implement `async def get`"""
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        async with limit('requests', settings.ASYNC_REQUEST_CONCURRENCY):
+            try:
+                return await self.handle(request, *args, **kwargs)
+            finally:
+                await sync_to_async(release_connections)()
+
+    async def handle(self, request, *args, **kwargs):
+        try:
+            request.user = await sync_to_async(self.authenticate)(request)
+        except exceptions.AuthenticationFailed as exc:
+            return self.error(request, exc)
+        if not request.user.is_authenticated:
+            return self.error(request, exceptions.NotAuthenticated())
+        return await super().dispatch(request, *args, **kwargs)
+
+    def get_authenticators(self):
+        return [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+    def authenticate(self, request):
+        for authenticator in self.get_authenticators():
+            result = authenticator.authenticate(request)
+            if result is not None:
+                return result[0]
+        return AnonymousUser()
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        return HttpResponse(
+            JSONRenderer().render(data), status=status_code, content_type='application/json', headers=headers
+        )
+
+    def error(self, request, exc):
+        """Same body and headers DRF's exception handler would produce"""
+        data = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        headers = None
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            headers = {'WWW-Authenticate': self.get_authenticators()[0].authenticate_header(request)}
+        return self.render(data, exc.status_code, headers)
+
+
+async def _on_own_connection(query):
+    async with limit('queries', settings.ASYNC_QUERY_CONCURRENCY):
+        return await sync_to_async(_run_and_close, thread_sensitive=False)(query)
+
+
+def _run_and_close(query):
+    try:
+        return query()
+    finally:
+        release_connections()
+
+
+async def run_concurrently(*queries):
+    """
+    Run independent read functions, which use the sync ORM, at the same time
+    and return their results in order. Each runs in a thread of its own and so
+    on its own database connection, at most ASYNC_QUERY_CONCURRENCY at once
+    per worker. Inside a transaction they have to see its uncommitted rows,
+    so there they run one after another on the transaction's connection.
+    """
+    # Connections are per thread: ask the one async ORM calls run on
+    if await sync_to_async(lambda: connection.in_atomic_block)():
+        return [await sync_to_async(query)() for query in queries]
+    return await asyncio.gather(*(_on_own_connection(query) for query in queries))
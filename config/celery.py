@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from django.db import transaction
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -18,8 +19,32 @@ app.conf.beat_schedule = {
         'task': 'orders.tasks.cleanup_old_carts',
         'schedule': crontab(hour=2, minute=0),  # Run daily at 2 AM
     },
+    'purge-order-events': {
+        'task': 'orders.tasks.purge_order_events',
+        'schedule': crontab(hour=3, minute=0),  # Run daily at 3 AM
+    },
+    'relay-order-events': {
+        'task': 'orders.tasks.relay_order_events',
+        'schedule': 5.0,  # Seconds: the order event outbox (orders.outbox)
+        # A run that never started is replaced by the next one
+        'options': {'expires': 5.0},
+    },
+    'fold-sales-deltas': {
+        'task': 'dashboard.tasks.fold_sales_deltas',
+        'schedule': 10.0,  # Seconds: how far seller dashboards trail orders (dashboard.rollups)
+        'options': {'expires': 10.0},
+    },
 }
 
 @app.task(bind=True)
 def debug_task(self):
-    print(f'Request: {self.request!r}')
\ No newline at end of file
+    print(f'Request: {self.request!r}')
+
+
+def delay_on_commit(task, *args, **kwargs):
+    """
+    Queue `task` once the current transaction commits, so a worker never looks
+    for rows that are not committed yet and nothing is sent on rollback.
+    Outside a transaction it is queued right away.
+    """
+    transaction.on_commit(lambda: task.delay(*args, **kwargs))
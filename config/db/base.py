@@ -0,0 +1,27 @@
+"""
+PostgreSQL backend (ENGINE 'config.db') that records every new server
+connection in config.metrics: db_connections_opened counts them and
+db_connect_seconds times them, so persistent connections and pooler
+queueing (a connect waits until the pooler hands out a server slot)
+show up in /api/metrics/.
+"""
+import time
+
+from django.db.backends.postgresql import base
+
+from config import metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        metrics.increment('db_connections_opened', alias=self.alias)
+        metrics.observe('db_connect_seconds', time.perf_counter() - started, alias=self.alias)
+
+        if self.settings_dict['DISABLE_SERVER_SIDE_CURSORS'] and hasattr(connection, 'prepare_threshold'):
+            # Behind a transaction-mode pooler consecutive statements may reach
+            # different server sessions, so psycopg 3 must not prepare them
+            # server-side (psycopg2 never does)
+            connection.prepare_threshold = None
+        return connection
@@ -0,0 +1,71 @@
+"""
+Gunicorn settings for production: gunicorn -c config/gunicorn.py
+
+The application is imported once in the master and forked into the workers
+(preload_app), and workers are replaced after a bounded number of requests so
+slow memory growth never accumulates. Tuned through the environment:
+
+    GUNICORN_WORKER_CLASS  sync (default), gthread, or uvicorn (serves config.asgi)
+    WEB_CONCURRENCY        worker processes (default derived from the CPU count)
+    GUNICORN_THREADS       threads per gthread worker (default 4)
+    GUNICORN_MAX_REQUESTS  requests before a worker is replaced (default 1000, 0 = never)
+    GUNICORN_TIMEOUT       seconds before a silent worker is killed (default 30)
+    GUNICORN_ACCESS_LOG    access log file, "-" for stdout (default), empty to disable
+    PORT                   listen port (default 8000)
+"""
+import gc
+import multiprocessing
+import os
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn_worker.UvicornWorker',
+}
+
+
+def default_workers(kind, cpus):
+    """
+    A sync worker serves one request at a time and spends much of it waiting
+    on the database, so run 2 x CPUs + 1 of them. Threaded and async workers
+    overlap requests themselves and need only one per CPU, plus one.
+    """
+    return cpus * 2 + 1 if kind == 'sync' else cpus + 1
+
+
+worker_kind = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+if worker_kind not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of: {', '.join(WORKER_CLASSES)}")
+
+wsgi_app = 'config.asgi:application' if worker_kind == 'uvicorn' else 'config.wsgi:application'
+worker_class = WORKER_CLASSES[worker_kind]
+workers = int(os.getenv('WEB_CONCURRENCY') or default_workers(worker_kind, multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if worker_kind == 'gthread' else 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+preload_app = True
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+# Spread the restarts so the workers are not all recycled at the same moment
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+# The heartbeat file is touched constantly; keep it off the container's overlay filesystem
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # Objects created while preloading never change; keeping the collector off
+    # them stops it from touching (and so copying) their pages in every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Nothing opened in the master may be shared by the forked workers
+    from django.db import connections
+    connections.close_all()
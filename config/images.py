@@ -0,0 +1,161 @@
+"""
+Resized copies ("derivatives") of uploaded images.
+
+Every tracked image gets one copy per configured width and format, never
+wider than the original, stored next to it:
+
+    products/apple.jpg -> products/apple.320w.webp, products/apple.320w.jpg, ...
+
+They are generated by a Celery task once the upload commits. The widths
+that exist are cached per image for STORED_TIMEOUT; when that entry is
+missing or has expired it is rebuilt from storage, and when the files
+themselves are missing generation is queued again, so derivatives come
+back on their own after a cache flush, or within STORED_TIMEOUT of a lost
+volume. Until they exist, clients fall back to the original.
+"""
+import io
+import os
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from config import metrics
+from config.celery import delay_on_commit
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+# How long the widths found are trusted before storage is checked again
+STORED_TIMEOUT = 60 * 60
+# How long "nothing generated yet" is remembered before storage is checked again
+MISSING_TIMEOUT = 60
+
+# Sent once the derivatives of an image are stored. Arguments: name, widths
+derivatives_ready = Signal()
+
+
+def _cache_key(name):
+    return f'images:derivatives:{name}'
+
+
+def derivative_name(name, width, fmt):
+    """Storage name of the `fmt` copy of `name` at `width` pixels"""
+    root, _ = os.path.splitext(name)
+    return f'{root}.{width}w.{EXTENSIONS[fmt]}'
+
+
+def generate(name):
+    """Store every derivative of the image `name` and return the widths produced"""
+    with default_storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    widths = [width for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS) if width < image.width]
+    for width in widths:
+        resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for fmt in settings.IMAGE_DERIVATIVE_FORMATS:
+            converted = resized.convert('RGBA' if fmt == 'webp' and 'A' in image.getbands() else 'RGB')
+            buffer = io.BytesIO()
+            converted.save(buffer, fmt.upper(), quality=settings.IMAGE_DERIVATIVE_QUALITY, optimize=True)
+            target = derivative_name(name, width, fmt)
+            # Storage.save() would pick a new name rather than replace a stale copy
+            default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+            metrics.increment('image_derivatives_generated', format=fmt)
+
+    cache.set(_cache_key(name), widths, STORED_TIMEOUT)
+    derivatives_ready.send(sender=None, name=name, widths=widths)
+    return widths
+
+
+@shared_task
+def generate_image_derivatives(name):
+    '''Generate the resized copies of an uploaded image (see config.images)'''
+    if not default_storage.exists(name):
+        return f"{name} no longer exists"
+    widths = generate(name)
+    return f"Generated {len(widths)} widths of {name}"
+
+
+def available_widths(name):
+    """
+    Widths whose derivatives of `name` are stored. Checks storage when the
+    cache has forgotten, and queues generation when they are missing.
+    """
+    return available_widths_many([name])[name]
+
+
+def available_widths_many(names):
+    """
+    {name: widths} for many images (a page of products) in one cache round
+    trip; storage is only checked for the names the cache has forgotten.
+    """
+    names = set(names)
+    cached = cache.get_many([_cache_key(name) for name in names])
+    widths = {}
+    for name in names:
+        widths[name] = cached.get(_cache_key(name))
+        if widths[name] is None:
+            widths[name] = _stored_widths(name)
+    return widths
+
+
+def _stored_widths(name):
+    """Widths found in storage, cached; queues generation when there are none"""
+    fmt = settings.IMAGE_DERIVATIVE_FORMATS[-1]
+    widths = [
+        width for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+        if default_storage.exists(derivative_name(name, width, fmt))
+    ]
+    if widths:
+        cache.set(_cache_key(name), widths, STORED_TIMEOUT)
+    else:
+        # Remembered briefly so a busy page queues one generation, not one per request
+        cache.set(_cache_key(name), widths, MISSING_TIMEOUT)
+        metrics.increment('image_derivatives_missing')
+        delay_on_commit(generate_image_derivatives, name)
+    return widths
+
+
+def srcset(field_file, build_url=None, widths=None):
+    """
+    {format: srcset string} for an ImageField value, or None when it is empty
+    or has no derivatives yet. `build_url` turns storage URLs into absolute ones;
+    `widths` are the image's available_widths() when already looked up.
+    """
+    if not field_file:
+        return None
+    if widths is None:
+        widths = available_widths(field_file.name)
+    if not widths:
+        return None
+    build_url = build_url or (lambda url: url)
+    return {
+        fmt: ', '.join(
+            f'{build_url(default_storage.url(derivative_name(field_file.name, width, fmt)))} {width}w'
+            for width in widths
+        )
+        for fmt in settings.IMAGE_DERIVATIVE_FORMATS
+    }
+
+
+def track(model, *field_names):
+    """Generate derivatives whenever a new file is uploaded to one of `model`'s image fields"""
+    def note_uploads(sender, instance, **kwargs):
+        # Files are written (and get their final name) by the save itself
+        instance._image_uploads = [
+            field_name for field_name in field_names
+            if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+        ]
+
+    def queue_derivatives(sender, instance, **kwargs):
+        for field_name in getattr(instance, '_image_uploads', ()):
+            delay_on_commit(generate_image_derivatives, getattr(instance, field_name).name)
+        instance._image_uploads = []
+
+    pre_save.connect(note_uploads, sender=model, weak=False, dispatch_uid=f'images:{model._meta.label}:pre')
+    post_save.connect(queue_derivatives, sender=model, weak=False, dispatch_uid=f'images:{model._meta.label}:post')
@@ -0,0 +1,167 @@
+"""
+Application metrics, kept with prometheus_client.
+
+increment() adds to a counter, observe() records one value in a summary
+(count and sum) and in a <name>_max gauge. Metrics are created on first use,
+with the label names they are first used with. gauge() registers a function
+whose value is computed by the process serving each export, for values read
+from a shared source such as the database.
+
+Each process only holds its own values. With PROMETHEUS_MULTIPROC_DIR set
+in the environment before the process starts, and the directory shared by
+every web worker and Celery worker, each process writes its values to files
+there and the export functions merge them. /api/metrics/ then reports totals
+for the whole service, task metrics included, whichever worker serves the
+scrape. Empty the directory when the service is deployed. Without it
+(runserver, tests) the export is this process's values.
+"""
+import math
+import threading
+
+from django.conf import settings
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Summary, disable_created_metrics, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+disable_created_metrics()
+
+_lock = threading.Lock()
+_registry = CollectorRegistry()
+_metrics = {}
+_maxima = {}
+_gauges = {}
+
+
+class _OnDemandCollector:
+    """Gauges registered with gauge(), computed when collected"""
+
+    def collect(self):
+        for name, function in list(_gauges.items()):
+            yield GaugeMetricFamily(name, name, value=function())
+
+
+_on_demand = _OnDemandCollector()
+_registry.register(_on_demand)
+
+
+def _metric(kind, name, labels):
+    """The labelled child of metric `name`, created on first use"""
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            if kind is Gauge:
+                # The largest value any process has seen
+                metric = Gauge(name, name, sorted(labels), registry=_registry, multiprocess_mode='max')
+            else:
+                metric = kind(name, name, sorted(labels), registry=_registry)
+            _metrics[name] = metric
+    return metric.labels(**labels) if labels else metric
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def increment(name, value=1, **labels):
+    """Add `value` to the counter identified by name and labels"""
+    _metric(Counter, name, labels).inc(value)
+
+
+def get(name, **labels):
+    """This process's value of a counter (0 if it was never incremented)"""
+    return _registry.get_sample_value(f'{name}_total', {k: str(v) for k, v in labels.items()}) or 0
+
+
+def observe(name, value, **labels):
+    """Record one observation (a duration, a size...) in the summary name/labels"""
+    _metric(Summary, name, labels).observe(value)
+    key = _key(name, labels)
+    with _lock:
+        if value <= _maxima.get(key, -math.inf):
+            return
+        _maxima[key] = value
+    _metric(Gauge, f'{name}_max', labels).set(value)
+
+
+def get_summary(name, **labels):
+    """This process's {'count', 'sum', 'max'} of a summary (all 0 if nothing was observed)"""
+    labels = {k: str(v) for k, v in labels.items()}
+    return {
+        'count': _registry.get_sample_value(f'{name}_count', labels) or 0,
+        'sum': _registry.get_sample_value(f'{name}_sum', labels) or 0,
+        'max': _registry.get_sample_value(f'{name}_max', labels) or 0,
+    }
+
+
+def gauge(name, function):
+    """Export the value of function() as gauge `name`, computed at every export"""
+    _gauges[name] = function
+
+
+def export_registry():
+    """Registry holding every process's values when they are shared, this process's otherwise"""
+    if not settings.PROMETHEUS_MULTIPROC_DIR:
+        return _registry
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+    registry.register(_on_demand)
+    return registry
+
+
+def snapshot(registry=None):
+    """All counters as a list of {'name', 'labels', 'value'} dicts"""
+    counters = [
+        {'name': family.name, 'labels': sample.labels, 'value': sample.value}
+        for family in (registry or export_registry()).collect() if family.type == 'counter'
+        for sample in family.samples if sample.name == f'{family.name}_total'
+    ]
+    return sorted(counters, key=lambda counter: _key(counter['name'], counter['labels']))
+
+
+def gauges(registry=None):
+    """Gauges registered with gauge() as a list of {'name', 'labels', 'value'} dicts"""
+    return sorted(
+        (
+            {'name': family.name, 'labels': sample.labels, 'value': sample.value}
+            for family in (registry or export_registry()).collect() if family.name in _gauges
+            for sample in family.samples
+        ),
+        key=lambda gauge: _key(gauge['name'], gauge['labels']),
+    )
+
+
+def summaries(registry=None):
+    """All summaries as a list of {'name', 'labels', 'count', 'sum', 'max'} dicts"""
+    families = list((registry or export_registry()).collect())
+    found = {}
+    for family in families:
+        if family.type != 'summary':
+            continue
+        for sample in family.samples:
+            summary = found.setdefault(_key(family.name, sample.labels), {'count': 0, 'sum': 0, 'max': 0})
+            summary[sample.name[len(family.name) + 1:]] = sample.value
+    for family in families:
+        if family.type == 'gauge' and family.name.endswith('_max'):
+            for sample in family.samples:
+                key = _key(family.name[:-len('_max')], sample.labels)
+                if key in found:
+                    found[key]['max'] = sample.value
+    return [
+        {'name': name, 'labels': dict(labels), **summary}
+        for (name, labels), summary in sorted(found.items())
+    ]
+
+
+def reset():
+    """Drop every metric of this process (used by tests)"""
+    with _lock:
+        for metric in _metrics.values():
+            _registry.unregister(metric)
+        _metrics.clear()
+        _maxima.clear()
+
+
+def render_prometheus(registry=None):
+    """Every metric in the Prometheus text exposition format"""
+    return generate_latest(registry or export_registry()).decode()
@@ -0,0 +1,178 @@
+"""
+Opt-in request instrumentation (PERF_METRICS_ENABLED).
+
+For a sampled share of requests the middleware wraps every database
+connection with an execute wrapper and records, per view and action:
+wall time, query count, SQL time, repeated identical statements (the
+signature of an N+1 loop) and response size. Results go to config.metrics
+and, when PERF_SERVER_TIMING is on, to a Server-Timing response header.
+
+ReplicaMiddleware decides which database a request reads from (see
+config.routers).
+"""
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.state import token_backend
+
+from . import metrics
+from .routers import replica_reads
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """execute_wrapper that counts statements and the time spent running them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Statements that ran more than once, with identical SQL (parameters aside)"""
+        return {sql: count for sql, count in self.statements.items() if count > 1}
+
+
+def view_labels(request):
+    """('ProductViewSet', 'list') for DRF views, the URL name otherwise"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', request.method.lower()
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name or 'unknown', request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return view_class.__name__, actions.get(request.method.lower(), request.method.lower())
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PERF_METRICS_SAMPLE_RATE
+        self.server_timing = settings.PERF_SERVER_TIMING
+        self.duplicate_threshold = settings.PERF_DUPLICATE_QUERY_THRESHOLD
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view, action = view_labels(request)
+        labels = {'view': view, 'action': action}
+        metrics.observe('http_request_seconds', elapsed, **labels)
+        metrics.observe('http_request_queries', recorder.count, **labels)
+        metrics.observe('http_request_db_seconds', recorder.duration, **labels)
+        if not response.streaming:
+            metrics.observe('http_response_bytes', len(response.content), **labels)
+
+        repeated = {sql: count for sql, count in recorder.duplicates.items() if count >= self.duplicate_threshold}
+        if repeated:
+            metrics.increment('http_repeated_queries', sum(repeated.values()), **labels)
+            sql, count = max(repeated.items(), key=lambda item: item[1])
+            logger.warning('%s.%s ran the same query %d times: %s', view, action, count, sql)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+            )
+        return response
+
+
+def _writer_key(kind, value):
+    return f'db:recent-write:{kind}:{value}'
+
+
+def claimed_user_id(request):
+    """
+    Id of the user a request's bearer token or session names, before the view
+    authenticates it. Unverified: it only decides where the request reads from.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header:
+        try:
+            raw_token = authentication.get_raw_token(header)
+            if raw_token is not None:
+                return token_backend.decode(raw_token, verify=False).get(jwt_settings.USER_ID_CLAIM)
+        except (AuthenticationFailed, TokenBackendError):
+            return None
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+class ReplicaMiddleware:
+    """
+    Reads safe requests from a replica, unless the same user (or, for
+    anonymous clients, the same address) completed a write in the last
+    REPLICA_STICKY_SECONDS; keep that above the worst replication lag.
+    Unsafe requests, such as checkout and cart changes, stay on the primary
+    throughout.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = settings.REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                self.remember_write(request)
+            return response
+
+        keys = [_writer_key('address', request.META.get('REMOTE_ADDR'))]
+        user_id = claimed_user_id(request)
+        if user_id is not None:
+            keys.append(_writer_key('user', user_id))
+        if cache.get_many(keys):
+            metrics.increment('db_request_reads', target='primary')
+            return self.get_response(request)
+
+        with replica_reads() as alias:
+            metrics.increment('db_request_reads', target=alias)
+            return self.get_response(request)
+
+    def remember_write(self, request):
+        # DRF views hand the user they authenticated back to the HttpRequest
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            key = _writer_key('user', user.pk)
+        else:
+            key = _writer_key('address', request.META.get('REMOTE_ADDR'))
+        cache.set(key, True, self.sticky_seconds)
@@ -0,0 +1,23 @@
+"""
+Migration operations shared by the apps.
+
+AddIndexConcurrently only exists on PostgreSQL and refuses to run inside a
+transaction. The variant here builds indexes with CREATE INDEX CONCURRENTLY
+(no write lock on a busy table) on PostgreSQL and falls back to the plain
+operation on other databases, so the same migrations still run on SQLite.
+Migrations using it must set atomic = False.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrentlyIfSupported(AddIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,17 @@
+from django.conf import settings
+
+
+class SettingsPageSizeMixin:
+    """
+    Page sizes taken from settings on every request, so they can be tuned per
+    environment. Clients pick a size with ?page_size=, clamped to the maximum.
+    Subclasses name the settings in `page_size_setting` and `max_page_size_setting`.
+    """
+    page_size_query_param = 'page_size'
+    page_size_setting = None
+    max_page_size_setting = None
+
+    def get_page_size(self, request):
+        self.page_size = getattr(settings, self.page_size_setting)
+        self.max_page_size = getattr(settings, self.max_page_size_setting)
+        return super().get_page_size(request)
@@ -0,0 +1,65 @@
+"""
+Read replicas.
+
+The aliases in DATABASE_REPLICAS hold copies of 'default' that trail it by
+the replication lag. ReplicaRouter sends writes, migrations and every read
+made inside a transaction to the primary. Other reads go to a replica only
+inside a replica_reads() block, which config.middleware.ReplicaMiddleware
+opens around safe (GET/HEAD/OPTIONS) requests and reporting code can open
+itself. Everything else, such as unsafe requests, Celery tasks and management
+commands, reads from the primary.
+
+A client that has just written reads from the primary for
+REPLICA_STICKY_SECONDS afterwards (see the middleware), so it sees its own
+writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Alias reads are sent to outside transactions; None reads from the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+
+@contextmanager
+def replica_reads(alias=None):
+    """Send reads in the block to `alias`, by default a random replica (the primary when there are none)"""
+    replicas = settings.DATABASE_REPLICAS
+    alias = alias or (random.choice(replicas) if replicas else DEFAULT_DB_ALIAS)
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Send reads in the block to the primary, even within replica_reads()"""
+    token = _read_alias.set(None)
+    try:
+        yield DEFAULT_DB_ALIAS
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # A transaction must read what it wrote (tests run inside one, too)
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,16 @@
+"""
+Helpers shared by the commands that bulk-load data: products' seed_data
+and the benchmark datasets.
+"""
+from contextlib import contextmanager
+
+
+@contextmanager
+def backdated(model, field_name='created_at'):
+    """Let bulk_create store explicit values in an auto_now_add field"""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
@@ -29,15 +29,18 @@ INSTALLED_APPS = [
     'products',
     'orders',
     'dashboard',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Must be first
+    'config.middleware.PerformanceMiddleware',  # No-op unless PERF_METRICS_ENABLED
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.ReplicaMiddleware',  # No-op without DB_REPLICAS
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,17 +65,76 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Persistent connections: DB_CONN_MAX_AGE seconds a connection is reused across
+# requests and Celery tasks (0 closes it after each one, "none" never does).
+# Reused connections are health-checked first, so one dropped by the server or
+# a pooler is replaced instead of failing the request. config.asgi turns reuse
+# off: ASGI requests run on short-lived threads that cannot hand them on.
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+# DB_TRANSACTION_POOLING=1 when DB_HOST/DB_PORT point at PgBouncer (or another
+# pooler) in transaction mode. Session state does not survive between
+# transactions there, so server-side cursors (QuerySet.iterator()) are turned
+# off and config.db keeps psycopg 3 from preparing statements. Give the
+# database server the same default time zone as TIME_ZONE (UTC).
+DB_TRANSACTION_POOLING = os.getenv('DB_TRANSACTION_POOLING', '0') in ['1', 'true', 'True']
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'config.db',  # django.db.backends.postgresql plus connection metrics
         'NAME': os.getenv('DB_NAME', 'farm_db'),
         'USER': os.getenv('DB_USER', 'farm_user'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'root'),
         'HOST': os.getenv('DB_HOST', 'db'),  # Docker service name
         'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_TRANSACTION_POOLING,
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
+# DB_ENGINE=sqlite runs everything locally without a database server
+# (benchmarks, quick checks); PostgreSQL-only features degrade gracefully
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+    }
+
+# Read replicas of 'default', comma-separated: host[:port] for PostgreSQL,
+# database files for SQLite (handy for trying the routing locally). They
+# become the aliases replica1, replica2, ...; safe requests read from them
+# (see config.routers). Tests read them through 'default'
+DB_REPLICAS = [location for location in os.getenv('DB_REPLICAS', '').split(',') if location]
+DATABASE_REPLICAS = []
+for number, location in enumerate(DB_REPLICAS, 1):
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if replica['ENGINE'] == 'django.db.backends.sqlite3':
+        replica['NAME'] = location
+    else:
+        replica['HOST'], _, port = location.partition(':')
+        replica['PORT'] = port or replica['PORT']
+    DATABASES[f'replica{number}'] = replica
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+# Seconds a client reads from the primary after a write; keep above the worst replication lag
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+# New passwords are hashed with the first hasher. A login whose stored hash
+# uses any other listed hasher, or other Argon2 costs, is rehashed on the spot
+PASSWORD_HASHERS = os.getenv('PASSWORD_HASHERS', ','.join([
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+])).split(',')
+# Argon2id cost: passes, memory in KiB, lanes (19 MiB / 2 / 1 is the OWASP baseline)
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', '19456'))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '1'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -107,7 +169,7 @@ else:
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -118,8 +180,65 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
     'DEFAULT_PAGINATION_CLASS': None,
+    # Login and sign-up throttles (accounts.throttles), counted in the default cache
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('THROTTLE_LOGIN_IP', '20/min'),
+        'login_username': os.getenv('THROTTLE_LOGIN_USERNAME', '5/min'),
+        'register': os.getenv('THROTTLE_REGISTER', '10/hour'),
+    },
 }
 
+# Cache: Redis when REDIS_URL is set (docker-compose), local memory otherwise
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Catalog response cache (see products.cache)
+CATALOG_CACHE_ALIAS = os.getenv('CATALOG_CACHE_ALIAS', 'default')
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+
+# Resized product, category and avatar images (see config.images)
+IMAGE_DERIVATIVE_WIDTHS = [int(width) for width in os.getenv('IMAGE_DERIVATIVE_WIDTHS', '160,320,640,1280').split(',')]
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv('IMAGE_DERIVATIVE_QUALITY', '80'))
+
+# Product catalog pagination (see products.pagination.ProductCursorPagination)
+PRODUCT_PAGE_SIZE = int(os.getenv('PRODUCT_PAGE_SIZE', '24'))
+PRODUCT_MAX_PAGE_SIZE = int(os.getenv('PRODUCT_MAX_PAGE_SIZE', '100'))
+
+# Order list pagination (see orders.pagination)
+ORDER_PAGE_SIZE = int(os.getenv('ORDER_PAGE_SIZE', '50'))
+ORDER_MAX_PAGE_SIZE = int(os.getenv('ORDER_MAX_PAGE_SIZE', '200'))
+
+# Request instrumentation (see config.middleware.PerformanceMiddleware)
+PERF_METRICS_ENABLED = os.getenv('PERF_METRICS_ENABLED', '0') in ['1', 'true', 'True']
+PERF_METRICS_SAMPLE_RATE = float(os.getenv('PERF_METRICS_SAMPLE_RATE', '1.0'))
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', '1') in ['1', 'true', 'True']
+PERF_DUPLICATE_QUERY_THRESHOLD = int(os.getenv('PERF_DUPLICATE_QUERY_THRESHOLD', '5'))
+# Lets a scraper read /api/metrics/ with "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Directory every web and Celery worker process writes its metrics to, so
+# /api/metrics/ reports totals for the service (see config.metrics). Read by
+# prometheus_client from the environment at startup; empty it on deploy
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+
+# Async (ASGI) views, per worker process (see config.async_views): every request
+# in flight holds a database connection, and so does every query the dashboard
+# runs concurrently. Keep workers x (both limits) below the server's max_connections.
+ASYNC_REQUEST_CONCURRENCY = int(os.getenv('ASYNC_REQUEST_CONCURRENCY', '20'))
+ASYNC_QUERY_CONCURRENCY = int(os.getenv('ASYNC_QUERY_CONCURRENCY', '10'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -129,9 +248,22 @@ SIMPLE_JWT = {
 }
 
 AUTH_USER_MODEL = 'accounts.User'
+# Seconds request.user is served from the cache (see accounts.authentication)
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '60'))
 
-CELERY_BROKER_URL = 'django://'
-CELERY_RESULT_BACKEND = 'django-db'
+# Celery: the Redis service is broker and result store (docker-compose sets
+# REDIS_URL); CELERY_BROKER_URL / CELERY_RESULT_BACKEND override either one
+# ('django-db' still selects django_celery_results). Without any broker, tasks
+# run inline (eager) so local runs and tests need neither Redis nor a worker.
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL') or REDIS_URL or 'memory://'
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND') or REDIS_URL or None
+CELERY_TASK_ALWAYS_EAGER = os.getenv(
+    'CELERY_TASK_ALWAYS_EAGER', '0' if CELERY_BROKER_URL != 'memory://' else '1'
+) in ['1', 'true', 'True']
+CELERY_TASK_EAGER_PROPAGATES = True
+# Every task here is fire-and-forget: nothing ever reads a result, so none is
+# stored unless a task sets ignore_result=False
+CELERY_TASK_IGNORE_RESULT = True
 INSTALLED_APPS += ['django_celery_results']
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
@@ -0,0 +1,388 @@
+import io
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from products.cache import get_cache
+from products.models import Category, Product
+from products.views import ProductViewSet
+from . import images, metrics
+from .async_views import run_concurrently
+from .middleware import ReplicaMiddleware
+from .routers import ReplicaRouter, primary_reads, replica_reads
+
+User = get_user_model()
+
+
+@override_settings(PERF_METRICS_ENABLED=True, PERF_METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN='scrape-me')
+class PerformanceMiddlewareTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.admin = User.objects.create_user(username='admin_test', password='test123', is_staff=True)
+        category = Category.objects.create(name='Test Category')
+        Product.objects.bulk_create([
+            Product(seller=self.seller, category=category, name=f'Product {i}', price=5, quantity=10)
+            for i in range(3)
+        ])
+
+    def test_records_view_action_and_server_timing(self):
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get('/api/products/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+        labels = {'view': 'ProductViewSet', 'action': 'list'}
+        self.assertEqual(metrics.get_summary('http_request_seconds', **labels)['count'], 1)
+        self.assertEqual(metrics.get_summary('http_request_queries', **labels)['sum'], 1)
+        self.assertEqual(metrics.get_summary('http_response_bytes', **labels)['sum'], len(response.content))
+
+    @override_settings(PERF_DUPLICATE_QUERY_THRESHOLD=3)
+    def test_flags_repeated_queries(self):
+        self.client.force_authenticate(user=self.seller)
+        # Without select_related every row loads its seller and category separately
+        with mock.patch.object(ProductViewSet, 'get_queryset', lambda view: Product.objects.all()), \
+                self.assertLogs('config.middleware', 'WARNING') as logs:
+            self.client.get('/api/products/products/')
+        self.assertIn('ProductViewSet.list ran the same query 3 times', logs.output[0])
+        self.assertEqual(metrics.get('http_repeated_queries', view='ProductViewSet', action='list'), 6)
+
+    @override_settings(PERF_METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_recorded(self):
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get('/api/products/products/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.summaries(), [])
+
+    def test_prometheus_export(self):
+        self.client.force_authenticate(user=self.seller)
+        self.client.get('/api/products/products/')
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/metrics/', {'format': 'prometheus'}, HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_seconds summary', body)
+        self.assertRegex(body, r'http_request_queries_count\{action="list",view="ProductViewSet"\} 1\.0\n')
+
+    def test_metrics_need_admin_or_token(self):
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.client.force_authenticate(user=self.seller)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.force_authenticate(user=self.admin)
+        self.assertIn('summaries', self.client.get('/api/metrics/').data)
+
+
+class SharedMetricsMixin:
+    """Values recorded by other processes (web and Celery workers) sharing PROMETHEUS_MULTIPROC_DIR"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def run_process(self, code):
+        """Run `code` in a new Django process on the test database, writing its metrics to the shared directory"""
+        subprocess.run(
+            [sys.executable, '-c', f'import django\ndjango.setup()\n{textwrap.dedent(code)}'],
+            env={**os.environ, 'DB_NAME': connection.settings_dict['NAME'], 'PROMETHEUS_MULTIPROC_DIR': self.directory},
+            check=True,
+        )
+
+    def scrape(self):
+        with self.settings(PROMETHEUS_MULTIPROC_DIR=self.directory):
+            response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+
+@override_settings(METRICS_TOKEN='scrape-me')
+class SharedMetricsTestCase(SharedMetricsMixin, TestCase):
+    def test_values_of_every_process_are_added_up(self):
+        code = "from config import metrics; metrics.increment('jobs_done', 2, queue='a'); metrics.observe('job_seconds', {})"
+        self.run_process(code.format(0.5))
+        self.run_process(code.format(1.5))
+
+        data = self.scrape()
+        self.assertIn({'name': 'jobs_done', 'labels': {'queue': 'a'}, 'value': 4.0}, data['counters'])
+        self.assertIn(
+            {'name': 'job_seconds', 'labels': {}, 'count': 2.0, 'sum': 2.0, 'max': 1.5}, data['summaries']
+        )
+
+    def test_catalog_cache_counters_of_every_worker(self):
+        # Each worker has its own local-memory cache: one miss, then hits
+        code = """
+            from django.test import RequestFactory
+            from rest_framework.response import Response
+            from products.cache import CachedResponseMixin
+
+            class View(CachedResponseMixin):
+                cache_name = 'products'
+                action = 'list'
+
+                def get_cache_scopes(self):
+                    return []
+
+            request = RequestFactory(HTTP_HOST='localhost').get('/api/products/products/')
+            for _ in range(3):
+                View().cached_response(lambda request: Response({}), request)
+        """
+        self.run_process(code)
+        self.run_process(code)
+
+        counters = self.scrape()['counters']
+        self.assertIn({'name': 'catalog_cache_misses', 'labels': {'view': 'products'}, 'value': 2.0}, counters)
+        self.assertIn({'name': 'catalog_cache_hits', 'labels': {'view': 'products'}, 'value': 4.0}, counters)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'The worker process needs a database it can connect to')
+@override_settings(METRICS_TOKEN='scrape-me')
+class TaskMetricsTestCase(SharedMetricsMixin, TransactionTestCase):
+    def test_metrics_of_tasks_run_by_a_worker(self):
+        seller = User.objects.create_user(username='seller_test', email='seller@example.com', user_type='seller')
+        category = Category.objects.create(name='Test Category')
+        Product.objects.create(seller=seller, category=category, name='Low', price=5, quantity=2)
+
+        # Run by a worker process, the way a queued task is, not eagerly in this one
+        self.run_process("from products.tasks import check_low_stock; check_low_stock.apply(throw=True)")
+
+        counters = self.scrape()['counters']
+        self.assertIn({'name': 'task_batches', 'labels': {'task': 'check_low_stock'}, 'value': 1.0}, counters)
+        self.assertIn({'name': 'task_items', 'labels': {'task': 'check_low_stock'}, 'value': 1.0}, counters)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Instrumented backend wraps PostgreSQL')
+class ConnectionMetricsTestCase(TestCase):
+    def test_new_connections_are_counted_and_timed(self):
+        metrics.reset()
+        # A connection of its own, so the test transaction is left alone
+        extra = connections.create_connection('default')
+        try:
+            extra.ensure_connection()
+            extra.ensure_connection()
+        finally:
+            extra.close()
+        self.assertEqual(metrics.get('db_connections_opened', alias='default'), 1)
+        self.assertEqual(metrics.get_summary('db_connect_seconds', alias='default')['count'], 1)
+
+
+class RunConcurrentlyTestCase(TransactionTestCase):
+    def test_queries_run_at_the_same_time(self):
+        User.objects.create_user(username='someone', password='test123')
+        # Both queries have to be in flight before either can finish
+        barrier = threading.Barrier(2, timeout=5)
+
+        def count_users():
+            barrier.wait()
+            return User.objects.count()
+
+        self.assertEqual(async_to_sync(run_concurrently)(count_users, count_users), [1, 1])
+
+
+class GunicornConfigTestCase(SimpleTestCase):
+    def load(self, **env):
+        with mock.patch.dict(os.environ, env), mock.patch('multiprocessing.cpu_count', return_value=4):
+            return runpy.run_path(str(settings.BASE_DIR / 'config' / 'gunicorn.py'))
+
+    def test_worker_class_and_count(self):
+        config = self.load(GUNICORN_WORKER_CLASS='sync', WEB_CONCURRENCY='')
+        self.assertEqual((config['worker_class'], config['workers'], config['threads']), ('sync', 9, 1))
+        self.assertEqual(config['wsgi_app'], 'config.wsgi:application')
+        self.assertTrue(config['preload_app'])
+
+        config = self.load(GUNICORN_WORKER_CLASS='gthread', WEB_CONCURRENCY='')
+        self.assertEqual((config['workers'], config['threads']), (5, 4))
+
+        config = self.load(GUNICORN_WORKER_CLASS='uvicorn', WEB_CONCURRENCY='3')
+        self.assertEqual(config['worker_class'], 'uvicorn_worker.UvicornWorker')
+        self.assertEqual(config['wsgi_app'], 'config.asgi:application')
+        self.assertEqual(config['workers'], 3)
+
+    def test_unknown_worker_class_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.load(GUNICORN_WORKER_CLASS='eventlet')
+
+
+def upload(width, height, name='photo.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'green').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[160, 320, 640], IMAGE_DERIVATIVE_FORMATS=['webp', 'jpeg'])
+class ImageDerivativesTestCase(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        cache.clear()
+        get_cache().clear()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.category = Category.objects.create(name='Test Category')
+
+    def create_product(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                seller=self.seller, category=self.category, name='Apples', description='Red',
+                price=1, quantity=5, image=image,
+            )
+
+    def test_upload_generates_smaller_copies(self):
+        product = self.create_product(upload(500, 250))
+        name = product.image.name
+        self.assertEqual(images.available_widths(name), [160, 320])
+        with default_storage.open(images.derivative_name(name, 320, 'webp')) as derivative:
+            resized = Image.open(derivative)
+            self.assertEqual((resized.format, resized.size), ('WEBP', (320, 160)))
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='customer_test', password='test123'))
+        response = client.get(f'/api/products/products/{product.id}/')
+        srcset = response.data['image_srcset']
+        self.assertEqual(set(srcset), {'webp', 'jpeg'})
+        self.assertTrue(srcset['webp'].startswith('http://testserver/media/products/'))
+        self.assertTrue(srcset['webp'].endswith('.320w.webp 320w'))
+
+    def test_missing_copies_are_regenerated_lazily(self):
+        product = self.create_product(upload(500, 250))
+        name = product.image.name
+        default_storage.delete(images.derivative_name(name, 160, 'jpeg'))
+        default_storage.delete(images.derivative_name(name, 320, 'jpeg'))
+        cache.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(images.srcset(product.image))
+        self.assertTrue(default_storage.exists(images.derivative_name(name, 160, 'jpeg')))
+        self.assertEqual(images.available_widths(name), [160, 320])
+
+    def test_lost_copies_are_noticed_once_the_entry_expires(self):
+        product = self.create_product(upload(500, 250))
+        name = product.image.name
+        for width in (160, 320):
+            for fmt in settings.IMAGE_DERIVATIVE_FORMATS:
+                default_storage.delete(images.derivative_name(name, width, fmt))
+        self.assertEqual(images.available_widths(name), [160, 320])
+
+        later = time.time() + images.STORED_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(images.available_widths(name), [])
+        self.assertTrue(default_storage.exists(images.derivative_name(name, 320, 'webp')))
+
+    def test_catalog_page_looks_up_widths_at_once(self):
+        products = [self.create_product(upload(500, 250)) for _ in range(3)]
+        cache.delete(images._cache_key(products[0].image.name))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='customer_test', password='test123'))
+
+        with mock.patch('config.images.cache', wraps=cache) as image_cache, \
+                mock.patch('config.images.default_storage.exists', wraps=default_storage.exists) as exists:
+            response = client.get('/api/products/products/')
+        self.assertTrue(all(product['image_srcset'] for product in response.data['results']))
+        self.assertEqual(image_cache.get_many.call_count, 1)
+        image_cache.get.assert_not_called()
+        # Only the forgotten image is looked for in storage, once per width
+        self.assertEqual(exists.call_count, 3)
+
+    def test_small_originals_are_served_as_they_are(self):
+        product = self.create_product(upload(100, 100))
+        self.assertIsNone(images.srcset(product.image))
+        with self.captureOnCommitCallbacks() as callbacks:
+            images.srcset(product.image)
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.middleware = ReplicaMiddleware(self.view)
+        self.factory = RequestFactory()
+        self.status = 200
+
+    def view(self, request):
+        """Reports where the request would read a product from"""
+        request.user = getattr(self, 'writer', None) or request.user
+        return HttpResponse(self.router.db_for_read(Product), status=self.status)
+
+    def call(self, method, user=None, address='10.0.0.1'):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        request = getattr(self.factory, method)('/api/products/products/', REMOTE_ADDR=address, **headers)
+        request.user = mock.Mock(is_authenticated=False)
+        self.writer = user
+        return self.middleware(request).content.decode()
+
+    def test_reads_follow_the_block_they_run_in(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+        with replica_reads() as alias:
+            self.assertEqual(alias, 'replica1')
+            self.assertEqual(self.router.db_for_read(Product), 'replica1')
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'products'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'products'))
+
+    def test_safe_requests_read_from_a_replica(self):
+        self.assertEqual(self.call('get'), 'replica1')
+        self.assertEqual(self.call('options'), 'replica1')
+        self.assertEqual(self.call('post'), 'default')
+
+    def test_writers_read_from_the_primary_for_a_while(self):
+        writer, other = User(id=41, username='writer'), User(id=42, username='other')
+        self.assertEqual(self.call('get', writer), 'replica1')
+
+        self.status = 400
+        self.call('post', writer)
+        self.assertEqual(self.call('get', writer), 'replica1')
+
+        self.status = 201
+        self.call('post', writer)
+        self.status = 200
+        self.assertEqual(self.call('get', writer), 'default')
+        self.assertEqual(self.call('get', writer, address='10.0.0.2'), 'default')
+        self.assertEqual(self.call('get', other), 'replica1')
+
+        cache.clear()  # the sticky window has passed
+        self.assertEqual(self.call('get', writer), 'replica1')
+
+    def test_anonymous_writers_are_recognised_by_address(self):
+        self.call('post')
+        self.assertEqual(self.call('get'), 'default')
+        self.assertEqual(self.call('get', address='10.0.0.2'), 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_unused_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaMiddleware(self.view)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingInTransactionTestCase(TestCase):
+    def test_transactions_read_from_the_primary(self):
+        with replica_reads():
+            self.assertEqual(ReplicaRouter().db_for_read(Product), 'default')
+            self.assertEqual(Product.objects.all().db, 'default')
@@ -20,16 +20,31 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
+from accounts.views import LoginView
+from dashboard import async_views as dashboard_async
+from products import async_views as products_async
+from .views import MetricsView
+
+# Async (ASGI) twins of the read-heavy endpoints; same payloads as the DRF views
+async_urlpatterns = [
+    path('products/categories/', products_async.AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('products/products/', products_async.AsyncProductListView.as_view(), name='async-product-list'),
+    path('products/products/<int:pk>/', products_async.AsyncProductDetailView.as_view(), name='async-product-detail'),
+    path('dashboard/seller/', dashboard_async.AsyncSellerDashboardView.as_view(), name='async-seller-dashboard'),
+    path('dashboard/seller/revenue/', dashboard_async.AsyncSellerRevenueView.as_view(), name='async-seller-revenue'),
+]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
     path('api/products/', include('products.urls')),
     path('api/orders/', include('orders.urls')),
-    path('api/', include('dashboard.urls')),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/dashboard/', include('dashboard.urls')),
+    path('api/token/', LoginView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/async/', include(async_urlpatterns)),
     path('', TemplateView.as_view(template_name='index.html'), name='frontend'),
 ]
 
@@ -0,0 +1,63 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.views import APIView
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.permissions import BasePermission, IsAdminUser
+from . import metrics
+
+METRICS_TOKEN_AUTH = 'metrics-token'
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Accept "Authorization: Bearer <METRICS_TOKEN>" so scrapers need no user account"""
+
+    def authenticate(self, request):
+        header = request.headers.get('Authorization', '')
+        if settings.METRICS_TOKEN and hmac.compare_digest(header, f'Bearer {settings.METRICS_TOKEN}'):
+            return AnonymousUser(), METRICS_TOKEN_AUTH
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+class HasMetricsToken(BasePermission):
+    def has_permission(self, request, view):
+        return request.auth == METRICS_TOKEN_AUTH
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context and renderer_context.get('response')
+        if response is not None and response.status_code != 200:
+            return f"# {data.get('detail', '')}\n"
+        return metrics.render_prometheus()
+
+
+class MetricsView(APIView):
+    """
+    Counters, gauges and summaries (cache hits, outbox lag, request timings,
+    task progress, ...),
+    totals of every web and Celery worker process when they share
+    PROMETHEUS_MULTIPROC_DIR (see config.metrics). ?format=prometheus returns
+    the text exposition format.
+    """
+    authentication_classes = [MetricsTokenAuthentication, *APIView.authentication_classes]
+    permission_classes = [IsAdminUser | HasMetricsToken]
+    renderer_classes = [JSONRenderer, PrometheusRenderer]
+
+    def get(self, request):
+        registry = metrics.export_registry()
+        return Response({
+            'counters': metrics.snapshot(registry),
+            'gauges': metrics.gauges(registry),
+            'summaries': metrics.summaries(registry),
+        })
@@ -1,3 +1,15 @@
 from django.contrib import admin
+from .models import SellerDailySales, SellerProductSales
 
-# Register your models here.
+
+@admin.register(SellerDailySales)
+class SellerDailySalesAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'day', 'status', 'revenue', 'items_sold', 'orders']
+    list_filter = ['status', 'day']
+    search_fields = ['seller__username']
+
+
+@admin.register(SellerProductSales)
+class SellerProductSalesAdmin(admin.ModelAdmin):
+    list_display = ['product', 'seller', 'revenue', 'items_sold']
+    search_fields = ['product__name', 'seller__username']
@@ -0,0 +1,35 @@
+"""
+Async twins of the seller dashboard endpoints, served under /api/async/.
+"""
+from django.utils import timezone
+
+from config.async_views import AsyncAPIView, run_concurrently
+from .views import daily_revenue, dashboard_payload, dashboard_queries
+
+
+class AsyncSellerDashboardView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user
+
+        if user.user_type != 'seller':
+            return self.render({'error': 'Only sellers can access dashboard'}, 403)
+
+        today = timezone.localdate()
+        queries = dashboard_queries(user, today)
+        results = dict(zip(queries, await run_concurrently(*queries.values())))
+        return self.render(dashboard_payload(results, today))
+
+
+class AsyncSellerRevenueView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user
+
+        if user.user_type != 'seller':
+            return self.render({'error': 'Only sellers can access this'}, 403)
+
+        days = int(request.GET.get('days', 30))
+
+        return self.render({
+            'period_days': days,
+            'daily_revenue': [row async for row in daily_revenue(user, days)]
+        })
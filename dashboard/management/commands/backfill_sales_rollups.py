@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from dashboard import rollups
+from dashboard.models import SellerDailySales, SellerProductSales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the seller sales rollups from the full order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding seller sales rollups...')
+
+        rollups.rebuild(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {SellerDailySales.objects.count()} daily rows '
+            f'and {SellerProductSales.objects.count()} product rows'
+        ))
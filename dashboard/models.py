@@ -1,3 +1,59 @@
 from django.db import models
+from django.conf import settings
+from orders.models import Order
+from products.models import Product
+
+
+class SellerDailySales(models.Model):
+    """Sales totals per seller, per day and per order status (maintained by dashboard.rollups)"""
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Seller daily sales'
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'day', 'status'], name='unique_seller_day_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} {self.day} {self.status}: {self.revenue}"
+
+
+class SellerProductSales(models.Model):
+    """All-time sales totals per product, used for the top products list"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='sales_rollup')
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='product_sales')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Seller product sales'
+        indexes = [
+            models.Index(fields=['seller', '-items_sold'], name='product_sales_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.items_sold} sold"
+
+
+class SalesDelta(models.Model):
+    """
+    A change to the rollups not applied yet (see dashboard.rollups). Rows with
+    a day and status add to SellerDailySales, rows with a product add to
+    SellerProductSales; an order's line does both.
+    """
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    product = models.ForeignKey(Product, null=True, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField(null=True)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, blank=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.seller_id} {self.day} {self.status or '-'} product {self.product_id}: {self.revenue}"
 
-# Create your models here.
@@ -0,0 +1,213 @@
+"""
+Seller sales rollups (SellerDailySales, SellerProductSales).
+
+Order changes do not update the rollup rows themselves: record_order() and
+the other record_* functions only append SalesDelta rows in the caller's
+transaction, which never waits on another checkout. fold(), run every few
+seconds by dashboard.tasks.fold_sales_deltas, adds a batch of deltas to the
+rollups and deletes them, so dashboards trail orders by a few seconds.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import OrderItem
+from .models import SalesDelta, SellerDailySales, SellerProductSales
+
+DAILY_FIELDS = ['seller', 'day', 'status', 'revenue', 'items_sold', 'orders']
+PRODUCT_FIELDS = ['product', 'seller', 'revenue', 'items_sold']
+
+FOLD_BATCH_SIZE = 5000
+
+
+def _increment(model, fields, conflict_fields, rows):
+    """
+    Insert `rows` (tuples ordered like `fields`) into a rollup table, adding
+    the numeric columns onto any row that already exists for the same
+    `conflict_fields`. One INSERT ... ON CONFLICT DO UPDATE statement, which
+    both PostgreSQL and SQLite understand.
+    """
+    if not rows:
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [qn(model._meta.get_field(name).column) for name in fields]
+    conflict_columns = [qn(model._meta.get_field(name).column) for name in conflict_fields]
+    increment_columns = [
+        qn(model._meta.get_field(name).column)
+        for name in fields if name in ('revenue', 'items_sold', 'orders')
+    ]
+    row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES {', '.join([row_sql] * len(rows))} "
+        f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET "
+        + ', '.join(f'{column} = {table}.{column} + EXCLUDED.{column}' for column in increment_columns)
+    )
+    # Sorted rows keep the lock order stable between concurrent folds
+    params = [value for row in sorted(rows) for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def record_order(order, items):
+    """Add a newly placed order to the rollups: one delta per line"""
+    day = timezone.localtime(order.created_at).date()
+    sellers = set()
+    deltas = []
+    for item in items:
+        seller_id = item.product.seller_id
+        deltas.append(SalesDelta(
+            seller_id=seller_id, product_id=item.product_id, day=day, status=order.status,
+            revenue=item.price * item.quantity, items_sold=item.quantity,
+            # The order counts once per seller, on its first line
+            orders=0 if seller_id in sellers else 1,
+        ))
+        sellers.add(seller_id)
+    SalesDelta.objects.bulk_create(deltas)
+
+
+def daily_contributions(items):
+    """Group order items by seller, day and order status, as stored in SellerDailySales"""
+    return items.values(
+        seller=F('product__seller'),
+        day=TruncDate('order__created_at'),
+        order_status=F('order__status'),
+    ).annotate(
+        revenue=Sum(F('price') * F('quantity')),
+        quantity=Sum('quantity'),
+        order_count=Count('order', distinct=True),
+    ).order_by()
+
+
+def product_contributions(items):
+    """Group order items by product, as stored in SellerProductSales"""
+    return items.values('product').annotate(
+        seller=F('product__seller'),
+        revenue=Sum(F('price') * F('quantity')),
+        quantity=Sum('quantity'),
+    ).order_by()
+
+
+def record_status_change(order_ids, from_status, to_status):
+    """Move the given orders' totals from one status bucket to another"""
+    deltas = []
+    for row in daily_contributions(OrderItem.objects.filter(order_id__in=order_ids)):
+        for status, sign in ((from_status, -1), (to_status, 1)):
+            deltas.append(SalesDelta(
+                seller_id=row['seller'], day=row['day'], status=status,
+                revenue=sign * row['revenue'], items_sold=sign * row['quantity'], orders=sign * row['order_count'],
+            ))
+    SalesDelta.objects.bulk_create(deltas)
+
+
+def record_deletion(order_ids):
+    """Take orders that are about to be deleted (their items still exist) out of both rollups"""
+    items = OrderItem.objects.filter(order_id__in=order_ids)
+    SalesDelta.objects.bulk_create([
+        SalesDelta(
+            seller_id=row['seller'], day=row['day'], status=row['order_status'],
+            revenue=-row['revenue'], items_sold=-row['quantity'], orders=-row['order_count'],
+        )
+        for row in daily_contributions(items)
+    ] + [
+        SalesDelta(
+            seller_id=row['seller'], product_id=row['product'],
+            revenue=-row['revenue'], items_sold=-row['quantity'],
+        )
+        for row in product_contributions(items)
+    ])
+
+
+def fold(batch_size=FOLD_BATCH_SIZE):
+    """
+    Add up to `batch_size` deltas, oldest first, to the rollups and delete
+    them; return how many were folded. Deltas are claimed with SKIP LOCKED,
+    so folds running side by side never apply the same one twice.
+    """
+    with transaction.atomic():
+        deltas = list(
+            SalesDelta.objects.order_by('id').select_for_update(skip_locked=True).values_list(
+                'id', 'seller_id', 'product_id', 'day', 'status', 'revenue', 'items_sold', 'orders'
+            )[:batch_size]
+        )
+        if not deltas:
+            return 0
+
+        daily = defaultdict(lambda: [Decimal('0.00'), 0, 0])
+        per_product = {}
+        for _, seller_id, product_id, day, status, revenue, items_sold, orders in deltas:
+            if day is not None:
+                totals = daily[seller_id, day, status]
+                totals[0] += revenue
+                totals[1] += items_sold
+                totals[2] += orders
+            if product_id is not None:
+                totals = per_product.setdefault(product_id, [seller_id, Decimal('0.00'), 0])
+                totals[1] += revenue
+                totals[2] += items_sold
+
+        _increment(
+            SellerDailySales, DAILY_FIELDS, ['seller', 'day', 'status'],
+            [(*key, *totals) for key, totals in daily.items()]
+        )
+        _increment(
+            SellerProductSales, PRODUCT_FIELDS, ['product'],
+            [(product_id, *totals) for product_id, totals in per_product.items()]
+        )
+        SalesDelta.objects.filter(id__in=[delta[0] for delta in deltas]).delete()
+    return len(deltas)
+
+
+@transaction.atomic
+def rebuild(batch_size=5000):
+    """Recompute both rollup tables from the full order history, dropping pending deltas"""
+    if connection.vendor == 'postgresql':
+        # Checkouts block on their delta insert until the rebuild commits, and
+        # the rebuild waits for in-flight checkouts and folds, so no order is
+        # lost or counted twice
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'LOCK TABLE {qn(SalesDelta._meta.db_table)}, {qn(SellerDailySales._meta.db_table)}, '
+                f'{qn(SellerProductSales._meta.db_table)} IN EXCLUSIVE MODE'
+            )
+
+    SalesDelta.objects.all().delete()
+    SellerDailySales.objects.all().delete()
+    SellerProductSales.objects.all().delete()
+
+    daily = daily_contributions(OrderItem.objects.all())
+    _bulk_insert(SellerDailySales, (
+        SellerDailySales(
+            seller_id=row['seller'], day=row['day'], status=row['order_status'],
+            revenue=row['revenue'], items_sold=row['quantity'], orders=row['order_count'],
+        )
+        for row in daily.iterator(chunk_size=batch_size)
+    ), batch_size)
+
+    per_product = product_contributions(OrderItem.objects.all())
+    _bulk_insert(SellerProductSales, (
+        SellerProductSales(
+            product_id=row['product'], seller_id=row['seller'],
+            revenue=row['revenue'], items_sold=row['quantity'],
+        )
+        for row in per_product.iterator(chunk_size=batch_size)
+    ), batch_size)
+
+
+def _bulk_insert(model, objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
@@ -0,0 +1,23 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from orders.models import Order
+from orders.signals import order_placed, order_status_changed
+from . import rollups
+
+
+@receiver(order_placed)
+def add_order_to_rollups(sender, order, items, **kwargs):
+    '''Keep seller sales rollups in step with new orders'''
+    rollups.record_order(order, items)
+
+
+@receiver(order_status_changed)
+def move_order_status_in_rollups(sender, order_ids, from_status, to_status, **kwargs):
+    '''Move order totals between status buckets when orders change status'''
+    rollups.record_status_change(order_ids, from_status, to_status)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    '''Take a deleted order out of the rollups while its items still exist'''
+    rollups.record_deletion([instance.id])
@@ -0,0 +1,30 @@
+import time
+from celery import shared_task
+from config import metrics
+from . import rollups
+
+# Folds run every few seconds; a backlog is continued by a fresh task sooner
+FOLD_TIME_BUDGET = 30
+
+@shared_task(bind=True)
+def fold_sales_deltas(self, batch_size=rollups.FOLD_BATCH_SIZE, time_budget=FOLD_TIME_BUDGET):
+    '''Add pending sales deltas to the seller rollups, batch by batch (see dashboard.rollups)'''
+    started = time.monotonic()
+    folded = 0
+    try:
+        while True:
+            count = rollups.fold(batch_size)
+            folded += count
+            metrics.increment('task_batches', task='fold_sales_deltas')
+            if count < batch_size:
+                break
+
+            if time.monotonic() - started > time_budget:
+                self.apply_async(kwargs={'batch_size': batch_size, 'time_budget': time_budget})
+                metrics.increment('task_continuations', task='fold_sales_deltas')
+                break
+    finally:
+        metrics.increment('task_items', folded, task='fold_sales_deltas')
+        metrics.increment('task_seconds', time.monotonic() - started, task='fold_sales_deltas')
+
+    return f"Folded {folded} sales deltas"
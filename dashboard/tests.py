@@ -1,8 +1,13 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 from products.models import Product, Category
 from orders.models import Order, OrderItem
+from orders.checkout import place_order
+from . import rollups
+from .models import SalesDelta, SellerDailySales, SellerProductSales
+from .tasks import fold_sales_deltas
 
 User = get_user_model()
 
@@ -45,3 +50,134 @@ class DashboardTestCase(TestCase):
         self.client.force_authenticate(user=self.customer)
         response = self.client.get('/api/dashboard/seller/')
         self.assertEqual(response.status_code, 403)
+
+
+class SalesRollupTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='seller_test',
+            password='test123',
+            user_type='seller'
+        )
+        self.customer = User.objects.create_user(
+            username='customer_test',
+            password='test123',
+            user_type='customer'
+        )
+        category = Category.objects.create(name='Test Category')
+        self.apples = Product.objects.create(
+            seller=self.seller, category=category, name='Apples',
+            description='Test Description', price=2.00, quantity=100
+        )
+        self.pears = Product.objects.create(
+            seller=self.seller, category=category, name='Pears',
+            description='Test Description', price=3.00, quantity=100
+        )
+
+    def snapshot(self):
+        rollups.fold()
+        daily = sorted(SellerDailySales.objects.exclude(orders=0).values_list(
+            'seller_id', 'day', 'status', 'revenue', 'items_sold', 'orders'))
+        products = sorted(SellerProductSales.objects.values_list(
+            'product_id', 'seller_id', 'revenue', 'items_sold'))
+        return daily, products
+
+    def test_checkout_updates_dashboard(self):
+        place_order(self.customer, [(self.apples.id, 5), (self.pears.id, 1)])
+        place_order(self.customer, [(self.apples.id, 2)])
+        rollups.fold()
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get('/api/dashboard/seller/')
+        self.assertEqual(response.data['sales']['total_revenue'], 17.0)
+        self.assertEqual(response.data['sales']['total_orders'], 2)
+        self.assertEqual(response.data['sales']['items_sold'], 8)
+        self.assertEqual(response.data['sales']['recent_sales_30_days'], 17.0)
+        self.assertEqual(response.data['monthly_sales'][-1]['sales'], 17.0)
+        self.assertEqual(response.data['top_products'][0]['product__name'], 'Apples')
+        self.assertEqual(response.data['top_products'][0]['total_sold'], 7)
+
+        response = self.client.get('/api/dashboard/seller/revenue/', {'days': 7})
+        self.assertEqual(len(response.data['daily_revenue']), 1)
+        self.assertEqual(response.data['daily_revenue'][0]['orders'], 2)
+
+    def test_status_change_moves_order_between_buckets(self):
+        order = place_order(self.customer, [(self.apples.id, 5)])
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'shipped'
+        order.save()
+        rollups.fold()
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get('/api/dashboard/seller/')
+        statuses = {row['status']: row['count'] for row in response.data['order_statuses']}
+        self.assertEqual(statuses['shipped'], 1)
+        self.assertEqual(statuses.get('pending', 0), 0)
+
+    def test_checkout_only_appends_deltas(self):
+        place_order(self.customer, [(self.apples.id, 5), (self.pears.id, 1)])
+        place_order(self.customer, [(self.apples.id, 2)])
+        self.assertFalse(SellerDailySales.objects.exists())
+        self.assertEqual(SalesDelta.objects.count(), 3)
+
+        self.assertEqual(fold_sales_deltas(batch_size=2), 'Folded 3 sales deltas')
+        self.assertFalse(SalesDelta.objects.exists())
+        self.assertEqual(
+            list(SellerDailySales.objects.values_list('status', 'revenue', 'items_sold', 'orders')),
+            [('pending', 17, 8, 2)],
+        )
+        self.assertEqual(
+            sorted(SellerProductSales.objects.values_list('product_id', 'items_sold')),
+            [(self.apples.id, 7), (self.pears.id, 1)],
+        )
+
+    def test_rebuild_matches_incremental_rollups(self):
+        place_order(self.customer, [(self.apples.id, 5), (self.pears.id, 1)])
+        order = Order.objects.get(pk=place_order(self.customer, [(self.pears.id, 4)]).pk)
+        order.status = 'cancelled'
+        order.save()
+
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_deleted_order_leaves_the_rollups(self):
+        place_order(self.customer, [(self.apples.id, 5), (self.pears.id, 1)])
+        before = self.snapshot()
+        order = place_order(self.customer, [(self.apples.id, 2)])
+
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.delete(f'/api/orders/orders/{order.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.snapshot(), before)
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get('/api/dashboard/seller/')
+        self.assertEqual(response.data['sales']['total_revenue'], 13.0)
+        self.assertEqual(response.data['sales']['total_orders'], 1)
+        self.assertEqual(response.data['sales']['items_sold'], 6)
+
+    def test_dashboard_query_count_is_constant(self):
+        for _ in range(5):
+            place_order(self.customer, [(self.apples.id, 1), (self.pears.id, 1)])
+        rollups.fold()
+
+        self.client.force_authenticate(user=self.seller)
+        with self.assertNumQueries(5):
+            self.client.get('/api/dashboard/seller/')
+
+    def test_async_dashboard_matches_sync(self):
+        place_order(self.customer, [(self.apples.id, 5), (self.pears.id, 1)])
+        rollups.fold()
+        paths = ['dashboard/seller/', 'dashboard/seller/revenue/?days=7']
+
+        self.client.force_authenticate(user=self.seller)
+        expected = [self.client.get(f'/api/{path}').json() for path in paths]
+
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.seller)}')
+        self.assertEqual([self.client.get(f'/api/async/{path}').json() for path in paths], expected)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.customer)}')
+        self.assertEqual(self.client.get('/api/async/dashboard/seller/').status_code, 403)
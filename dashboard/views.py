@@ -5,7 +5,88 @@ from django.db.models import Sum, Count, Q, F
 from django.utils import timezone
 from datetime import timedelta
 from products.models import Product
-from orders.models import Order, OrderItem
+from .models import SellerDailySales, SellerProductSales
+
+
+def dashboard_queries(user, today):
+    """
+    The dashboard's reads, by name. They do not depend on each other, so the
+    async view runs them at the same time.
+    """
+    daily_sales = SellerDailySales.objects.filter(seller=user)
+    return {
+        # Product statistics (one pass over the seller's products)
+        'products': lambda: Product.objects.filter(seller=user).aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            out_of_stock=Count('id', filter=Q(quantity=0)),
+            low_stock=Count('id', filter=Q(quantity__lte=10, quantity__gt=0)),
+        ),
+        # Sales statistics, read from the daily rollups
+        'sales': lambda: daily_sales.aggregate(
+            total_revenue=Sum('revenue'),
+            total_orders=Sum('orders'),
+            items_sold=Sum('items_sold'),
+            recent_sales=Sum('revenue', filter=Q(day__gt=today - timedelta(days=30))),
+        ),
+        # Top selling products
+        'top_products': lambda: list(
+            SellerProductSales.objects.filter(seller=user).order_by('-items_sold').values(
+                'product__name', 'revenue', total_sold=F('items_sold')
+            )[:5]
+        ),
+        'revenue_by_day': lambda: dict(
+            daily_sales.filter(day__gt=today - timedelta(days=180))
+            .values_list('day')
+            .annotate(total=Sum('revenue'))
+            .order_by()
+        ),
+        # Order status distribution
+        'order_statuses': lambda: list(
+            daily_sales.values('status').annotate(count=Sum('orders')).order_by('status')
+        ),
+    }
+
+
+def dashboard_payload(results, today):
+    """Response body built from the dashboard_queries() results"""
+    sales = results['sales']
+
+    # Monthly sales data (last 6 periods of 30 days)
+    monthly_sales = []
+    for i in range(6):
+        month_start = today - timedelta(days=30 * (i + 1))
+        month_end = today - timedelta(days=30 * i)
+        sales_in_month = sum(
+            (total for day, total in results['revenue_by_day'].items() if month_start < day <= month_end), 0
+        )
+        monthly_sales.append({
+            'month': month_start.strftime('%B'),
+            'sales': float(sales_in_month)
+        })
+
+    return {
+        'products': results['products'],
+        'sales': {
+            'total_revenue': float(sales['total_revenue'] or 0),
+            'total_orders': sales['total_orders'] or 0,
+            'items_sold': sales['items_sold'] or 0,
+            'recent_sales_30_days': float(sales['recent_sales'] or 0),
+        },
+        'top_products': results['top_products'],
+        'monthly_sales': monthly_sales[::-1],
+        'order_statuses': results['order_statuses'],
+    }
+
+
+def daily_revenue(user, days):
+    return SellerDailySales.objects.filter(
+        seller=user,
+        day__gt=timezone.localdate() - timedelta(days=days)
+    ).values('day').annotate(
+        revenue=Sum('revenue'),
+        orders=Sum('orders')
+    ).order_by('day')
 
 
 class SellerDashboardView(APIView):
@@ -17,67 +98,9 @@ class SellerDashboardView(APIView):
         if user.user_type != 'seller':
             return Response({'error': 'Only sellers can access dashboard'}, status=403)
 
-        # Product statistics
-        products = Product.objects.filter(seller=user)
-        total_products = products.count()
-        active_products = products.filter(is_active=True).count()
-        out_of_stock = products.filter(quantity=0).count()
-        low_stock = products.filter(quantity__lte=10, quantity__gt=0).count()
-
-        # Sales statistics
-        sold_items = OrderItem.objects.filter(seller=user)
-        total_sales = sold_items.aggregate(total=Sum('subtotal'))['total'] or 0
-        total_orders = sold_items.values('order').distinct().count()
-        total_items_sold = sold_items.aggregate(total=Sum('quantity'))['total'] or 0
-
-        # Recent orders (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_sales = sold_items.filter(
-            order__created_at__gte=thirty_days_ago
-        ).aggregate(total=Sum('subtotal'))['total'] or 0
-
-        # Top selling products
-        top_products = sold_items.values('product__name').annotate(
-            total_sold=Sum('quantity'),
-            revenue=Sum('subtotal')
-        ).order_by('-total_sold')[:5]
-
-        # Monthly sales data (last 6 months)
-        monthly_sales = []
-        for i in range(6):
-            month_start = timezone.now() - timedelta(days=30 * (i + 1))
-            month_end = timezone.now() - timedelta(days=30 * i)
-            sales = sold_items.filter(
-                order__created_at__gte=month_start,
-                order__created_at__lt=month_end
-            ).aggregate(total=Sum('subtotal'))['total'] or 0
-            monthly_sales.append({
-                'month': month_start.strftime('%B'),
-                'sales': float(sales)
-            })
-
-        # Order status distribution
-        order_statuses = Order.objects.filter(
-            items__seller=user
-        ).values('status').annotate(count=Count('id')).order_by('status')
-
-        return Response({
-            'products': {
-                'total': total_products,
-                'active': active_products,
-                'out_of_stock': out_of_stock,
-                'low_stock': low_stock,
-            },
-            'sales': {
-                'total_revenue': float(total_sales),
-                'total_orders': total_orders,
-                'items_sold': total_items_sold,
-                'recent_sales_30_days': float(recent_sales),
-            },
-            'top_products': list(top_products),
-            'monthly_sales': monthly_sales[::-1],
-            'order_statuses': list(order_statuses),
-        })
+        today = timezone.localdate()
+        results = {name: query() for name, query in dashboard_queries(user, today).items()}
+        return Response(dashboard_payload(results, today))
 
 
 class SellerRevenueView(APIView):
@@ -91,18 +114,8 @@ class SellerRevenueView(APIView):
 
         # Get date range from query params
         days = int(request.GET.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
-
-        # Daily revenue
-        daily_revenue = OrderItem.objects.filter(
-            seller=user,
-            order__created_at__gte=start_date
-        ).values('order__created_at__date').annotate(
-            revenue=Sum('subtotal'),
-            orders=Count('order', distinct=True)
-        ).order_by('order__created_at__date')
 
         return Response({
             'period_days': days,
-            'daily_revenue': list(daily_revenue)
+            'daily_revenue': list(daily_revenue(user, days))
         })
@@ -5,4 +5,8 @@ class OrdersConfig(AppConfig):
     name = 'orders'
 
     def ready(self):
-        import orders.signals  # Ensure signals are loaded
\ No newline at end of file
+        import orders.signals  # Ensure signals are loaded
+        from config import metrics
+        from . import outbox
+        # Read from the database at each export, so a stuck relay still shows
+        metrics.gauge('outbox_pending_lag_seconds', outbox.pending_lag)
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Cart mutations that keep the Cart.item_count / Cart.subtotal read model current.
+
+Every mutation locks the cart row first, so concurrent requests on the same
+cart are applied one after another, then changes the line and the totals in
+the same transaction. The number of queries does not depend on cart size.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from products.models import Product
+from .models import Cart, CartItem
+
+ADD = 'add'
+SET = 'set'
+REMOVE = 'remove'
+OPERATIONS = (ADD, SET, REMOVE)
+MAX_BATCH_OPERATIONS = 200
+
+
+class CartError(Exception):
+    """Cart change refused (bad quantity or not enough stock); nothing was changed"""
+
+
+def _locked_cart(user):
+    cart, _ = Cart.objects.select_for_update().get_or_create(user=user)
+    return cart
+
+
+def _apply(cart, units, amount):
+    """Move the stored totals by `units` and `amount` and mirror that on `cart`"""
+    now = timezone.now()
+    Cart.objects.filter(pk=cart.pk).update(
+        item_count=F('item_count') + units,
+        subtotal=F('subtotal') + amount,
+        updated_at=now,
+    )
+    cart.item_count += units
+    cart.subtotal += amount
+    cart.updated_at = now
+
+
+def _check_quantity(quantity):
+    if quantity <= 0:
+        raise CartError("Quantity must be positive")
+
+
+def add_item(user, product_id, quantity):
+    """Add `quantity` of a product, merging with an existing line; returns (cart, item)"""
+    _check_quantity(quantity)
+    product = get_object_or_404(Product.objects.only('id', 'price', 'quantity'), id=product_id)
+    if product.quantity < quantity:
+        raise CartError(f"Insufficient stock. Available: {product.quantity} kg")
+
+    with transaction.atomic():
+        cart = _locked_cart(user)
+        item, created = CartItem.objects.get_or_create(cart=cart, product=product, defaults={'quantity': quantity})
+        if not created:
+            item.quantity += quantity
+            item.save(update_fields=['quantity'])
+        _apply(cart, quantity, product.price * quantity)
+    return cart, item
+
+
+def update_item(user, item_id, quantity):
+    """Set a line's quantity; returns (cart, item)"""
+    _check_quantity(quantity)
+    with transaction.atomic():
+        cart = _locked_cart(user)
+        item = get_object_or_404(
+            CartItem.objects.select_related('product').only('id', 'quantity', 'cart_id', 'product__price', 'product__quantity'),
+            id=item_id, cart=cart,
+        )
+        if item.product.quantity < quantity:
+            raise CartError(f"Insufficient stock. Available: {item.product.quantity} kg")
+
+        change = quantity - item.quantity
+        item.quantity = quantity
+        item.save(update_fields=['quantity'])
+        _apply(cart, change, item.product.price * change)
+    return cart, item
+
+
+def remove_item(user, item_id):
+    """Delete a line; returns the cart"""
+    with transaction.atomic():
+        cart = _locked_cart(user)
+        item = get_object_or_404(
+            CartItem.objects.select_related('product').only('id', 'quantity', 'cart_id', 'product__price'),
+            id=item_id, cart=cart,
+        )
+        CartItem.objects.filter(pk=item.pk).delete()
+        _apply(cart, -item.quantity, -item.product.price * item.quantity)
+    return cart
+
+
+def clear(user):
+    """Delete every line and zero the totals; returns the cart"""
+    with transaction.atomic():
+        cart = _locked_cart(user)
+        CartItem.objects.filter(cart=cart).delete()
+        _apply(cart, -cart.item_count, -cart.subtotal)
+    return cart
+
+
+def apply_batch(user, operations):
+    """
+    Apply a list of {'product_id', 'quantity', 'op'} operations in order, all
+    or nothing; returns (cart, lines) with the resulting line of every product
+    still in the cart. `add` adds to the line, `set` replaces its quantity and
+    `remove` drops it.
+
+    Products and existing lines are read with one query each and the lines
+    are written with one upsert and one delete, however many operations.
+    """
+    product_ids = {operation['product_id'] for operation in operations}
+    with transaction.atomic():
+        cart = _locked_cart(user)
+        products = Product.objects.only('id', 'price', 'quantity').in_bulk(product_ids)
+        current = dict(
+            CartItem.objects.filter(cart=cart, product_id__in=product_ids).values_list('product_id', 'quantity')
+        )
+
+        wanted = dict(current)
+        for operation in operations:
+            product_id, quantity = operation['product_id'], operation.get('quantity', 1)
+            if product_id not in products:
+                raise CartError(f"Product {product_id} not found")
+            if operation['op'] == REMOVE:
+                wanted[product_id] = 0
+                continue
+            _check_quantity(quantity)
+            wanted[product_id] = quantity + (wanted.get(product_id, 0) if operation['op'] == ADD else 0)
+
+        for product_id, quantity in wanted.items():
+            if quantity > products[product_id].quantity:
+                raise CartError(
+                    f"Insufficient stock for product {product_id}. Available: {products[product_id].quantity} kg"
+                )
+
+        kept = {product_id: quantity for product_id, quantity in wanted.items() if quantity}
+        removed = [product_id for product_id in current if product_id not in kept]
+        if kept:
+            CartItem.objects.bulk_create(
+                [CartItem(cart=cart, product_id=product_id, quantity=quantity) for product_id, quantity in kept.items()],
+                update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity'],
+            )
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+
+        units = sum(wanted.values()) - sum(current.values())
+        amount = sum(
+            (products[product_id].price * (quantity - current.get(product_id, 0)) for product_id, quantity in wanted.items()),
+            Decimal('0.00')
+        )
+        _apply(cart, units, amount)
+        # bulk_create does not hand back the ids of upserted rows
+        lines = list(CartItem.objects.filter(cart=cart, product_id__in=kept).order_by('id')) if kept else []
+    return cart, lines
+
+
+def full_cart(user):
+    """
+    The cart with its lines and their products, loaded in two queries.
+    Stored totals that drifted from the lines (a price change, lines written
+    outside this module) are corrected on the way.
+    """
+    cart, _ = Cart.objects.prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related('product').order_by('id'))
+    ).get_or_create(user=user)
+
+    items = cart.items.all()
+    item_count = sum(item.quantity for item in items)
+    subtotal = sum((item.product.price * item.quantity for item in items), Decimal('0.00'))
+    if (cart.item_count, cart.subtotal) != (item_count, subtotal):
+        Cart.objects.filter(pk=cart.pk).update(item_count=item_count, subtotal=subtotal)
+        cart.item_count, cart.subtotal = item_count, subtotal
+    return cart
+
+
+def refresh_totals(carts):
+    """Recompute item_count/subtotal from the lines (e.g. after product prices change); one UPDATE"""
+    lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    carts.update(
+        item_count=Coalesce(
+            Subquery(lines.annotate(total=Sum('quantity')).values('total')), Value(0), output_field=IntegerField()
+        ),
+        subtotal=Coalesce(
+            Subquery(lines.annotate(total=Sum(F('quantity') * F('product__price'))).values('total')),
+            Value(Decimal('0.00')), output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    )
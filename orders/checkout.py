@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import Product
+from products.stock import SALE, StockError, adjust_stock
+from .models import Cart, Order, OrderItem, CartItem
+from .signals import order_placed
+
+
+class CheckoutError(Exception):
+    """Order could not be placed (empty cart, unknown product or not enough stock)"""
+
+
+def place_order(user, lines, status='pending'):
+    """
+    Create an order for `lines`, an iterable of (product_id, quantity) pairs.
+
+    Runs in a fixed number of queries whatever the number of lines:
+    one SELECT ... FOR UPDATE over the products (locked in id order so
+    concurrent checkouts cannot deadlock), one INSERT for the order, the
+    UPDATE and ledger INSERT of products.stock.adjust_stock (handed the rows
+    already locked) and one bulk INSERT for the items.
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    if not quantities:
+        raise CheckoutError("Order must have at least one item.")
+
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update()
+            .filter(id__in=quantities)
+            .order_by('id')
+            .only('id', 'seller_id', 'name', 'price', 'quantity')
+        )
+        if len(products) != len(quantities):
+            missing = set(quantities) - {product.id for product in products}
+            raise CheckoutError(f"Products not found: {', '.join(map(str, sorted(missing)))}")
+
+        total_amount = Decimal('0.00')
+        for product in products:
+            quantity = quantities[product.id]
+            if product.quantity < quantity:
+                raise CheckoutError(
+                    f"Insufficient stock for {product.name}. Available: {product.quantity}, Requested: {quantity}"
+                )
+            total_amount += product.price * quantity
+
+        order = Order.objects.create(user=user, status=status, total_amount=total_amount)
+        try:
+            adjust_stock(
+                {product_id: -quantity for product_id, quantity in quantities.items()},
+                SALE, user=user, reference=f'order:{order.id}',
+                locked={product.id: product.quantity for product in products},
+            )
+        except StockError as e:
+            raise CheckoutError(str(e))
+        items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantities[product.id], price=product.price)
+            for product in products
+        ])
+        order_placed.send(sender=Order, order=order, items=items)
+
+    return order
+
+
+def checkout_cart(user):
+    """Turn the user's cart into an order and empty the cart, atomically"""
+    with transaction.atomic():
+        # Locking the cart rows serialises two checkouts of the same cart
+        cart_items = CartItem.objects.select_for_update().filter(cart__user=user)
+        lines = list(cart_items.values_list('product_id', 'quantity'))
+        if not lines:
+            raise CheckoutError("Cart is empty. Add items to cart first.")
+
+        order = place_order(user, lines)
+        CartItem.objects.filter(cart__user=user).delete()
+        Cart.objects.filter(user=user).update(item_count=0, subtotal=0, updated_at=timezone.now())
+
+    return order
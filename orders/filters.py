@@ -0,0 +1,18 @@
+import django_filters
+
+from .models import Order
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Order history filters: ?status=, ?created_after= (inclusive) and
+    ?created_before= (exclusive), as dates or datetimes. Served by the
+    order_user_recent_idx and order_user_status_recent_idx indexes.
+    """
+    status = django_filters.ChoiceFilter(choices=Order.STATUS_CHOICES)
+    created_after = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'created_after', 'created_before']
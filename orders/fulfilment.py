@@ -0,0 +1,81 @@
+"""
+Seller fulfilment: the orders holding a seller's products, and status
+transitions applied to many orders at once.
+
+transition() locks the orders in id order, checks every move against
+TRANSITIONS, writes the new status with one UPDATE and announces it with one
+order_status_changed per previous status, however many orders move.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Order, OrderItem
+from .signals import order_status_changed
+
+# Status an order may move to from each status
+TRANSITIONS = {
+    'pending': {'processing', 'shipped', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+MAX_BATCH_ORDERS = 500
+
+
+class TransitionError(Exception):
+    """Orders could not be moved (unknown to the caller, or not allowed to reach the status)"""
+
+
+def managed_orders(user):
+    """Orders whose status `user` may change: any for staff, those holding their products for sellers"""
+    if user.is_staff:
+        return Order.objects.all()
+    if user.is_seller:
+        return Order.objects.filter(
+            Exists(OrderItem.objects.filter(order=OuterRef('pk'), product__seller=user))
+        )
+    return Order.objects.none()
+
+
+def transition(user, order_ids, to_status):
+    """Move every order in `order_ids` to `to_status`, all or nothing; returns the ids moved"""
+    if to_status not in TRANSITIONS:
+        raise TransitionError(f"Invalid status. Must be one of: {', '.join(TRANSITIONS)}")
+    order_ids = set(order_ids)
+
+    with transaction.atomic():
+        current = dict(
+            managed_orders(user).filter(id__in=order_ids)
+            .select_for_update().order_by('id').values_list('id', 'status')
+        )
+        missing = order_ids - set(current)
+        if missing:
+            raise TransitionError(f"Orders not found: {', '.join(map(str, sorted(missing)))}")
+
+        by_status = defaultdict(list)
+        for order_id, status in current.items():
+            if status != to_status:
+                by_status[status].append(order_id)
+        blocked = sorted(
+            order_id for status, ids in by_status.items()
+            if to_status not in TRANSITIONS[status] for order_id in ids
+        )
+        if blocked:
+            raise TransitionError(
+                f"Orders cannot move to {to_status}: "
+                + ', '.join(f'#{order_id} ({current[order_id]})' for order_id in blocked)
+            )
+
+        moved = sorted(order_id for ids in by_status.values() for order_id in ids)
+        if moved:
+            Order.objects.filter(id__in=moved).update(status=to_status, updated_at=timezone.now())
+        for from_status, ids in by_status.items():
+            order_status_changed.send(
+                sender=Order, order_ids=sorted(ids), from_status=from_status, to_status=to_status
+            )
+
+    return moved
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+from config.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('orders', '0002_delete_product'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='cart',
+            index=models.Index(fields=['updated_at'], name='cart_updated_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_recent_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+    ]
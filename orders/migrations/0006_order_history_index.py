@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+from config.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('orders', '0005_order_events'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_recent_idx'),
+        ),
+    ]
@@ -18,9 +18,27 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A customer's order history, newest first
+            models.Index(fields=['user', '-created_at'], name='order_user_recent_idx'),
+            # Orders waiting in a given status, oldest first
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # A customer's order history narrowed to one status
+            models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_recent_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so saves can tell whether it changed
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
@@ -34,9 +52,18 @@ class OrderItem(models.Model):
 
 class Cart(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
+    # Read model kept current by orders.carts on every mutation
+    item_count = models.PositiveIntegerField(default=0, help_text="Total units across all lines")
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Stale cart cleanup (orders.tasks.cleanup_old_carts)
+            models.Index(fields=['updated_at'], name='cart_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Cart for {self.user.username}"
 
@@ -50,4 +77,29 @@ class CartItem(models.Model):
         unique_together = ('cart', 'product')
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name} in cart"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.name} in cart"
+
+
+class OrderEvent(models.Model):
+    """Outbox of order changes waiting to be published to Celery (see orders.outbox)"""
+    EVENT_CHOICES = [
+        ('created', 'Created'),
+        ('status_changed', 'Status changed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    # Not a foreign key: the event of a deleted order still has to go out
+    order_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The relay's queue: unpublished events in id order
+            models.Index(fields=['id'], condition=models.Q(published_at__isnull=True), name='order_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} order #{self.order_id}"
@@ -0,0 +1,75 @@
+"""
+Transactional outbox for order events.
+
+record() adds OrderEvent rows inside the transaction that changes the
+orders, so an event exists exactly when its change commits and checkout
+never waits on the broker. relay() later claims a batch of pending events,
+publishes them to Celery over one producer connection and marks them
+published. A batch whose publishing fails is rolled back and retried by the
+next run, so delivery is at-least-once. Published events are deleted a week
+later by orders.tasks.purge_order_events.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from config import metrics
+from config.celery import app
+from .models import OrderEvent
+
+CREATED = 'created'
+STATUS_CHANGED = 'status_changed'
+CANCELLED = 'cancelled'
+
+RELAY_BATCH_SIZE = 500
+
+
+def record(event_type, order_ids, **payload):
+    """Queue one event per order, in the caller's transaction"""
+    OrderEvent.objects.bulk_create([
+        OrderEvent(order_id=order_id, event_type=event_type, payload=payload) for order_id in order_ids
+    ])
+
+
+def pending_lag():
+    """Seconds the oldest unpublished event has been waiting (0 when the outbox is drained)"""
+    oldest = (
+        OrderEvent.objects.filter(published_at__isnull=True)
+        .order_by('id').values_list('created_at', flat=True).first()
+    )
+    return (timezone.now() - oldest).total_seconds() if oldest else 0.0
+
+
+def _task_call(event):
+    """(task, args) an event is published as"""
+    from .tasks import send_order_confirmation, send_order_status_update
+    if event.event_type == CREATED:
+        return send_order_confirmation, (event.order_id,)
+    return send_order_status_update, (event.order_id, event.payload['to_status'])
+
+
+def relay(batch_size=RELAY_BATCH_SIZE):
+    """
+    Publish up to `batch_size` pending events in id order and return how many
+    were published. Rows are claimed with SKIP LOCKED, so relays running side
+    by side never publish the same event.
+    """
+    with transaction.atomic():
+        events = list(
+            OrderEvent.objects.filter(published_at__isnull=True)
+            .order_by('id').select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not events:
+            return 0
+
+        with app.producer_or_acquire() as producer:
+            for event in events:
+                task, args = _task_call(event)
+                task.apply_async(args, producer=producer)
+
+        now = timezone.now()
+        OrderEvent.objects.filter(id__in=[event.id for event in events]).update(published_at=now)
+
+    for event in events:
+        metrics.observe('outbox_lag_seconds', (now - event.created_at).total_seconds(), event=event.event_type)
+        metrics.increment('outbox_events_published', event=event.event_type)
+    return len(events)
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+from config.pagination import SettingsPageSizeMixin
+
+
+class FulfilmentCursorPagination(SettingsPageSizeMixin, CursorPagination):
+    """A seller's fulfilment queue, oldest order first, one indexed query per page"""
+    ordering = ('created_at', 'id')
+    page_size_setting = 'ORDER_PAGE_SIZE'
+    max_page_size_setting = 'ORDER_MAX_PAGE_SIZE'
+
+
+class OrderHistoryCursorPagination(SettingsPageSizeMixin, CursorPagination):
+    """A customer's orders, newest first, one indexed query per page"""
+    ordering = ('-created_at', '-id')
+    page_size_setting = 'ORDER_PAGE_SIZE'
+    max_page_size_setting = 'ORDER_MAX_PAGE_SIZE'
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from .models import Order, OrderItem, Cart, CartItem
 from products.models import Product
+from .carts import ADD, MAX_BATCH_OPERATIONS, OPERATIONS
+from .checkout import CheckoutError, place_order
+from .fulfilment import MAX_BATCH_ORDERS
 
 
 # Minimal inline product serializer
@@ -39,7 +42,17 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['id', 'user', 'status', 'total_amount', 'created_at', 'updated_at', 'items']
-        read_only_fields = ['user', 'total_amount', 'created_at', 'updated_at']
+        # Status only moves through orders.fulfilment.transition() (update_status, bulk_update_status)
+        read_only_fields = ['user', 'status', 'total_amount', 'created_at', 'updated_at']
+
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Compact order history row; the items are in the detail view"""
+    item_count = serializers.IntegerField(read_only=True, help_text="Total units across all lines")
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'total_amount', 'item_count', 'created_at', 'updated_at']
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
@@ -60,34 +73,12 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         items_data = validated_data.pop('items')
         request = self.context.get('request')
 
-        # Calculate total amount
-        total_amount = 0
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data['quantity']
-
-            # Validate stock
-            if product.quantity < quantity:
-                raise serializers.ValidationError(
-                    f"Insufficient stock for {product.name}. Available: {product.quantity}, Requested: {quantity}"
-                )
-
-            # Set price from product
-            item_data['price'] = product.price
-            total_amount += float(product.price) * quantity
-
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            total_amount=total_amount,
-            **validated_data
-        )
-
-        # Create order items
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-
-        return order
+        # Stock checks, pricing and item creation happen under row locks
+        lines = [(item_data['product'].id, item_data['quantity']) for item_data in items_data]
+        try:
+            return place_order(request.user, lines, **validated_data)
+        except CheckoutError as e:
+            raise serializers.ValidationError(str(e))
 
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -108,5 +99,38 @@ class CartSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'items', 'updated_at']
-        read_only_fields = ['user']
\ No newline at end of file
+        fields = ['id', 'user', 'items', 'item_count', 'subtotal', 'updated_at']
+        read_only_fields = ['user', 'item_count', 'subtotal']
+
+
+class CartSummarySerializer(serializers.ModelSerializer):
+    """Cart totals without the lines (returned by cart mutations)"""
+
+    class Meta:
+        model = Cart
+        fields = ['id', 'item_count', 'subtotal', 'updated_at']
+
+
+class CartLineSerializer(serializers.ModelSerializer):
+    """The line a cart mutation touched"""
+
+    class Meta:
+        model = CartItem
+        fields = ['id', 'product_id', 'quantity']
+
+
+class CartOperationSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(default=1)
+    op = serializers.ChoiceField(choices=OPERATIONS, default=ADD)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_OPERATIONS)
+
+
+class OrderStatusBatchSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=MAX_BATCH_ORDERS
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
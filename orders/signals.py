@@ -1,35 +1,63 @@
 from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from .models import OrderItem, Order
+from django.dispatch import receiver, Signal
 from products.models import Product
+from products.stock import CANCEL, adjust_stock
+from . import outbox
+from .carts import refresh_totals
+from .models import Cart, OrderItem, Order
 
-@receiver(post_save, sender=OrderItem)
-def reduce_product_stock(sender, instance, created, **kwargs):
-    '''Automatically reduce product stock when order item is created'''
-    if created:
-        product = instance.product
-        if product.quantity >= instance.quantity:
-            product.quantity -= instance.quantity
-            product.save()
-        else:
-            # Handle insufficient stock (shouldn't happen due to validation)
-            raise ValueError(f"Insufficient stock for {product.name}")
+# Sent by orders.checkout once an order and all of its items are saved.
+# Arguments: order, items
+order_placed = Signal()
+
+# Sent whenever orders move from one status to another.
+# Arguments: order_ids, from_status, to_status
+order_status_changed = Signal()
 
 @receiver(post_delete, sender=OrderItem)
 def restore_product_stock(sender, instance, **kwargs):
     '''Restore product stock when order item is deleted (cancelled)'''
-    product = instance.product
-    product.quantity += instance.quantity
-    product.save()
+    # Only for orders deleted on purpose: when the product itself (or its
+    # seller) is being deleted there is no stock left to restore
+    origin = kwargs.get('origin')
+    if getattr(origin, 'model', type(origin)) not in (Order, OrderItem):
+        return
+    adjust_stock({instance.product_id: instance.quantity}, CANCEL, reference=f'order:{instance.order_id}')
+
+@receiver(post_save, sender=Order)
+def track_order_status(sender, instance, created, **kwargs):
+    '''Announce status changes made through Order.save()'''
+    previous_status = getattr(instance, '_loaded_status', None)
+    if not created and previous_status and previous_status != instance.status:
+        order_status_changed.send(
+            sender=Order,
+            order_ids=[instance.id],
+            from_status=previous_status,
+            to_status=instance.status
+        )
+    instance._loaded_status = instance.status
 
 @receiver(post_save, sender=Order)
-def send_order_notification(sender, instance, created, **kwargs):
-    '''Send notifications when order is created or updated'''
+def record_order_created(sender, instance, created, **kwargs):
+    '''Queue the confirmation in the order's own transaction, however the order was created'''
     if created:
-        # Trigger email task
-        from .tasks import send_order_confirmation
-        send_order_confirmation.delay(instance.id)
-        print(f"Order #{instance.id} created - notification sent")
-    else:
-        # Order updated (status changed)
-        print(f"Order #{instance.id} status changed to {instance.status}")
+        outbox.record(outbox.CREATED, [instance.id])
+
+@receiver(order_status_changed)
+def record_order_status_changed(sender, order_ids, from_status, to_status, **kwargs):
+    '''Queue a status update for every order that moved'''
+    event_type = outbox.CANCELLED if to_status == 'cancelled' else outbox.STATUS_CHANGED
+    outbox.record(event_type, order_ids, from_status=from_status, to_status=to_status)
+
+@receiver(post_delete, sender=Order)
+def record_order_deleted(sender, instance, **kwargs):
+    '''A deleted order is a cancelled one (its stock is restored above)'''
+    if instance.status != 'cancelled':
+        outbox.record(outbox.CANCELLED, [instance.id], from_status=instance.status, to_status='cancelled')
+
+@receiver(post_save, sender=Product)
+def refresh_cart_totals(sender, instance, created, update_fields=None, **kwargs):
+    '''Carts holding the product keep its price in their stored subtotal'''
+    if created or (update_fields and 'price' not in update_fields):
+        return
+    refresh_totals(Cart.objects.filter(items__product_id=instance.pk))
@@ -1,16 +1,86 @@
+import time
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from .models import Cart
+from config import metrics
+from .models import Cart, OrderEvent
 
-@shared_task
-def cleanup_old_carts():
-    '''Delete carts that haven't been updated in 30 days'''
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    old_carts = Cart.objects.filter(updated_at__lt=thirty_days_ago)
-    count = old_carts.count()
-    old_carts.delete()
-    return f"Deleted {count} old carts"
+CART_BATCH_SIZE = 1000
+EVENT_BATCH_SIZE = 5000
+# A run hands the rest of its work to a fresh task once this many seconds have passed
+TASK_TIME_BUDGET = 240
+# The relay runs every few seconds; a backlog is continued by a fresh task sooner
+RELAY_TIME_BUDGET = 30
+
+@shared_task(bind=True)
+def cleanup_old_carts(self, days=30, batch_size=CART_BATCH_SIZE, time_budget=TASK_TIME_BUDGET):
+    '''
+    Delete carts that haven't been updated in `days` days.
+    Each batch is its own short transaction, and carts another request has
+    locked are skipped, so a large backlog never holds locks for long. Deleted
+    rows drop out of the filter, so a re-queued or restarted run just continues.
+    '''
+    started = time.monotonic()
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    try:
+        while True:
+            with transaction.atomic():
+                cart_ids = list(
+                    Cart.objects.filter(updated_at__lt=cutoff).order_by('updated_at', 'id')
+                    .select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+                )
+                if not cart_ids:
+                    break
+                _, per_model = Cart.objects.filter(id__in=cart_ids).delete()
+
+            deleted += per_model.get(Cart._meta.label, 0)
+            metrics.increment('task_batches', task='cleanup_old_carts')
+
+            if time.monotonic() - started > time_budget:
+                self.apply_async(kwargs={'days': days, 'batch_size': batch_size, 'time_budget': time_budget})
+                metrics.increment('task_continuations', task='cleanup_old_carts')
+                break
+    finally:
+        metrics.increment('task_items', deleted, task='cleanup_old_carts')
+        metrics.increment('task_seconds', time.monotonic() - started, task='cleanup_old_carts')
+
+    return f"Deleted {deleted} old carts"
+
+@shared_task(bind=True)
+def purge_order_events(self, days=7, batch_size=EVENT_BATCH_SIZE, time_budget=TASK_TIME_BUDGET):
+    '''
+    Delete order events published more than `days` days ago, batch by batch
+    like cleanup_old_carts. Pending events are never touched. Events are
+    published in id order, so the oldest ids are the ones to go.
+    '''
+    started = time.monotonic()
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    try:
+        while True:
+            with transaction.atomic():
+                event_ids = list(
+                    OrderEvent.objects.filter(published_at__lt=cutoff).order_by('id')
+                    .select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+                )
+                if not event_ids:
+                    break
+                count, _ = OrderEvent.objects.filter(id__in=event_ids).delete()
+
+            deleted += count
+            metrics.increment('task_batches', task='purge_order_events')
+
+            if time.monotonic() - started > time_budget:
+                self.apply_async(kwargs={'days': days, 'batch_size': batch_size, 'time_budget': time_budget})
+                metrics.increment('task_continuations', task='purge_order_events')
+                break
+    finally:
+        metrics.increment('task_items', deleted, task='purge_order_events')
+        metrics.increment('task_seconds', time.monotonic() - started, task='purge_order_events')
+
+    return f"Deleted {deleted} published order events"
 
 @shared_task
 def send_order_confirmation(order_id):
@@ -22,4 +92,39 @@ def send_order_confirmation(order_id):
         print(f"Order confirmation sent for order #{order.id}")
         return f"Confirmation sent for order #{order.id}"
     except Order.DoesNotExist:
-        return "Order not found"
\ No newline at end of file
+        return "Order not found"
+
+@shared_task
+def send_order_status_update(order_id, status):
+    '''Tell the customer their order is now `status`'''
+    from .models import Order
+    # A deleted order is announced as cancelled after its row is gone
+    if status != 'cancelled' and not Order.objects.filter(id=order_id).exists():
+        return "Order not found"
+    # Send email logic here
+    return f"Status update sent for order #{order_id}: {status}"
+
+@shared_task(bind=True)
+def relay_order_events(self, batch_size=None, time_budget=RELAY_TIME_BUDGET):
+    '''Publish pending order events from the outbox, batch by batch (see orders.outbox)'''
+    from . import outbox
+    batch_size = batch_size or outbox.RELAY_BATCH_SIZE
+    started = time.monotonic()
+    published = 0
+    try:
+        while True:
+            count = outbox.relay(batch_size)
+            published += count
+            metrics.increment('task_batches', task='relay_order_events')
+            if count < batch_size:
+                break
+
+            if time.monotonic() - started > time_budget:
+                self.apply_async(kwargs={'batch_size': batch_size, 'time_budget': time_budget})
+                metrics.increment('task_continuations', task='relay_order_events')
+                break
+    finally:
+        metrics.increment('task_items', published, task='relay_order_events')
+        metrics.increment('task_seconds', time.monotonic() - started, task='relay_order_events')
+
+    return f"Published {published} order events"
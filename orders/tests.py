@@ -1,3 +1,632 @@
-from django.test import TestCase
+import threading
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIClient
+from config import metrics
+from products.models import Product, Category
+from products.cache import get_cache
+from . import fulfilment, outbox
+from .models import Order, OrderEvent, OrderItem, Cart, CartItem
+from .checkout import CheckoutError, checkout_cart, place_order
+from .signals import order_status_changed
+from .tasks import cleanup_old_carts, purge_order_events, relay_order_events
+
+User = get_user_model()
+
+
+def create_product(seller, name='Test Product', quantity=100, price=10.00):
+    return Product.objects.create(
+        seller=seller,
+        category=Category.objects.get_or_create(name='Test Category')[0],
+        name=name,
+        description='Test Description',
+        price=price,
+        quantity=quantity
+    )
+
+
+class CheckoutTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='seller_test',
+            password='test123',
+            user_type='seller'
+        )
+        self.customer = User.objects.create_user(
+            username='customer_test',
+            password='test123',
+            user_type='customer'
+        )
+        self.cart = Cart.objects.create(user=self.customer)
+
+    def fill_cart(self, count, quantity=2):
+        products = [create_product(self.seller, name=f'Product {i}') for i in range(count)]
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, product=product, quantity=quantity) for product in products
+        ])
+        return products
+
+    def test_checkout_creates_order_and_clears_cart(self):
+        products = self.fill_cart(2)
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/api/orders/orders/', {}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(response.data['total_amount'], '40.00')
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.quantity, 98)
+
+    def test_deleting_order_restores_stock(self):
+        products = self.fill_cart(2)
+        order = checkout_cart(self.customer)
+        reference = f'order:{order.id}'
+        order.delete()
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.quantity, 100)
+            self.assertEqual(
+                list(product.stock_movements.order_by('id').values_list('reason', 'delta', 'reference')),
+                [('sale', -2, reference), ('cancel', 2, reference)]
+            )
+
+    def test_deleting_product_with_orders(self):
+        product = self.fill_cart(1)[0]
+        checkout_cart(self.customer)
+        product.delete()
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_checkout_refreshes_cached_catalog(self):
+        get_cache().clear()
+        products = self.fill_cart(1)
+        self.client.force_authenticate(user=self.customer)
+        url = f'/api/products/products/{products[0].id}/'
+        self.assertEqual(self.client.get(url).data['quantity'], 100)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout_cart(self.customer)
+        self.assertEqual(self.client.get(url).data['quantity'], 98)
+
+    def test_insufficient_stock_rolls_back(self):
+        products = self.fill_cart(2)
+        Product.objects.filter(pk=products[1].pk).update(quantity=1)
+
+        with self.assertRaises(CheckoutError):
+            checkout_cart(self.customer)
+
+        products[0].refresh_from_db()
+        self.assertEqual(products[0].quantity, 100)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+    def test_empty_cart_is_rejected(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/api/orders/orders/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_checkout_query_count_is_constant(self):
+        self.fill_cart(2)
+        with CaptureQueriesContext(connection) as small:
+            checkout_cart(self.customer)
+
+        self.fill_cart(25)
+        with CaptureQueriesContext(connection) as large:
+            checkout_cart(self.customer)
+
+        self.assertEqual(len(small), len(large))
+        # The products are locked once, by place_order(); adjust_stock() reuses the lock
+        if connection.features.has_select_for_update:
+            locks = [query['sql'] for query in large if 'FOR UPDATE' in query['sql'] and 'products_product' in query['sql']]
+            self.assertEqual(len(locks), 1)
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.customer = User.objects.create_user(username='customer_test', password='test123', user_type='customer')
+        self.product = create_product(self.seller)
+        metrics.reset()
+
+    def place(self):
+        return place_order(self.customer, [(self.product.id, 1)])
+
+    def pending(self):
+        return list(OrderEvent.objects.filter(published_at__isnull=True).values_list('event_type', 'order_id'))
+
+    def test_order_changes_are_recorded(self):
+        order = self.place()
+        order.status = 'shipped'
+        order.save()
+        cancelled = self.place()
+        cancelled_id = cancelled.id
+        cancelled.delete()
+
+        self.assertEqual(self.pending(), [
+            (outbox.CREATED, order.id),
+            (outbox.STATUS_CHANGED, order.id),
+            (outbox.CREATED, cancelled_id),
+            (outbox.CANCELLED, cancelled_id),
+        ])
+        self.assertEqual(
+            OrderEvent.objects.get(event_type=outbox.STATUS_CHANGED).payload,
+            {'from_status': 'pending', 'to_status': 'shipped'}
+        )
+
+    def test_rolled_back_order_records_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.place()
+            raise RuntimeError
+        self.assertEqual(self.pending(), [])
+
+    def test_orders_created_outside_checkout_are_recorded(self):
+        order = Order.objects.create(user=self.customer, total_amount=0)
+        self.assertEqual(self.pending(), [(outbox.CREATED, order.id)])
+
+    def test_checkout_does_not_touch_the_broker(self):
+        CartItem.objects.create(cart=Cart.objects.create(user=self.customer), product=self.product)
+        with mock.patch('orders.outbox.app.producer_or_acquire', side_effect=ConnectionError), \
+                self.captureOnCommitCallbacks(execute=True):
+            order = checkout_cart(self.customer)
+        self.assertEqual(self.pending(), [(outbox.CREATED, order.id)])
+
+    def test_relay_publishes_in_batches(self):
+        orders = [self.place() for _ in range(3)]
+        with mock.patch('orders.tasks.send_order_confirmation.apply_async') as apply_async:
+            self.assertEqual(outbox.relay(batch_size=2), 2)
+            self.assertEqual(outbox.relay(batch_size=2), 1)
+            self.assertEqual(outbox.relay(batch_size=2), 0)
+
+        self.assertEqual([call.args[0] for call in apply_async.call_args_list], [(order.id,) for order in orders])
+        self.assertEqual(self.pending(), [])
+        self.assertEqual(metrics.get_summary('outbox_lag_seconds', event=outbox.CREATED)['count'], 3)
+
+    def test_failed_publish_keeps_events_pending(self):
+        order = self.place()
+        with mock.patch('orders.tasks.send_order_confirmation.apply_async', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                outbox.relay()
+        self.assertEqual(self.pending(), [(outbox.CREATED, order.id)])
+
+    def test_relay_task_drains_the_outbox(self):
+        order = self.place()
+        order.status = 'cancelled'
+        order.save()
+        with mock.patch('orders.tasks.send_order_confirmation.apply_async') as confirmation, \
+                mock.patch('orders.tasks.send_order_status_update.apply_async') as status_update:
+            relay_order_events(batch_size=1)
+        self.assertEqual(confirmation.call_args.args[0], (order.id,))
+        self.assertEqual(status_update.call_args.args[0], (order.id, 'cancelled'))
+        self.assertEqual(self.pending(), [])
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_pending_lag_is_read_at_each_scrape(self):
+        def lag():
+            response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-me')
+            return [gauge['value'] for gauge in response.json()['gauges'] if gauge['name'] == 'outbox_pending_lag_seconds']
+
+        self.assertEqual(lag(), [0.0])
+        self.place()
+        OrderEvent.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertGreaterEqual(lag()[0], 300)
+
+
+class FulfilmentTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.other_seller = User.objects.create_user(username='other_seller', password='test123', user_type='seller')
+        self.customer = User.objects.create_user(username='customer_test', password='test123', user_type='customer')
+        self.product = create_product(self.seller)
+        self.other_product = create_product(self.other_seller, name='Other Product')
+        self.client.force_authenticate(user=self.seller)
+
+    def place(self, *products):
+        return place_order(self.customer, [(product.id, 1) for product in products])
+
+    def move(self, orders, new_status):
+        return self.client.post('/api/orders/orders/bulk_update_status/', {
+            'order_ids': [order.id for order in orders], 'status': new_status,
+        }, format='json')
+
+    def test_queue_lists_orders_with_the_sellers_products(self):
+        shared = self.place(self.product, self.other_product)
+        other = self.place(self.other_product)
+        shipped = self.place(self.product)
+        self.move([shipped], 'shipped')
+
+        response = self.client.get('/api/orders/orders/fulfilment/')
+        self.assertEqual([order['id'] for order in response.data['results']], [shared.id, shipped.id])
+        # Only the seller's own lines of a shared order
+        self.assertEqual([item['product']['id'] for item in response.data['results'][0]['items']], [self.product.id])
+        self.assertNotIn(other.id, [order['id'] for order in response.data['results']])
+
+        response = self.client.get('/api/orders/orders/fulfilment/', {'status': 'pending'})
+        self.assertEqual([order['id'] for order in response.data['results']], [shared.id])
+
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get('/api/orders/orders/fulfilment/').status_code, 403)
+
+    def test_customers_cannot_bypass_the_state_machine(self):
+        order = self.place(self.product)
+        self.client.force_authenticate(user=self.customer)
+        with mock.patch('orders.signals.order_status_changed.send') as send:
+            response = self.client.patch(f'/api/orders/orders/{order.id}/', {'status': 'delivered'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'pending')
+        send.assert_not_called()
+
+    def test_queue_query_count_does_not_grow_with_orders(self):
+        self.place(self.product)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/orders/orders/fulfilment/')
+        for _ in range(20):
+            self.place(self.product, self.other_product)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/orders/orders/fulfilment/')
+        self.assertEqual(len(response.data['results']), 21)
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_transition_is_one_update_and_one_event(self):
+        orders = [self.place(self.product) for _ in range(5)]
+        events = []
+        receiver = lambda sender, **kwargs: events.append(kwargs)
+        order_status_changed.connect(receiver)
+        self.addCleanup(order_status_changed.disconnect, receiver)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.move(orders, 'shipped')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order_ids'], [order.id for order in orders])
+
+        table = Order._meta.db_table
+        updates = [query for query in queries if query['sql'].startswith(f'UPDATE "{table}"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0]['from_status'], events[0]['to_status']), ('pending', 'shipped'))
+        self.assertEqual(OrderEvent.objects.filter(event_type=outbox.STATUS_CHANGED).count(), 5)
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'shipped'})
+
+    def test_bulk_transition_is_all_or_nothing(self):
+        pending, delivered = self.place(self.product), self.place(self.product)
+        self.move([delivered], 'shipped')
+        self.move([delivered], 'delivered')
+
+        response = self.move([pending, delivered], 'cancelled')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'#{delivered.id} (delivered)', response.data['error'])
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'pending')
+
+        # Orders without the seller's products are out of reach
+        response = self.move([self.place(self.other_product)], 'shipped')
+        self.assertEqual(response.status_code, 400)
+
+    def test_seller_can_update_status_of_their_orders(self):
+        order = self.place(self.product)
+        response = self.client.patch(f'/api/orders/orders/{order.id}/update_status/', {'status': 'processing'})
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'processing')
+
+        response = self.client.patch(f'/api/orders/orders/{order.id}/update_status/', {'status': 'pending'})
+        self.assertEqual(response.status_code, 400)
+
+        other = self.place(self.other_product)
+        response = self.client.patch(f'/api/orders/orders/{other.id}/update_status/', {'status': 'shipped'})
+        self.assertEqual(response.status_code, 404)
+
+
+class OrderHistoryTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.customer = User.objects.create_user(username='customer_test', password='test123', user_type='customer')
+        self.products = [create_product(self.seller, name=f'Product {i}') for i in range(3)]
+        self.client.force_authenticate(user=self.customer)
+
+    def place(self, lines=1):
+        return place_order(self.customer, [(product.id, 2) for product in self.products[:lines]])
+
+    def test_list_is_compact_and_paginated(self):
+        first, second = self.place(1), self.place(3)
+        response = self.client.get('/api/orders/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [second.id, first.id])
+        self.assertEqual(response.data['results'][0]['item_count'], 6)
+        self.assertNotIn('items', response.data['results'][0])
+
+        response = self.client.get('/api/orders/orders/', {'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+        with self.settings(ORDER_PAGE_SIZE=1, ORDER_MAX_PAGE_SIZE=1):
+            self.assertEqual(len(self.client.get('/api/orders/orders/').data['results']), 1)
+            self.assertEqual(len(self.client.get('/api/orders/orders/', {'page_size': 5}).data['results']), 1)
+
+    def test_filters_by_status_and_date(self):
+        old, recent, shipped = self.place(), self.place(), self.place()
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+        fulfilment.transition(self.seller, [shipped.id], 'shipped')
+
+        def ids(**params):
+            return [row['id'] for row in self.client.get('/api/orders/orders/', params).data['results']]
+
+        self.assertEqual(ids(status='shipped'), [shipped.id])
+        since = (timezone.now() - timedelta(days=7)).date().isoformat()
+        self.assertEqual(ids(created_after=since), [shipped.id, recent.id])
+        self.assertEqual(ids(created_before=since), [old.id])
+        self.assertEqual(ids(status='pending', created_after=since), [recent.id])
+        self.assertEqual(self.client.get('/api/orders/orders/', {'status': 'lost'}).status_code, 400)
+
+    def test_query_counts_do_not_grow(self):
+        order = self.place(1)
+        with CaptureQueriesContext(connection) as small_list:
+            self.client.get('/api/orders/orders/')
+        with CaptureQueriesContext(connection) as small_detail:
+            self.client.get(f'/api/orders/orders/{order.id}/')
+
+        for _ in range(30):
+            order = self.place(3)
+        with CaptureQueriesContext(connection) as large_list:
+            response = self.client.get('/api/orders/orders/')
+        self.assertEqual(len(response.data['results']), 31)
+        with CaptureQueriesContext(connection) as large_detail:
+            response = self.client.get(f'/api/orders/orders/{order.id}/')
+        self.assertEqual(len(response.data['items']), 3)
+
+        self.assertEqual(len(small_list), len(large_list))
+        self.assertEqual(len(small_detail), len(large_detail))
+
+
+class CartTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.customer = User.objects.create_user(username='customer_test', password='test123', user_type='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.product = create_product(self.seller, price=2.50)
+
+    def add(self, product, quantity=1, **params):
+        return self.client.post(
+            '/api/orders/cart/add/' + ('?full=1' if params.get('full') else ''),
+            {'product_id': product.id, 'quantity': quantity}, format='json'
+        )
+
+    def test_mutations_return_line_and_totals(self):
+        response = self.add(self.product, 2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['item']['quantity'], 2)
+        self.assertEqual(response.data['cart']['item_count'], 2)
+        self.assertEqual(response.data['cart']['subtotal'], '5.00')
+        self.assertNotIn('items', response.data['cart'])
+
+        item_id = response.data['item']['id']
+        response = self.client.post('/api/orders/cart/update/', {'item_id': item_id, 'quantity': 5}, format='json')
+        self.assertEqual(response.data['cart']['item_count'], 5)
+        self.assertEqual(response.data['cart']['subtotal'], '12.50')
+
+        response = self.client.post('/api/orders/cart/remove/', {'item_id': item_id}, format='json')
+        self.assertIsNone(response.data['item'])
+        self.assertEqual(response.data['cart']['item_count'], 0)
+        self.assertEqual(response.data['cart']['subtotal'], '0.00')
+
+    def test_full_cart_on_request(self):
+        response = self.add(self.product, 2, full=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 1)
+        self.assertEqual(response.data['subtotal'], '5.00')
+
+    def test_rejected_change_keeps_totals(self):
+        self.add(self.product, 2)
+        response = self.add(self.product, 500)
+        self.assertEqual(response.status_code, 400)
+        cart = Cart.objects.get(user=self.customer)
+        self.assertEqual((cart.item_count, cart.subtotal), (2, Decimal('5.00')))
+
+    def test_clear_and_checkout_reset_totals(self):
+        self.add(self.product, 2)
+        self.assertEqual(self.client.delete('/api/orders/cart/clear/').status_code, 200)
+        cart = Cart.objects.get(user=self.customer)
+        self.assertEqual((cart.item_count, cart.subtotal), (0, Decimal('0.00')))
+
+        self.add(self.product, 3)
+        checkout_cart(self.customer)
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (0, Decimal('0.00')))
+
+    def test_price_change_refreshes_subtotal(self):
+        self.add(self.product, 4)
+        self.product.price = Decimal('3.00')
+        self.product.save()
+        self.assertEqual(Cart.objects.get(user=self.customer).subtotal, Decimal('12.00'))
+
+    def test_query_count_does_not_grow_with_cart(self):
+        products = [create_product(self.seller, name=f'Product {i}') for i in range(120)]
+        cart = Cart.objects.create(user=self.customer)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products[:2]])
+        self.client.get('/api/orders/cart/')
+        self.add(self.product)
+
+        with CaptureQueriesContext(connection) as small_add:
+            self.add(self.product)
+        with CaptureQueriesContext(connection) as small_read:
+            self.client.get('/api/orders/cart/')
+
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products[2:]])
+        self.client.get('/api/orders/cart/')
+
+        with CaptureQueriesContext(connection) as large_add:
+            self.add(self.product)
+        with CaptureQueriesContext(connection) as large_read:
+            response = self.client.get('/api/orders/cart/')
+
+        self.assertEqual(len(small_add), len(large_add))
+        self.assertEqual(len(small_read), len(large_read))
+        self.assertEqual(response.data['item_count'], 123)
+
+
+class CartBatchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.customer = User.objects.create_user(username='customer_test', password='test123', user_type='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.products = [create_product(self.seller, name=f'Product {i}', quantity=10, price=2.00) for i in range(3)]
+
+    def batch(self, *operations):
+        return self.client.post('/api/orders/cart/batch/', {'operations': list(operations)}, format='json')
+
+    def test_applies_operations_in_order(self):
+        first, second, third = self.products
+        self.batch({'product_id': third.id, 'quantity': 1})
+        response = self.batch(
+            {'product_id': first.id, 'quantity': 2},
+            {'product_id': first.id, 'quantity': 1, 'op': 'add'},
+            {'product_id': second.id, 'quantity': 5, 'op': 'set'},
+            {'product_id': third.id, 'op': 'remove'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {line['product_id']: line['quantity'] for line in response.data['items']},
+            {first.id: 3, second.id: 5}
+        )
+        self.assertEqual(response.data['cart']['item_count'], 8)
+        self.assertEqual(response.data['cart']['subtotal'], '16.00')
+        self.assertFalse(CartItem.objects.filter(product=third).exists())
+
+    def test_failing_operation_changes_nothing(self):
+        first, second, _ = self.products
+        self.batch({'product_id': first.id, 'quantity': 2})
+        response = self.batch(
+            {'product_id': first.id, 'quantity': 5, 'op': 'set'},
+            {'product_id': second.id, 'quantity': 11},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient stock', response.data['error'])
+        self.assertEqual(list(CartItem.objects.values_list('product_id', 'quantity')), [(first.id, 2)])
+        self.assertEqual(Cart.objects.get(user=self.customer).item_count, 2)
+
+        self.assertEqual(self.batch({'product_id': 0}).status_code, 400)
+        self.assertEqual(self.batch({'product_id': first.id, 'op': 'explode'}).status_code, 400)
+        self.assertEqual(self.batch().status_code, 400)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        Cart.objects.create(user=self.customer)
+        with CaptureQueriesContext(connection) as small:
+            self.batch({'product_id': self.products[0].id})
+
+        products = [create_product(self.seller, name=f'Bulk {i}') for i in range(50)]
+        with CaptureQueriesContext(connection) as large:
+            response = self.batch(*({'product_id': product.id} for product in products))
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(response.data['items']), 50)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Needs row-level locking')
+class ConcurrentCheckoutTestCase(TransactionTestCase):
+    buyers = 50
+    stock = 20
+
+    def test_parallel_buyers_never_oversell(self):
+        seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        product = create_product(seller, quantity=self.stock)
+        customers = []
+        for i in range(self.buyers):
+            customer = User.objects.create(username=f'buyer{i}')
+            cart = Cart.objects.create(user=customer)
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+            customers.append(customer)
+
+        barrier = threading.Barrier(self.buyers)
+        results = []
+
+        def buy(customer):
+            try:
+                barrier.wait()
+                checkout_cart(customer)
+                results.append('ok')
+            except CheckoutError:
+                results.append('rejected')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(customer,)) for customer in customers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total']
+        self.assertEqual(results.count('ok'), self.stock)
+        self.assertEqual(results.count('rejected'), self.buyers - self.stock)
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(sold, self.stock)
+        self.assertEqual(product.stock_movements.filter(reason='sale').count(), self.stock)
+
+
+class CleanupOldCartsTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        seller = User.objects.create(username='seller_test', user_type='seller')
+        product = create_product(seller)
+        customers = [User.objects.create(username=f'customer_{i}') for i in range(7)]
+        self.carts = [Cart.objects.create(user=customer) for customer in customers]
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product) for cart in self.carts])
+        # The last cart stays fresh
+        Cart.objects.filter(id__in=[cart.id for cart in self.carts[:6]]).update(
+            updated_at=timezone.now() - timedelta(days=31)
+        )
+
+    def test_deletes_stale_carts_in_batches(self):
+        result = cleanup_old_carts(batch_size=4)
+        self.assertEqual(result, 'Deleted 6 old carts')
+        self.assertEqual(list(Cart.objects.values_list('id', flat=True)), [self.carts[6].id])
+        self.assertEqual(CartItem.objects.count(), 1)
+        self.assertEqual(metrics.get('task_batches', task='cleanup_old_carts'), 2)
+        self.assertEqual(metrics.get('task_items', task='cleanup_old_carts'), 6)
+
+    def test_requeues_itself_when_out_of_time(self):
+        with mock.patch.object(cleanup_old_carts, 'apply_async') as apply_async:
+            result = cleanup_old_carts(batch_size=4, time_budget=0)
+        self.assertEqual(result, 'Deleted 4 old carts')
+        apply_async.assert_called_once_with(kwargs={'days': 30, 'batch_size': 4, 'time_budget': 0})
+
+
+class PurgeOrderEventsTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        now = timezone.now()
+        self.events = OrderEvent.objects.bulk_create(
+            [OrderEvent(order_id=i, event_type=outbox.CREATED, published_at=now - timedelta(days=8)) for i in range(5)]
+            + [OrderEvent(order_id=5, event_type=outbox.CREATED, published_at=now - timedelta(days=1))]
+            + [OrderEvent(order_id=6, event_type=outbox.CREATED)]
+        )
+
+    def test_deletes_old_published_events_in_batches(self):
+        result = purge_order_events(batch_size=2)
+        self.assertEqual(result, 'Deleted 5 published order events')
+        # The recently published and the pending event stay
+        self.assertEqual(list(OrderEvent.objects.order_by('id').values_list('order_id', flat=True)), [5, 6])
+        self.assertEqual(metrics.get('task_batches', task='purge_order_events'), 3)
+        self.assertEqual(metrics.get('task_items', task='purge_order_events'), 5)
+
+    def test_requeues_itself_when_out_of_time(self):
+        with mock.patch.object(purge_order_events, 'apply_async') as apply_async:
+            result = purge_order_events(batch_size=2, time_budget=0)
+        self.assertEqual(result, 'Deleted 2 published order events')
+        apply_async.assert_called_once_with(kwargs={'days': 7, 'batch_size': 2, 'time_budget': 0})
\ No newline at end of file
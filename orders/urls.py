@@ -10,4 +10,7 @@ urlpatterns = [
     path('cart/', views.CartViewSet.as_view({'get': 'list'}), name='cart-detail'),
     path('cart/add/', views.CartViewSet.as_view({'post': 'add_item'}), name='cart-add'),
     path('cart/remove/', views.CartViewSet.as_view({'post': 'remove_item'}), name='cart-remove'),
+    path('cart/update/', views.CartViewSet.as_view({'post': 'update_item'}), name='cart-update'),
+    path('cart/batch/', views.CartViewSet.as_view({'post': 'batch'}), name='cart-batch'),
+    path('cart/clear/', views.CartViewSet.as_view({'delete': 'clear'}), name='cart-clear'),
 ]
\ No newline at end of file
@@ -2,30 +2,56 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.shortcuts import get_object_or_404
-from django.db import transaction
-from .models import Order, OrderItem, Cart, CartItem
+from django.db.models import OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django_filters.rest_framework import DjangoFilterBackend
+from .models import Order, OrderItem
+from .checkout import CheckoutError, checkout_cart
+from .filters import OrderFilter
+from .pagination import FulfilmentCursorPagination, OrderHistoryCursorPagination
+from . import carts, fulfilment
 from .serializers import (
     OrderSerializer,
+    OrderListSerializer,
+    OrderStatusBatchSerializer,
     OrderCreateSerializer,
     CartSerializer,
-    CartItemSerializer
+    CartSummarySerializer,
+    CartLineSerializer,
+    CartBatchSerializer,
 )
-from products.models import Product
 
 
 class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Order.objects.all()
+    pagination_class = OrderHistoryCursorPagination
+    # No ?ordering=: pages follow the index order of the cursor
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
 
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
+        if self.action == 'list':
+            return OrderListSerializer
         return OrderSerializer
 
     def get_queryset(self):
+        if self.action == 'update_status':
+            # Sellers work on the orders holding their products
+            return fulfilment.managed_orders(self.request.user)
         # Only show user's own orders
-        return Order.objects.filter(user=self.request.user)
+        orders = Order.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            units = (
+                OrderItem.objects.filter(order=OuterRef('pk'))
+                .values('order').annotate(total=Sum('quantity')).values('total')
+            )
+            return orders.annotate(item_count=Coalesce(Subquery(units), 0))
+        if self.action == 'retrieve':
+            return orders.select_related('user').prefetch_related('items__product')
+        return orders
 
     def retrieve(self, request, *args, **kwargs):
         """Get single order with items"""
@@ -38,60 +64,91 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Create order from cart items
-        Automatically moves cart items to order and clears cart
+        Locks the cart's products, reduces stock, creates the order and clears
+        the cart in one transaction (see orders.checkout)
         """
-        # Get or create cart
-        cart, created = Cart.objects.get_or_create(user=request.user)
-
-        # Check if cart has items
-        cart_items = cart.items.all()
-        if not cart_items.exists():
+        try:
+            order = checkout_cart(request.user)
+        except CheckoutError as e:
             return Response(
-                {"error": "Cart is empty. Add items to cart first."},
+                {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Prepare items data for order
-        items_data = []
-        for cart_item in cart_items:
-            items_data.append({
-                'product': cart_item.product.id,
-                'quantity': cart_item.quantity,
-                'price': cart_item.product.price
-            })
-
-        # Create serializer with items
-        serializer = self.get_serializer(data={'status': 'pending', 'items': items_data})
-        serializer.is_valid(raise_exception=True)
-
-        # Save order (stock will be reduced via signals)
-        order = serializer.save()
-
-        # Clear cart items
-        cart_items.delete()
-
         # Return order details
+        order = self.get_queryset().select_related('user').prefetch_related('items__product').get(pk=order.pk)
         order_serializer = OrderSerializer(order)
         return Response(
             order_serializer.data,
             status=status.HTTP_201_CREATED
         )
 
-    @action(detail=True, methods=['patch'])
-    def update_status(self, request, pk=None):
-        """Update order status (seller or admin only)"""
-        order = self.get_object()
-
-        # Only seller of products or admin can update status
+    def sellers_only(self, request):
         if not request.user.is_staff and not request.user.is_seller:
             return Response(
                 {"error": "Only sellers or admins can update order status."},
                 status=status.HTTP_403_FORBIDDEN
             )
+        return None
+
+    @action(detail=False, methods=['get'], url_path='fulfilment')
+    def fulfilment_queue(self, request):
+        """Orders holding the seller's products, oldest first; ?status= narrows it down"""
+        denied = self.sellers_only(request)
+        if denied:
+            return denied
+
+        orders = fulfilment.managed_orders(request.user)
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            if status_filter not in fulfilment.TRANSITIONS:
+                return Response(
+                    {"error": f"Invalid status. Must be one of: {', '.join(fulfilment.TRANSITIONS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            orders = orders.filter(status=status_filter)
+
+        # A seller sees only their own lines of a shared order
+        items = OrderItem.objects.select_related('product')
+        if not request.user.is_staff:
+            items = items.filter(product__seller=request.user)
+        orders = orders.select_related('user').prefetch_related(Prefetch('items', queryset=items))
+
+        paginator = FulfilmentCursorPagination()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        return paginator.get_paginated_response(OrderSerializer(page, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """Move many orders to one status in one transaction, all or nothing"""
+        denied = self.sellers_only(request)
+        if denied:
+            return denied
+
+        serializer = OrderStatusBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        try:
+            moved = fulfilment.transition(request.user, serializer.validated_data['order_ids'], new_status)
+        except fulfilment.TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Order status updated successfully",
+            "order_ids": moved,
+            "new_status": new_status
+        })
+
+    @action(detail=True, methods=['patch'])
+    def update_status(self, request, pk=None):
+        """Update order status (seller of its products or admin only)"""
+        denied = self.sellers_only(request)
+        if denied:
+            return denied
+        order = self.get_object()
 
         new_status = request.data.get('status')
         if not new_status:
@@ -100,15 +157,10 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        valid_statuses = dict(Order.STATUS_CHOICES)
-        if new_status not in valid_statuses:
-            return Response(
-                {"error": f"Invalid status. Must be one of: {', '.join(valid_statuses.keys())}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        order.status = new_status
-        order.save()
+        try:
+            fulfilment.transition(request.user, [order.id], new_status)
+        except fulfilment.TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             "message": "Order status updated successfully",
@@ -118,94 +170,73 @@ class OrderViewSet(viewsets.ModelViewSet):
 
 
 class CartViewSet(viewsets.ViewSet):
+    """
+    Cart mutations answer with the touched line and the cart totals;
+    pass ?full=1 to get the whole cart back instead.
+    """
     permission_classes = [IsAuthenticated]
 
     def list(self, request):
         """Get user's cart with items"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(carts.full_cart(request.user))
         return Response(serializer.data)
 
+    def cart_response(self, request, cart, item=None, status_code=status.HTTP_200_OK):
+        if request.query_params.get('full') in ('1', 'true'):
+            return Response(CartSerializer(carts.full_cart(request.user)).data, status=status_code)
+        return Response({
+            'item': CartLineSerializer(item).data if item else None,
+            'cart': CartSummarySerializer(cart).data,
+        }, status=status_code)
+
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Add item to cart"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get('product_id')
         quantity = int(request.data.get('quantity', 1))
-
-        if quantity <= 0:
-            return Response(
-                {"error": "Quantity must be positive"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        product = get_object_or_404(Product, id=product_id)
-
-        if product.quantity < quantity:
-            return Response(
-                {"error": f"Insufficient stock. Available: {product.quantity} kg"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
-
-        if not created:
-            # Update quantity if item already in cart
-            cart_item.quantity += quantity
-            cart_item.save()
-
-        serializer = CartSerializer(cart)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        try:
+            cart, item = carts.add_item(request.user, product_id, quantity)
+        except carts.CartError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.cart_response(request, cart, item, status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['post'])
     def remove_item(self, request):
         """Remove item from cart"""
-        item_id = request.data.get('item_id')
-        cart = get_object_or_404(Cart, user=request.user)
-        item = get_object_or_404(CartItem, id=item_id, cart=cart)
-        item.delete()
-
-        # Return updated cart
-        serializer = CartSerializer(cart)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        cart = carts.remove_item(request.user, request.data.get('item_id'))
+        return self.cart_response(request, cart)
 
     @action(detail=False, methods=['post'])
     def update_item(self, request):
         """Update item quantity in cart"""
         item_id = request.data.get('item_id')
         quantity = int(request.data.get('quantity', 1))
+        try:
+            cart, item = carts.update_item(request.user, item_id, quantity)
+        except carts.CartError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.cart_response(request, cart, item)
 
-        if quantity <= 0:
-            return Response(
-                {"error": "Quantity must be positive"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        cart = get_object_or_404(Cart, user=request.user)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-
-        # Check stock
-        if cart_item.product.quantity < quantity:
-            return Response(
-                {"error": f"Insufficient stock. Available: {cart_item.product.quantity} kg"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        cart_item.quantity = quantity
-        cart_item.save()
-
-        serializer = CartSerializer(cart)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply several add/set/remove operations in one request, all or nothing"""
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            cart, lines = carts.apply_batch(request.user, serializer.validated_data['operations'])
+        except carts.CartError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('full') in ('1', 'true'):
+            return Response(CartSerializer(carts.full_cart(request.user)).data)
+        return Response({
+            'items': CartLineSerializer(lines, many=True).data,
+            'cart': CartSummarySerializer(cart).data,
+        })
 
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """Clear entire cart"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
+        carts.clear(request.user)
 
         return Response(
             {"message": "Cart cleared successfully"},
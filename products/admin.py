@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage
+from .models import Category, Product, ProductImage, StockMovement
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -21,4 +21,20 @@ class ProductAdmin(admin.ModelAdmin):
 class ProductImageAdmin(admin.ModelAdmin):
     list_display = ['product', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['product__name']
\ No newline at end of file
+    search_fields = ['product__name']
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['product', 'delta', 'balance', 'reason', 'reference', 'user', 'created_at']
+    list_filter = ['reason', 'created_at']
+    search_fields = ['product__name', 'reference']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
\ No newline at end of file
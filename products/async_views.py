@@ -0,0 +1,66 @@
+"""
+Async twins of the catalog read endpoints, served under /api/async/.
+Same querysets, serializers, pagination and cache as products.views, so the
+payloads match. Categories and product detail are read with the async ORM;
+the product list is paginated by DRF's cursor pagination, which evaluates
+the queryset itself and so runs in a thread through sync_to_async.
+"""
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.request import Request
+
+from config.async_views import AsyncAPIView
+from .cache import AsyncCachedResponseMixin, CATEGORIES, PRODUCTS
+from .models import Category
+from .pagination import ProductCursorPagination
+from .serializers import CategorySerializer, ProductSerializer
+from .views import shares_catalog, visible_products
+
+
+async def serialize(serializer):
+    # Image srcsets may check storage and queue their generation: blocking work
+    return await sync_to_async(lambda: serializer.data)()
+
+
+class AsyncCategoryListView(AsyncCachedResponseMixin, AsyncAPIView):
+    cache_name = 'categories'
+
+    async def get(self, request):
+        async def build():
+            categories = [category async for category in Category.objects.all()]
+            return status.HTTP_200_OK, CategorySerializer(categories, many=True, context={'request': request}).data
+
+        return await self.cached_response(request, [CATEGORIES], build)
+
+
+class AsyncProductListView(AsyncCachedResponseMixin, AsyncAPIView):
+    cache_name = 'products'
+
+    async def get(self, request):
+        async def build():
+            # The keyset logic is DRF's and evaluates the queryset itself
+            paginator = ProductCursorPagination()
+            page = await sync_to_async(paginator.paginate_queryset)(visible_products(request.user), Request(request))
+            data = await serialize(ProductSerializer(page, many=True, context={'request': request}))
+            return status.HTTP_200_OK, paginator.get_paginated_response(data).data
+
+        if not shares_catalog(request.user):
+            status_code, data = await build()
+            return self.render(data, status_code)
+        return await self.cached_response(request, [CATEGORIES, PRODUCTS], build)
+
+
+class AsyncProductDetailView(AsyncCachedResponseMixin, AsyncAPIView):
+    cache_name = 'products'
+
+    async def get(self, request, pk):
+        async def build():
+            product = await visible_products(request.user).filter(pk=pk).afirst()
+            if product is None:
+                return status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'}
+            return status.HTTP_200_OK, await serialize(ProductSerializer(product, context={'request': request}))
+
+        if not shares_catalog(request.user):
+            status_code, data = await build()
+            return self.render(data, status_code)
+        return await self.cached_response(request, [CATEGORIES, f'product:{pk}'], build)
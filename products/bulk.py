@@ -0,0 +1,186 @@
+"""
+Streaming bulk import/export of a seller's catalog, keyed by SKU.
+
+Uploads are read row by row and processed in chunks: each chunk is
+validated in memory against a category lookup loaded once, then written
+with one bulk_update and one bulk_create. The quantity of an existing
+product is not overwritten: the difference from the stored value goes
+through adjust_stock() as one ADJUSTMENT, so sales made meanwhile are kept
+and ledgered. Bad rows are reported back without stopping the rest of the
+file.
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import invalidate_products
+from .search import refresh_search_vectors
+from .models import Category, Product
+from .stock import ADJUSTMENT, StockError, adjust_stock
+
+EXPORT_FIELDS = ['sku', 'name', 'description', 'price', 'quantity', 'category', 'is_active']
+# Quantity is applied through adjust_stock(), never written directly
+UPDATE_FIELDS = ['name', 'description', 'price', 'category', 'is_active']
+FORMATS = ('csv', 'jsonl')
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """One import row; `category` may be a category id or name"""
+    sku = serializers.CharField(max_length=64)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, default='')
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField(default=0)
+    category = serializers.CharField(allow_blank=True, required=False, default='')
+    is_active = serializers.BooleanField(default=True)
+
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Price must be greater than 0")
+        return value
+
+    def validate_quantity(self, value):
+        if value < 0:
+            raise serializers.ValidationError("Quantity cannot be negative")
+        return value
+
+    def validate_category(self, value):
+        """Resolve against the lookup loaded once for the whole import"""
+        if not value:
+            return None
+        categories = self.context['categories']
+        category = categories.get(value.strip().lower())
+        if category is None:
+            raise serializers.ValidationError("Category does not exist")
+        return category
+
+
+def load_categories():
+    """Category lookup by id and by lower-cased name"""
+    lookup = {}
+    for category in Category.objects.all():
+        lookup[str(category.id)] = category
+        lookup[category.name.lower()] = category
+    return lookup
+
+
+def iter_rows(uploaded_file, file_format):
+    """Yield (row_number, dict or error message) without reading the whole file"""
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='' if file_format == 'csv' else None)
+
+    if file_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=2):
+            # Empty cells fall back to the field defaults
+            yield row_number, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {e}"
+            continue
+        yield row_number, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_products(seller, uploaded_file, file_format, chunk_size=500):
+    """Create or update the seller's products from an upload, returning a summary"""
+    categories = load_categories()
+    result = {'created': 0, 'updated': 0, 'errors': []}
+
+    for chunk in _chunks(iter_rows(uploaded_file, file_format), chunk_size):
+        valid = {}
+        for row_number, row in chunk:
+            if isinstance(row, str):
+                result['errors'].append({'row': row_number, 'errors': {'non_field_errors': [row]}})
+                continue
+            serializer = ProductImportRowSerializer(data=row, context={'categories': categories})
+            if not serializer.is_valid():
+                result['errors'].append({'row': row_number, 'sku': row.get('sku'), 'errors': serializer.errors})
+                continue
+            # A SKU repeated within a chunk keeps its last row
+            valid[serializer.validated_data['sku']] = row_number, serializer.validated_data
+
+        if not valid:
+            continue
+
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                existing = {
+                    product.sku: product
+                    for product in Product.objects.filter(seller=seller, sku__in=valid)
+                }
+                to_update, to_create, deltas = [], [], {}
+                for sku, (_, data) in valid.items():
+                    product = existing.get(sku)
+                    if product is None:
+                        to_create.append(Product(seller=seller, **data))
+                        continue
+                    for field in UPDATE_FIELDS:
+                        setattr(product, field, data[field])
+                    product.updated_at = now
+                    to_update.append(product)
+                    deltas[product.pk] = data['quantity'] - product.quantity
+
+                Product.objects.bulk_update(to_update, UPDATE_FIELDS + ['updated_at'])
+                adjust_stock(deltas, ADJUSTMENT, user=seller, reference='bulk-import')
+                created = Product.objects.bulk_create(to_create)
+                product_ids = [product.pk for product in to_update + created]
+                refresh_search_vectors(Product.objects.filter(pk__in=product_ids))
+                invalidate_products(product_ids)
+        except StockError as e:
+            # Stock sold since the rows were read; the whole chunk is left unchanged
+            result['errors'].extend(
+                {'row': row_number, 'sku': sku, 'errors': {'quantity': [str(e)]}}
+                for sku, (row_number, _) in valid.items()
+            )
+            continue
+
+        result['created'] += len(created)
+        result['updated'] += len(to_update)
+
+    return result
+
+
+class _Echo:
+    """File-like object whose write() hands the value back to the csv writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, file_format, chunk_size=2000):
+    """Yield the serialized catalog one line at a time"""
+    rows = queryset.order_by('id').values_list(
+        'sku', 'name', 'description', 'price', 'quantity', 'category__name', 'is_active'
+    ).iterator(chunk_size=chunk_size)
+
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+
+    for row in rows:
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['price'] = str(record['price'])
+        yield json.dumps(record) + '\n'
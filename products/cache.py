@@ -0,0 +1,168 @@
+"""
+Response cache for the read-heavy catalog endpoints.
+
+Cached entries are keyed by version numbers stored in the cache itself.
+Saving or deleting a product or category bumps the affected versions,
+which makes every entry built from the old data unreachable at once
+without having to find and delete individual keys.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from rest_framework import status
+from rest_framework.response import Response
+
+from config import metrics
+
+CATEGORIES = 'categories'
+PRODUCTS = 'products'
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f'catalog:version:{scope}'
+
+
+def get_versions(*scopes):
+    """Current version of each scope, initialising missing ones"""
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so a version evicted from the cache never
+            # comes back with a value older entries were stored under
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(*scopes):
+    """get_versions() for async views"""
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), None)
+
+
+def invalidate(*scopes):
+    """Invalidate scopes once the current transaction commits"""
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def invalidate_products(product_ids):
+    """Invalidate the product list pages and the given products' detail pages"""
+    invalidate(PRODUCTS, *(f'product:{product_id}' for product_id in product_ids))
+
+
+def invalidate_categories():
+    """Category names appear in every product payload, so this reaches products too"""
+    invalidate(CATEGORIES)
+
+
+def make_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return '"%s"' % hashlib.md5(payload).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return etag in [tag.strip() for tag in header.split(',')] or header.strip() == '*'
+
+
+class CachedResponseMixin:
+    """
+    Serve list/retrieve responses from the catalog cache.
+    Views set `cache_name` and may override `is_response_cacheable` and
+    `get_cache_scopes`.
+    """
+    cache_name = None
+
+    def is_response_cacheable(self, request):
+        return True
+
+    def get_cache_scopes(self):
+        return [CATEGORIES]
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        versions = '.'.join(str(version) for version in get_versions(*self.get_cache_scopes()))
+        url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f'catalog:response:{self.cache_name}:{self.action}:{versions}:{url_hash}'
+
+        entry = cache.get(key)
+        if entry is None:
+            metrics.increment('catalog_cache_misses', view=self.cache_name)
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = {'data': response.data, 'etag': make_etag(response.data)}
+            cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+        else:
+            metrics.increment('catalog_cache_hits', view=self.cache_name)
+
+        if etag_matches(request, entry['etag']):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': entry['etag']})
+        return Response(entry['data'], headers={'ETag': entry['etag']})
+
+
+class AsyncCachedResponseMixin:
+    """
+    CachedResponseMixin for config.async_views.AsyncAPIView subclasses, keyed
+    by the same version scopes. Views set `cache_name` and call
+    `cached_response(request, scopes, build)`, where `build` is a coroutine
+    function returning (status code, data); only 200 responses are stored.
+    """
+    cache_name = None
+
+    async def cached_response(self, request, scopes, build):
+        cache = get_cache()
+        versions = '.'.join(str(version) for version in await aget_versions(*scopes))
+        url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f'catalog:response:{self.cache_name}:async:{versions}:{url_hash}'
+
+        entry = await cache.aget(key)
+        if entry is None:
+            metrics.increment('catalog_cache_misses', view=self.cache_name)
+            status_code, data = await build()
+            if status_code != status.HTTP_200_OK:
+                return self.render(data, status_code)
+            entry = {'data': data, 'etag': make_etag(data)}
+            await cache.aset(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+        else:
+            metrics.increment('catalog_cache_hits', view=self.cache_name)
+
+        if etag_matches(request, entry['etag']):
+            return HttpResponseNotModified(headers={'ETag': entry['etag']})
+        return self.render(entry['data'], headers={'ETag': entry['etag']})
@@ -1,91 +1,313 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
 from products.models import Category, Product
+from products.search import refresh_search_vectors
+from products.cache import invalidate, CATEGORIES
+from orders.models import Order, OrderItem
+from dashboard import rollups
+from config.seeding import backdated
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from itertools import accumulate
 import random
+import time
 
 User = get_user_model()
 
+CATEGORIES_DATA = [
+    {'name': 'Vegetables', 'description': 'Fresh organic vegetables'},
+    {'name': 'Fruits', 'description': 'Seasonal fresh fruits'},
+    {'name': 'Dairy', 'description': 'Fresh dairy products'},
+    {'name': 'Grains', 'description': 'Whole grains and cereals'},
+    {'name': 'Herbs', 'description': 'Fresh and dried herbs'},
+]
+
+PRODUCTS_DATA = [
+    {'name': 'Fresh Tomatoes', 'category': 0, 'price': '5.99', 'quantity': 100},
+    {'name': 'Organic Carrots', 'category': 0, 'price': '3.49', 'quantity': 80},
+    {'name': 'Green Lettuce', 'category': 0, 'price': '2.99', 'quantity': 60},
+    {'name': 'Fresh Apples', 'category': 1, 'price': '4.99', 'quantity': 120},
+    {'name': 'Ripe Bananas', 'category': 1, 'price': '2.49', 'quantity': 150},
+    {'name': 'Strawberries', 'category': 1, 'price': '6.99', 'quantity': 40},
+    {'name': 'Fresh Milk', 'category': 2, 'price': '3.99', 'quantity': 50},
+    {'name': 'Farm Eggs', 'category': 2, 'price': '5.49', 'quantity': 70},
+    {'name': 'Cheddar Cheese', 'category': 2, 'price': '7.99', 'quantity': 30},
+    {'name': 'Brown Rice', 'category': 3, 'price': '8.99', 'quantity': 90},
+    {'name': 'Whole Wheat', 'category': 3, 'price': '6.49', 'quantity': 100},
+    {'name': 'Fresh Basil', 'category': 4, 'price': '2.99', 'quantity': 25},
+    {'name': 'Oregano', 'category': 4, 'price': '3.49', 'quantity': 20},
+]
+
+# Generated catalog: produce per category (same order as CATEGORIES_DATA) and price range
+PRODUCE = [
+    (['Tomatoes', 'Carrots', 'Lettuce', 'Potatoes', 'Onions', 'Peppers', 'Cucumbers', 'Spinach', 'Kale', 'Beets'], (1, 8)),
+    (['Apples', 'Bananas', 'Strawberries', 'Pears', 'Plums', 'Cherries', 'Peaches', 'Grapes', 'Melons'], (2, 12)),
+    (['Milk', 'Eggs', 'Cheese', 'Butter', 'Yogurt', 'Cream', 'Kefir'], (2, 15)),
+    (['Rice', 'Wheat', 'Oats', 'Barley', 'Buckwheat', 'Corn Flour', 'Rye'], (3, 20)),
+    (['Basil', 'Oregano', 'Mint', 'Dill', 'Parsley', 'Thyme', 'Rosemary'], (1, 6)),
+]
+ADJECTIVES = ['Fresh', 'Organic', 'Local', 'Farm', 'Heirloom', 'Seasonal', 'Premium', 'Wild', 'Homegrown']
+FIRST_NAMES = ['Alex', 'Sam', 'Maria', 'John', 'Aziz', 'Dilnoza', 'Olga', 'Timur', 'Emma', 'Lee', 'Nodira', 'Omar']
+LAST_NAMES = ['Farmer', 'Smith', 'Karimov', 'Ivanova', 'Brown', 'Rashidov', 'Garcia', 'Chen', 'Usmonova']
+
+# Relative order volume per hour of the day (busy evenings, quiet nights)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 9, 10, 9, 8, 8, 9, 11, 13, 14, 12, 8, 4, 2]
+
+
+def order_status(rng, age):
+    """Status an order of the given age (timedelta) would realistically have by now"""
+    if age < timedelta(days=1):
+        return rng.choice(['pending', 'pending', 'processing'])
+    if age < timedelta(days=4):
+        return rng.choice(['processing', 'shipped', 'shipped'])
+    if age < timedelta(days=10):
+        return rng.choice(['shipped', 'delivered', 'delivered', 'delivered'])
+    return 'cancelled' if rng.random() < 0.06 else 'delivered'
+
 
 class Command(BaseCommand):
-    help = 'Seed database with sample data'
+    help = (
+        'Seed database with sample data. The scale options generate a production-sized '
+        'dataset on top of the demo accounts; users and products are topped up to the '
+        'requested counts, while --orders always adds new orders.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sellers', type=int, default=0, help='Generated seller accounts')
+        parser.add_argument('--customers', type=int, default=0, help='Generated customer accounts')
+        parser.add_argument('--products', type=int, default=0, help='Generated products, spread over the sellers')
+        parser.add_argument('--orders', type=int, default=0, help='Orders to add')
+        parser.add_argument('--items-per-order', type=int, default=3, help='Average order size')
+        parser.add_argument('--days', type=int, default=365, help='Spread order history over this many days')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=20000, help='Rows per INSERT/COPY batch')
+        parser.add_argument('--password', default='password123', help='Password shared by every seeded account')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+        # Hashing is deliberately slow, so every account shares one hash
+        password = make_password(options['password'])
 
-    def handle(self, *args, **kwargs):
         self.stdout.write('Seeding data...')
+        categories, created_categories = self.seed_categories()
+        seller1, customer1, created_products = self.seed_demo(categories, password)
+
+        sellers = self.seed_users('seller', options['sellers'], password, rng) or [seller1]
+        customers = self.seed_users('customer', options['customers'], password, rng) or [customer1]
+        catalog = self.seed_products(sellers, categories, options['products'], options['days'], rng)
+
+        items = 0
+        if options['orders']:
+            if not catalog:
+                catalog = list(Product.objects.filter(is_active=True).values_list('id', 'price'))
+            items = self.seed_orders(customers, catalog, options, rng)
+            self.stdout.write('Rebuilding sales rollups...')
+            rollups.rebuild()
+
+        refresh_search_vectors(Product.objects.filter(search_vector__isnull=True))
+        invalidate(CATEGORIES)
+
+        self.stdout.write(self.style.SUCCESS('Successfully seeded database!'))
+        self.stdout.write(f"Created users: seller1/customer1 (password: {options['password']})")
+        self.stdout.write(f'Created {created_categories} categories')
+        self.stdout.write(f'Created {created_products} demo products')
+        if options['sellers'] or options['customers'] or options['products'] or options['orders']:
+            self.stdout.write(
+                f"Generated: {options['sellers']} sellers, {options['customers']} customers, "
+                f"{len(catalog)} active products, {options['orders']} orders with {items} items "
+                f"in {time.perf_counter() - started:.1f} s"
+            )
+
+    def seed_categories(self):
+        """The demo categories, and how many of them had to be created"""
+        existing = {category.name: category for category in Category.objects.all()}
+        missing = [Category(**data) for data in CATEGORIES_DATA if data['name'] not in existing]
+        created = Category.objects.bulk_create(missing)
+        for category in created:
+            existing[category.name] = category
+        return [existing[data['name']] for data in CATEGORIES_DATA], len(created)
 
-        # Create users
-        seller1, _ = User.objects.get_or_create(
+    def seed_demo(self, categories, password):
+        seller1, _ = User.objects.update_or_create(
             username='seller1',
             defaults={
                 'email': 'seller1@example.com',
                 'user_type': 'seller',
                 'first_name': 'John',
-                'last_name': 'Farmer'
+                'last_name': 'Farmer',
+                'password': password,
             }
         )
-        seller1.set_password('password123')
-        seller1.save()
-
-        customer1, _ = User.objects.get_or_create(
+        customer1, _ = User.objects.update_or_create(
             username='customer1',
             defaults={
                 'email': 'customer1@example.com',
                 'user_type': 'customer',
                 'first_name': 'Jane',
-                'last_name': 'Smith'
+                'last_name': 'Smith',
+                'password': password,
             }
         )
-        customer1.set_password('password123')
-        customer1.save()
-
-        # Create categories
-        categories_data = [
-            {'name': 'Vegetables', 'description': 'Fresh organic vegetables'},
-            {'name': 'Fruits', 'description': 'Seasonal fresh fruits'},
-            {'name': 'Dairy', 'description': 'Fresh dairy products'},
-            {'name': 'Grains', 'description': 'Whole grains and cereals'},
-            {'name': 'Herbs', 'description': 'Fresh and dried herbs'},
-        ]
 
-        categories = []
-        for cat_data in categories_data:
-            cat, _ = Category.objects.get_or_create(
-                name=cat_data['name'],
-                defaults={'description': cat_data['description']}
+        existing = set(Product.objects.filter(
+            name__in=[data['name'] for data in PRODUCTS_DATA]
+        ).values_list('name', flat=True))
+        created = Product.objects.bulk_create([
+            Product(
+                seller=seller1,
+                category=categories[data['category']],
+                name=data['name'],
+                description=f"High quality {data['name'].lower()} from local farm",
+                price=Decimal(data['price']),
+                quantity=data['quantity'],
+                is_active=True
             )
-            categories.append(cat)
-
-        # Create products
-        products_data = [
-            {'name': 'Fresh Tomatoes', 'category': 0, 'price': '5.99', 'quantity': 100},
-            {'name': 'Organic Carrots', 'category': 0, 'price': '3.49', 'quantity': 80},
-            {'name': 'Green Lettuce', 'category': 0, 'price': '2.99', 'quantity': 60},
-            {'name': 'Fresh Apples', 'category': 1, 'price': '4.99', 'quantity': 120},
-            {'name': 'Ripe Bananas', 'category': 1, 'price': '2.49', 'quantity': 150},
-            {'name': 'Strawberries', 'category': 1, 'price': '6.99', 'quantity': 40},
-            {'name': 'Fresh Milk', 'category': 2, 'price': '3.99', 'quantity': 50},
-            {'name': 'Farm Eggs', 'category': 2, 'price': '5.49', 'quantity': 70},
-            {'name': 'Cheddar Cheese', 'category': 2, 'price': '7.99', 'quantity': 30},
-            {'name': 'Brown Rice', 'category': 3, 'price': '8.99', 'quantity': 90},
-            {'name': 'Whole Wheat', 'category': 3, 'price': '6.49', 'quantity': 100},
-            {'name': 'Fresh Basil', 'category': 4, 'price': '2.99', 'quantity': 25},
-            {'name': 'Oregano', 'category': 4, 'price': '3.49', 'quantity': 20},
-        ]
+            for data in PRODUCTS_DATA if data['name'] not in existing
+        ])
+        return seller1, customer1, len(created)
+
+    def seed_users(self, user_type, count, password, rng):
+        """Top up the seed_<type>_<n> accounts to `count` and return them all"""
+        usernames = [f'seed_{user_type}_{i}' for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(
+                username=username,
+                email=f'{username}@example.com',
+                user_type=user_type,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for username in usernames if username not in existing
+        ], batch_size=self.batch_size)
+        return list(User.objects.filter(username__in=usernames).order_by('id'))
+
+    def seed_products(self, sellers, categories, count, days, rng):
+        """Top up the generated (SEED- SKU) products to `count`; return (id, price) pairs"""
+        if not count:
+            return []
+        seeded = Product.objects.filter(seller__in=sellers, sku__startswith='SEED-')
+        per_seller = dict(seeded.values('seller').annotate(total=Count('id')).values_list('seller', 'total'))
+        now = timezone.now()
+
+        products = []
+        for index in range(count):
+            seller = sellers[index % len(sellers)]
+            number = index // len(sellers)
+            if number < per_seller.get(seller.id, 0):
+                continue
+            category_index = rng.randrange(len(categories))
+            names, (low, high) = PRODUCE[category_index]
+            produce = rng.choice(names)
+            products.append(Product(
+                seller=seller,
+                category=categories[category_index],
+                sku=f'SEED-{number}',
+                name=f'{rng.choice(ADJECTIVES)} {produce}',
+                description=f'{produce} from {seller.first_name} {seller.last_name}\'s farm, harvested to order',
+                price=Decimal(rng.randrange(low * 100, high * 100)) / 100,
+                quantity=0 if rng.random() < 0.05 else rng.randint(1, 500),
+                is_active=rng.random() > 0.02,
+                created_at=now - timedelta(days=rng.randrange(days + 30), seconds=rng.randrange(86400)),
+            ))
+
+        with backdated(Product):
+            Product.objects.bulk_create(products, batch_size=self.batch_size)
+        self.stdout.write(f'Created {len(products)} generated products')
+        return list(seeded.filter(is_active=True).order_by('id').values_list('id', 'price'))
 
-        for prod_data in products_data:
-            Product.objects.get_or_create(
-                name=prod_data['name'],
-                defaults={
-                    'seller': seller1,
-                    'category': categories[prod_data['category']],
-                    'description': f"High quality {prod_data['name'].lower()} from local farm",
-                    'price': Decimal(prod_data['price']),
-                    'quantity': prod_data['quantity'],
-                    'is_active': True
+    def seed_orders(self, customers, catalog, options, rng):
+        """
+        Add orders with a realistic shape: volume growing over the period with
+        weekend peaks, busy evening hours, a long tail of product popularity,
+        and statuses that depend on how old the order is.
+        """
+        days = options['days']
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        day_weights = list(accumulate(
+            (0.5 + day / days) * (1.3 if (today - timedelta(days=days - 1 - day)).weekday() >= 5 else 1.0)
+            for day in range(days)
+        ))
+        hour_weights = list(accumulate(HOUR_WEIGHTS))
+        shuffled = catalog[:]
+        rng.shuffle(shuffled)
+        popularity = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(shuffled))))
+        max_lines = max(1, 2 * options['items_per_order'] - 1)
+        orders_per_batch = max(1, self.batch_size // options['items_per_order'])
+        write = self.copy_batch if connection.vendor == 'postgresql' else self.insert_batch
+
+        remaining, items = options['orders'], 0
+        while remaining:
+            batch = []
+            for _ in range(min(orders_per_batch, remaining)):
+                day = rng.choices(range(days), cum_weights=day_weights)[0]
+                hour = rng.choices(range(24), cum_weights=hour_weights)[0]
+                created_at = today - timedelta(days=days - 1 - day) + timedelta(hours=hour, seconds=rng.randrange(3600))
+                created_at = min(created_at, timezone.now())
+                picked = {
+                    product_id: price
+                    for product_id, price in rng.choices(shuffled, cum_weights=popularity, k=rng.randint(1, max_lines))
                 }
+                lines = [(product_id, price, rng.randint(1, 5)) for product_id, price in picked.items()]
+                batch.append((
+                    rng.choice(customers).id,
+                    order_status(rng, timezone.now() - created_at),
+                    sum(price * quantity for _, price, quantity in lines),
+                    created_at,
+                    lines,
+                ))
+            with transaction.atomic():
+                items += write(batch)
+            remaining -= len(batch)
+            self.stdout.write(f"  {options['orders'] - remaining}/{options['orders']} orders, {items} items")
+        return items
+
+    def copy_batch(self, batch):
+        """PostgreSQL: reserve order ids from the sequence, then COPY orders and items"""
+        order_table = Order._meta.db_table
+        item_table = OrderItem._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [order_table, len(batch)],
             )
+            order_ids = [row[0] for row in cursor.fetchall()]
 
-        self.stdout.write(self.style.SUCCESS('Successfully seeded database!'))
-        self.stdout.write(f'Created users: seller1/customer1 (password: password123)')
-        self.stdout.write(f'Created {len(categories)} categories')
-        self.stdout.write(f'Created {len(products_data)} products')
+            orders, items, count = StringIO(), StringIO(), 0
+            for order_id, (user_id, status, total, created_at, lines) in zip(order_ids, batch):
+                updated_at = created_at + timedelta(hours=2) if status != 'pending' else created_at
+                orders.write(f'{order_id}\t{user_id}\t{status}\t{total}\t{created_at.isoformat()}\t{updated_at.isoformat()}\n')
+                for product_id, price, quantity in lines:
+                    items.write(f'{order_id}\t{product_id}\t{quantity}\t{price}\n')
+                    count += 1
+            orders.seek(0)
+            items.seek(0)
+            cursor.copy_expert(
+                f'COPY {order_table} (id, user_id, status, total_amount, created_at, updated_at) FROM STDIN', orders
+            )
+            cursor.copy_expert(f'COPY {item_table} (order_id, product_id, quantity, price) FROM STDIN', items)
+        return count
+
+    def insert_batch(self, batch):
+        """Other databases: two bulk_create calls per batch"""
+        orders = [
+            Order(user_id=user_id, status=status, total_amount=total, created_at=created_at)
+            for user_id, status, total, created_at, _ in batch
+        ]
+        with backdated(Order):
+            Order.objects.bulk_create(orders, batch_size=self.batch_size)
+        items = [
+            OrderItem(order=order, product_id=product_id, quantity=quantity, price=price)
+            for order, (*_, lines) in zip(orders, batch)
+            for product_id, price, quantity in lines
+        ]
+        OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+        return len(items)
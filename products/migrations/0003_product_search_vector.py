@@ -0,0 +1,58 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_idx')
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends keep the column unindexed
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('products', 'Product'), SEARCH_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('products', 'Product'), SEARCH_INDEX)
+
+
+def populate_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        """
+        UPDATE products_product AS p SET search_vector =
+            setweight(to_tsvector('english', coalesce(p.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(p.description, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(c.name, '')), 'C')
+        FROM products_product AS p2
+        LEFT JOIN products_category AS c ON c.id = p2.category_id
+        WHERE p.id = p2.id
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='product', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0003_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('balance', models.IntegerField(help_text='Product quantity after this movement')),
+                ('reason', models.CharField(choices=[('restock', 'Restock'), ('sale', 'Sale'), ('cancel', 'Cancellation'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(blank=True, help_text='e.g. order:42', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['product', '-created_at'], name='stock_movement_product_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+from config.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('products', '0004_stockmovement'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', 'id'], name='product_active_recent_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='product',
+            index=models.Index(fields=['seller', '-created_at', 'id'], name='product_seller_recent_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('quantity__lte', 10)), fields=['seller', 'quantity'], name='product_low_stock_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -19,6 +21,7 @@ class Category(models.Model):
 class Product(models.Model):
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='products')
+    sku = models.CharField(max_length=64, blank=True, null=True, help_text="Seller's own stock keeping unit")
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -27,9 +30,29 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted name/description/category text, maintained by products.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'sku'], name='unique_seller_sku'),
+        ]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_idx'),
+            # Catalog pages for shoppers: active products, newest first (cursor order)
+            models.Index(
+                fields=['-created_at', 'id'], condition=models.Q(is_active=True), name='product_active_recent_idx'
+            ),
+            # A seller's own catalog, same order
+            models.Index(fields=['seller', '-created_at', 'id'], name='product_seller_recent_idx'),
+            # Low-stock digest (products.tasks.low_stock_products); only the few low rows are indexed
+            models.Index(
+                fields=['seller', 'quantity'],
+                condition=models.Q(is_active=True, quantity__lte=10),
+                name='product_low_stock_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -42,6 +65,37 @@ class Product(models.Model):
     def low_stock(self):
         return 0 < self.quantity <= 10
 
+class StockMovement(models.Model):
+    """Append-only ledger of every change to Product.quantity (see products.stock)"""
+    REASON_CHOICES = [
+        ('restock', 'Restock'),
+        ('sale', 'Sale'),
+        ('cancel', 'Cancellation'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    delta = models.IntegerField()
+    balance = models.IntegerField(help_text="Product quantity after this movement")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=100, blank=True, help_text="e.g. order:42")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='stock_movement_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.delta:+d} {self.product_id} ({self.reason})"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Stock movements cannot be changed once recorded")
+        super().save(*args, **kwargs)
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/gallery/')
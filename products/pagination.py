@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from config.pagination import SettingsPageSizeMixin
+
+
+class ProductCursorPagination(SettingsPageSizeMixin, CursorPagination):
+    """
+    Keyset pagination for the product catalog.
+    Pages are ordered by (-created_at, id), so fetching page N costs the same
+    single indexed query as fetching page 1, and no COUNT(*) is ever issued.
+    """
+    ordering = ('-created_at', 'id')
+    page_size_setting = 'PRODUCT_PAGE_SIZE'
+    max_page_size_setting = 'PRODUCT_MAX_PAGE_SIZE'
+
+
+class SearchResultsPagination(SettingsPageSizeMixin, PageNumberPagination):
+    """Search results are ordered by rank, which a keyset cursor cannot follow"""
+    page_size_setting = 'PRODUCT_PAGE_SIZE'
+    max_page_size_setting = 'PRODUCT_MAX_PAGE_SIZE'
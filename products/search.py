@@ -0,0 +1,67 @@
+"""
+Full-text product search backed by Product.search_vector (GIN indexed).
+
+The vector weights the product name (A) above its description (B) and
+category name (C). It is kept current by products.signals and by the bulk
+import; refresh_search_vectors() rebuilds it for any queryset.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category
+
+SEARCH_CONFIG = 'english'
+
+
+def search_enabled():
+    """Full-text search needs PostgreSQL; other databases fall back to a plain filter"""
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(category_name, Value('')), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the stored vector for every product in the queryset (one UPDATE)"""
+    if search_enabled():
+        queryset.update(search_vector=search_vector())
+
+
+def build_query(text):
+    """
+    Turn free text into a prefix-matching tsquery ("fresh tom" -> fresh:* & tom:*)
+    so results show up while the user is still typing. Returns None for text
+    without any searchable word.
+    """
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_products(queryset, text):
+    """Products matching `text`, best matches first"""
+    query = build_query(text)
+    if query is None:
+        return queryset.none()
+
+    if not search_enabled():
+        terms = re.findall(r'\w+', text.lower())
+        condition = Q()
+        for term in terms:
+            condition &= Q(name__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition).order_by('-created_at', 'id')
+
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank', 'id')
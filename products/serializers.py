@@ -1,5 +1,8 @@
+from django.db import models, transaction
 from rest_framework import serializers
+from config import images
 from .models import Product, Category
+from .stock import ADJUSTMENT, StockError, adjust_stock
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -14,21 +17,38 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = '__all__'
 
+class ProductListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        """Look up the resized image widths of the whole page at once"""
+        products = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.context['image_widths'] = images.available_widths_many(
+            product.image.name for product in products if product.image
+        )
+        return super().to_representation(products)
+
 class ProductSerializer(serializers.ModelSerializer):
     seller = UserSerializer(read_only=True)
     seller_name = serializers.CharField(source='seller.username', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     in_stock = serializers.BooleanField(read_only=True)
     low_stock = serializers.BooleanField(read_only=True)
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'seller', 'seller_name', 'category', 'category_name',
-            'name', 'description', 'price', 'quantity', 'image',
+            'sku', 'name', 'description', 'price', 'quantity', 'image', 'image_srcset',
             'is_active', 'created_at', 'updated_at', 'in_stock', 'low_stock'
         ]
         read_only_fields = ['seller', 'created_at', 'updated_at']
+        list_serializer_class = ProductListSerializer
+
+    def get_image_srcset(self, obj):
+        """{"webp": ..., "jpeg": ...} srcset strings of the resized images, null until they exist"""
+        request = self.context.get('request')
+        widths = self.context.get('image_widths', {}).get(obj.image.name) if obj.image else None
+        return images.srcset(obj.image, request.build_absolute_uri if request else None, widths)
 
     def create(self, validated_data):
         """Create product with current user as seller"""
@@ -37,6 +57,28 @@ class ProductSerializer(serializers.ModelSerializer):
             validated_data['seller'] = request.user
         return super().create(validated_data)
 
+    def update(self, instance, validated_data):
+        """
+        Save the other fields without writing quantity; a new quantity is
+        applied as the difference from the value read, through adjust_stock()
+        """
+        quantity = validated_data.pop('quantity', None)
+        request = self.context.get('request')
+        with transaction.atomic():
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+            if quantity is not None:
+                try:
+                    balances = adjust_stock(
+                        {instance.pk: quantity - instance.quantity}, ADJUSTMENT,
+                        user=request.user if request else None, reference='product-update',
+                    )
+                except StockError as e:
+                    raise serializers.ValidationError({'quantity': [str(e)]})
+                instance.quantity = balances.get(instance.pk, instance.quantity)
+        return instance
+
     def validate_price(self, value):
         """Validate price is positive"""
         if value <= 0:
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from config import images
+from .models import Product, Category, ProductImage
+from . import cache
+from .search import refresh_search_vectors
+
+images.track(Product, 'image')
+images.track(ProductImage, 'image')
+images.track(Category, 'image')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    '''Drop cached catalog responses that include this product'''
+    cache.invalidate_products([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    '''Drop cached category and product responses after a category change'''
+    cache.invalidate_categories()
+
+
+@receiver(post_save, sender=Product)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    '''Recompute the product's search vector when its text may have changed'''
+    if update_fields and not {'name', 'description', 'category'} & set(update_fields):
+        return
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(sender, instance, created, **kwargs):
+    '''Category names are part of the search vector of their products'''
+    if not created:
+        refresh_search_vectors(Product.objects.filter(category=instance))
+
+
+@receiver(images.derivatives_ready)
+def invalidate_resized_images(sender, name, **kwargs):
+    '''Cached catalog responses were built without the new srcset'''
+    cache.invalidate_products(Product.objects.filter(image=name).values_list('id', flat=True))
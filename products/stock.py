@@ -0,0 +1,77 @@
+"""
+Stock changes go through adjust_stock(), never through Product.save().
+
+Every call locks the affected rows in id order, applies all deltas with one
+UPDATE (quantity = quantity + delta, so concurrent adjustments never lose each
+other's writes) and appends one StockMovement per product to the ledger.
+"""
+from django.db import transaction
+from django.db.models import Case, F, When
+
+from .cache import invalidate_products
+from .models import Product, StockMovement
+
+RESTOCK = 'restock'
+SALE = 'sale'
+CANCEL = 'cancel'
+ADJUSTMENT = 'adjustment'
+
+
+class StockError(Exception):
+    """Adjustment refused (unknown product or not enough stock); nothing was changed"""
+
+
+def adjust_stock(deltas, reason, user=None, reference='', locked=None):
+    """
+    Apply {product_id: delta} atomically and return {product_id: new quantity}.
+
+    Runs in three queries whatever the number of products: SELECT ... FOR
+    UPDATE, one conditional UPDATE and one bulk INSERT into the ledger.
+    A caller that already holds the row locks in its transaction passes
+    `locked`, {product_id: quantity} as read under the lock, and saves the
+    SELECT.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+
+    with transaction.atomic():
+        if locked is not None:
+            current = {product_id: locked[product_id] for product_id in deltas if product_id in locked}
+        else:
+            # Locking in id order keeps concurrent multi-product adjustments from deadlocking
+            current = dict(
+                Product.objects.select_for_update()
+                .filter(id__in=deltas)
+                .order_by('id')
+                .values_list('id', 'quantity')
+            )
+        missing = set(deltas) - set(current)
+        if missing:
+            raise StockError(f"Products not found: {', '.join(map(str, sorted(missing)))}")
+
+        balances = {product_id: current[product_id] + delta for product_id, delta in deltas.items()}
+        short = sorted(product_id for product_id, balance in balances.items() if balance < 0)
+        if short:
+            raise StockError(
+                "Insufficient stock for products: "
+                + ', '.join(f"{product_id} (available {current[product_id]})" for product_id in short)
+            )
+
+        Product.objects.filter(id__in=deltas).update(
+            quantity=Case(*(When(id=product_id, then=F('quantity') + delta) for product_id, delta in deltas.items()))
+        )
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                product_id=product_id,
+                delta=delta,
+                balance=balances[product_id],
+                reason=reason,
+                reference=reference,
+                user=user,
+            )
+            for product_id, delta in sorted(deltas.items())
+        ])
+        invalidate_products(deltas)
+
+    return balances
@@ -1,39 +1,97 @@
+import time
+from itertools import groupby
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from config import metrics
+from config.routers import replica_reads
 from .models import Product
+from .stock import ADJUSTMENT, StockError, adjust_stock
 
-@shared_task
-def check_low_stock():
-    """Check for low stock products and notify sellers"""
-    low_stock_products = Product.objects.filter(
-        quantity__lte=10,
+LOW_STOCK_THRESHOLD = 10
+SELLER_CHUNK_SIZE = 200
+# A run hands the rest of its work to a fresh task once this many seconds have passed
+TASK_TIME_BUDGET = 240
+
+
+def low_stock_products():
+    """Active products running low (served by the product_low_stock_idx partial index)"""
+    return Product.objects.filter(
+        quantity__lte=LOW_STOCK_THRESHOLD,
         quantity__gt=0,
         is_active=True
     )
 
-    for product in low_stock_products:
-        # Send email to seller (if email is configured)
-        message = f'Your product "{product.name}" is running low on stock. Current quantity: {product.quantity}'
-        try:
-            send_mail(
-                'Low Stock Alert',
-                message,
-                'noreply@farmproducts.com',
-                [product.seller.email],
-            )
-            print(f"Low stock alert sent: {message}")
-        except Exception as e:
-            print(f"Failed to send email: {e}")
-
-    return f"Checked {low_stock_products.count()} low stock products"
+
+def low_stock_digest(email, username, products):
+    """One email listing every low-stock (name, quantity) pair of a seller"""
+    lines = [f'- {name}: {quantity} left' for name, quantity in products]
+    body = f'Hello {username},\n\nThe following products are running low on stock:\n\n' + '\n'.join(lines)
+    return EmailMessage('Low Stock Alert', body, 'noreply@farmproducts.com', [email])
+
+
+@shared_task(bind=True)
+def check_low_stock(self, after_seller_id=0, chunk_size=SELLER_CHUNK_SIZE, time_budget=TASK_TIME_BUDGET):
+    """
+    Check for low stock products and send every seller a single digest.
+    Sellers are processed chunk_size at a time in id order over one mail
+    connection; when the time budget runs out the task re-queues itself
+    starting after the last seller it handled.
+    """
+    started = time.monotonic()
+    low_stock = low_stock_products().exclude(seller__email='')
+    checked = sent = 0
+
+    connection = get_connection(fail_silently=True)
+    connection.open()
+    try:
+        # A report: reading from a replica a little behind is fine
+        with replica_reads():
+            while True:
+                seller_ids = list(
+                    low_stock.filter(seller_id__gt=after_seller_id)
+                    .order_by('seller_id').values_list('seller_id', flat=True).distinct()[:chunk_size]
+                )
+                if not seller_ids:
+                    break
+
+                rows = low_stock.filter(seller_id__in=seller_ids).order_by('seller_id', 'name', 'id').values_list(
+                    'seller_id', 'seller__email', 'seller__username', 'name', 'quantity'
+                )
+                messages = []
+                for (seller_id, email, username), products in groupby(rows, key=lambda row: row[:3]):
+                    products = [(name, quantity) for *_, name, quantity in products]
+                    messages.append(low_stock_digest(email, username, products))
+                    checked += len(products)
+
+                delivered = connection.send_messages(messages) or 0
+                sent += delivered
+                after_seller_id = seller_ids[-1]
+
+                metrics.increment('task_batches', task='check_low_stock')
+                metrics.increment('low_stock_digests', delivered, result='sent')
+                metrics.increment('low_stock_digests', len(messages) - delivered, result='failed')
+
+                if time.monotonic() - started > time_budget:
+                    self.apply_async(kwargs={
+                        'after_seller_id': after_seller_id,
+                        'chunk_size': chunk_size,
+                        'time_budget': time_budget,
+                    })
+                    metrics.increment('task_continuations', task='check_low_stock')
+                    break
+    finally:
+        connection.close()
+        metrics.increment('task_items', checked, task='check_low_stock')
+        metrics.increment('task_seconds', time.monotonic() - started, task='check_low_stock')
+
+    return f"Checked {checked} low stock products, sent {sent} digests"
 
 @shared_task
-def update_product_stock(product_id, quantity):
+def update_product_stock(product_id, quantity, reason=ADJUSTMENT):
     """Update product stock (background task)"""
     try:
-        product = Product.objects.get(id=product_id)
-        product.quantity += quantity
-        product.save()
-        return f"Stock updated for {product.name}"
-    except Product.DoesNotExist:
-        return "Product not found"
\ No newline at end of file
+        adjust_stock({product_id: quantity}, reason)
+        return f"Stock updated for product #{product_id}"
+    except StockError as e:
+        return str(e)
\ No newline at end of file
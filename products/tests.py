@@ -1,3 +1,571 @@
-from django.test import TestCase
+import json
+import threading
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from config import metrics
+from .cache import get_cache
+from .models import Product, Category, StockMovement
+from .serializers import ProductSerializer
+from .stock import StockError, adjust_stock
+from .tasks import check_low_stock
+
+User = get_user_model()
+
+
+class ProductCatalogTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='seller_test',
+            password='test123',
+            user_type='seller'
+        )
+        self.customer = User.objects.create_user(
+            username='customer_test',
+            password='test123',
+            user_type='customer'
+        )
+        self.category = Category.objects.create(name='Test Category')
+
+    def create_products(self, count):
+        Product.objects.bulk_create([
+            Product(
+                seller=self.seller,
+                category=self.category,
+                name=f'Product {i}',
+                description='Test Description',
+                price=10.00,
+                quantity=100
+            )
+            for i in range(count)
+        ])
+
+    def test_list_is_cursor_paginated(self):
+        self.create_products(5)
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get('/api/products/products/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.data['results'][0]['seller_name'], 'seller_test')
+        self.assertEqual(response.data['results'][0]['category_name'], 'Test Category')
+
+    def test_cursor_walk_returns_every_product_once(self):
+        self.create_products(7)
+        self.client.force_authenticate(user=self.customer)
+        seen = []
+        url = '/api/products/products/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            seen.extend(p['id'] for p in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(Product.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_page_query_count_is_constant(self):
+        self.create_products(3)
+        self.client.force_authenticate(user=self.customer)
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/products/', {'page_size': 3})
+
+        self.create_products(30)
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/products/', {'page_size': 30})
+
+
+class CatalogCacheTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='seller_test',
+            password='test123',
+            user_type='seller'
+        )
+        self.customer = User.objects.create_user(
+            username='customer_test',
+            password='test123',
+            user_type='customer'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Test Category')
+            self.product = Product.objects.create(
+                seller=self.seller,
+                category=self.category,
+                name='Test Product',
+                description='Test Description',
+                price=10.00,
+                quantity=100
+            )
+        self.client.force_authenticate(user=self.customer)
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.client.get('/api/products/products/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/products/')
+        self.assertEqual(response.data['results'][0]['name'], 'Test Product')
+        self.assertEqual(metrics.get('catalog_cache_misses', view='products'), 1)
+        self.assertEqual(metrics.get('catalog_cache_hits', view='products'), 1)
+
+    def test_if_none_match_returns_304(self):
+        response = self.client.get('/api/products/categories/')
+        etag = response['ETag']
+        response = self.client.get('/api/products/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_product_save_invalidates_list_and_detail(self):
+        detail_url = f'/api/products/products/{self.product.id}/'
+        first_etag = self.client.get(detail_url)['ETag']
+        self.client.get('/api/products/products/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.quantity = 5
+            self.product.save()
+
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=first_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 5)
+        response = self.client.get('/api/products/products/')
+        self.assertEqual(response.data['results'][0]['quantity'], 5)
+
+    def test_category_rename_invalidates_products(self):
+        self.client.get('/api/products/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Renamed'
+            self.category.save()
+        response = self.client.get('/api/products/products/')
+        self.assertEqual(response.data['results'][0]['category_name'], 'Renamed')
+
+    def test_seller_responses_are_not_cached(self):
+        self.client.force_authenticate(user=self.seller)
+        self.client.get('/api/products/products/')
+        self.client.get('/api/products/products/')
+        self.assertEqual(metrics.get('catalog_cache_misses', view='products'), 0)
+        self.assertEqual(metrics.get('catalog_cache_hits', view='products'), 0)
+
+
+class AsyncCatalogTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.customer = User.objects.create_user(username='customer_test', password='test123', user_type='customer')
+        # Image URLs are absolute in both
+        self.category = Category.objects.create(name='Test Category', image='categories/fruit.jpg')
+        self.products = [
+            Product.objects.create(
+                seller=self.seller, category=self.category, name=f'Product {i}',
+                description='Test Description', price=10.00, quantity=100, is_active=i != 0
+            )
+            for i in range(3)
+        ]
+
+    def get_both(self, user, path, **params):
+        """(sync, async) JSON bodies for the same request"""
+        self.client.force_authenticate(user=user)
+        sync = self.client.get(f'/api/{path}', params)
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        response = self.client.get(f'/api/async/{path}', params)
+        self.client.credentials()
+        self.assertEqual(response.status_code, sync.status_code)
+        # Pagination links point back at the endpoint that was called
+        return sync.json(), json.loads(response.content.decode().replace('/api/async/', '/api/'))
+
+    def test_payloads_match_sync_endpoints(self):
+        for user in (self.customer, self.seller):
+            for path in ('products/categories/', 'products/products/', f'products/products/{self.products[1].id}/'):
+                sync, response = self.get_both(user, path)
+                self.assertEqual(response, sync)
+
+        sync, response = self.get_both(self.customer, 'products/products/', page_size=1)
+        self.assertEqual(response, sync)
+        self.assertIsNotNone(response['next'])
+
+    def test_customers_do_not_see_inactive_products(self):
+        sync, response = self.get_both(self.customer, f'products/products/{self.products[0].id}/')
+        self.assertEqual(response, {'detail': 'Not found.'})
+
+    def test_requires_authentication(self):
+        response = self.client.get('/api/async/products/products/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        response = self.client.get('/api/async/products/products/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+    def test_customer_list_is_served_from_cache(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.customer)}')
+        etag = self.client.get('/api/async/products/products/')['ETag']
+        # The token's user comes from the authentication cache as well
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/async/products/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class BulkImportExportTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='seller_test',
+            password='test123',
+            user_type='seller'
+        )
+        self.category = Category.objects.create(name='Vegetables')
+        self.client.force_authenticate(user=self.seller)
+
+    def upload(self, name, content):
+        return self.client.post(
+            '/api/products/products/bulk-import/',
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart'
+        )
+
+    def test_csv_import_creates_and_updates_by_sku(self):
+        Product.objects.create(
+            seller=self.seller, sku='TOM-1', name='Old name',
+            description='Old', price=1.00, quantity=1
+        )
+        response = self.upload('products.csv', (
+            'sku,name,description,price,quantity,category,is_active\n'
+            'TOM-1,Tomatoes,Red,5.99,100,vegetables,true\n'
+            f'CAR-1,Carrots,,3.49,80,{self.category.id},\n'
+            'BAD-1,Broken,,-1,5,Vegetables,true\n'
+            'BAD-2,Unknown category,,2.00,5,Spaceships,true\n'
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5])
+        tomatoes = Product.objects.get(sku='TOM-1')
+        self.assertEqual(tomatoes.name, 'Tomatoes')
+        self.assertEqual(tomatoes.category, self.category)
+        self.assertTrue(Product.objects.get(sku='CAR-1').is_active)
+
+    def test_jsonl_import_reports_bad_lines(self):
+        lines = [
+            json.dumps({'sku': 'A', 'name': 'Apples', 'price': '2.00', 'quantity': 3}),
+            'not json',
+            json.dumps({'sku': 'B', 'name': 'Pears', 'price': 4, 'category': self.category.id}),
+        ]
+        response = self.upload('products.jsonl', '\n'.join(lines))
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'SQLite splits bulk inserts by its parameter limit')
+    def test_import_query_count_does_not_grow_with_rows(self):
+        rows = ''.join(f'SKU-{i},Product {i},,1.00,1,Vegetables,true\n' for i in range(200))
+        with self.assertNumQueries(6):
+            self.upload('products.csv', 'sku,name,description,price,quantity,category,is_active\n' + rows)
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 200)
+
+    def test_export_round_trips_through_import(self):
+        Product.objects.create(
+            seller=self.seller, sku='TOM-1', name='Tomatoes', category=self.category,
+            description='Red, ripe', price=5.99, quantity=100
+        )
+        response = self.client.get('/api/products/products/export/')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('TOM-1,Tomatoes,"Red, ripe",5.99,100,Vegetables,True', content)
+
+        response = self.upload('products.csv', content)
+        self.assertEqual(response.data, {'created': 0, 'updated': 1, 'errors': []})
+
+    def test_customers_cannot_import(self):
+        customer = User.objects.create_user(username='customer_test', password='test123')
+        self.client.force_authenticate(user=customer)
+        response = self.upload('products.csv', 'sku,name,price\nA,Apples,1.00\n')
+        self.assertEqual(response.status_code, 403)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+class ProductSearchTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='seller_test',
+            password='test123',
+            user_type='seller'
+        )
+        self.customer = User.objects.create_user(
+            username='customer_test',
+            password='test123',
+            user_type='customer'
+        )
+        self.vegetables = Category.objects.create(name='Vegetables')
+        self.fruits = Category.objects.create(name='Fruits')
+        self.client.force_authenticate(user=self.customer)
+
+    def create_product(self, name, description='', category=None, **kwargs):
+        return Product.objects.create(
+            seller=self.seller, category=category or self.vegetables, name=name,
+            description=description, price=1.00, quantity=10, **kwargs
+        )
+
+    def search(self, text):
+        response = self.client.get('/api/products/products/search/', {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.data['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.create_product('Salad mix', 'Goes well with fresh tomatoes')
+        self.create_product('Cherry tomatoes', 'Sweet and small')
+        self.assertEqual(self.search('tomato'), ['Cherry tomatoes', 'Salad mix'])
+
+    def test_prefix_matching_for_type_ahead(self):
+        self.create_product('Strawberries')
+        self.assertEqual(self.search('straw'), ['Strawberries'])
+        self.assertEqual(self.search('fresh straw'), [])
+
+    def test_category_name_is_searchable_and_kept_current(self):
+        self.create_product('Gala', category=self.fruits)
+        self.assertEqual(self.search('fruit'), ['Gala'])
+
+        self.fruits.name = 'Orchard'
+        self.fruits.save()
+        self.assertEqual(self.search('fruit'), [])
+        self.assertEqual(self.search('orchard'), ['Gala'])
+
+    def test_customers_do_not_find_inactive_products(self):
+        self.create_product('Hidden carrots', is_active=False)
+        self.assertEqual(self.search('carrots'), [])
+
+    def test_search_requires_text(self):
+        response = self.client.get('/api/products/products/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+class LowStockDigestTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.category = Category.objects.create(name='Test Category')
+        self.sellers = [
+            User.objects.create(username=f'seller_{i}', email=f'seller_{i}@example.com', user_type='seller')
+            for i in range(5)
+        ]
+        for seller in self.sellers:
+            Product.objects.bulk_create([
+                Product(seller=seller, category=self.category, name=f'Low {i}', price=5, quantity=i + 1)
+                for i in range(3)
+            ] + [
+                Product(seller=seller, category=self.category, name='Plenty', price=5, quantity=50),
+            ])
+
+    def test_one_digest_per_seller(self):
+        with self.assertNumQueries(3):
+            result = check_low_stock()
+        self.assertEqual(result, 'Checked 15 low stock products, sent 5 digests')
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].to, ['seller_0@example.com'])
+        self.assertIn('Low 2: 3 left', mail.outbox[0].body)
+        self.assertNotIn('Plenty', mail.outbox[0].body)
+        self.assertEqual(metrics.get('task_items', task='check_low_stock'), 15)
+        self.assertEqual(metrics.get('low_stock_digests', result='sent'), 5)
+
+    def test_chunks_of_sellers(self):
+        with self.assertNumQueries(7):
+            check_low_stock(chunk_size=2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(metrics.get('task_batches', task='check_low_stock'), 3)
+
+    def test_requeues_itself_when_out_of_time(self):
+        with mock.patch.object(check_low_stock, 'apply_async') as apply_async:
+            check_low_stock(chunk_size=2, time_budget=0)
+        self.assertEqual(len(mail.outbox), 2)
+        apply_async.assert_called_once_with(kwargs={
+            'after_seller_id': self.sellers[1].id,
+            'chunk_size': 2,
+            'time_budget': 0,
+        })
+
+
+class StockServiceTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller_test', password='test123', user_type='seller')
+        self.category = Category.objects.create(name='Test Category')
+        self.products = Product.objects.bulk_create([
+            Product(seller=self.seller, category=self.category, name=f'Product {i}', price=5, quantity=10)
+            for i in range(3)
+        ])
+
+    def test_batched_adjustment_writes_ledger(self):
+        deltas = {self.products[0].id: 5, self.products[1].id: -4, self.products[2].id: -10}
+        # SELECT ... FOR UPDATE, UPDATE and ledger INSERT, plus the savepoint pair
+        with self.assertNumQueries(5):
+            balances = adjust_stock(deltas, 'adjustment', user=self.seller, reference='recount')
+        self.assertEqual(balances, {self.products[0].id: 15, self.products[1].id: 6, self.products[2].id: 0})
+        self.assertEqual(
+            dict(Product.objects.values_list('id', 'quantity')),
+            balances
+        )
+        movements = StockMovement.objects.order_by('product_id')
+        self.assertEqual([m.delta for m in movements], [5, -4, -10])
+        self.assertEqual([m.balance for m in movements], [15, 6, 0])
+        self.assertTrue(all(m.reference == 'recount' and m.user == self.seller for m in movements))
+
+    def test_insufficient_stock_changes_nothing(self):
+        with self.assertRaises(StockError):
+            adjust_stock({self.products[0].id: -1, self.products[1].id: -11}, 'sale')
+        self.assertEqual(set(Product.objects.values_list('quantity', flat=True)), {10})
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_ledger_is_append_only(self):
+        adjust_stock({self.products[0].id: 1}, 'restock')
+        movement = StockMovement.objects.get()
+        movement.delta = 100
+        with self.assertRaises(ValueError):
+            movement.save()
+
+    def test_add_stock_endpoint_records_restock(self):
+        self.client.force_authenticate(user=self.seller)
+        product = self.products[0]
+        response = self.client.post(f'/api/products/products/{product.id}/add_stock/', {'quantity': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 17)
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.reason, movement.delta, movement.balance), ('restock', 7, 17))
+
+    def test_product_update_adjusts_stock_without_losing_sales(self):
+        product = Product.objects.get(pk=self.products[0].pk)
+        adjust_stock({product.id: -2}, 'sale')  # a checkout after the row was read
+
+        serializer = ProductSerializer(product, data={'name': 'Renamed'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, 8)
+
+        serializer = ProductSerializer(product, data={'quantity': 12}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual(serializer.save().quantity, 10)
+        movement = StockMovement.objects.latest('id')
+        self.assertEqual((movement.reason, movement.delta, movement.balance), ('adjustment', 2, 10))
+
+    def test_bulk_import_adjusts_stock(self):
+        Product.objects.filter(pk=self.products[0].pk).update(sku='P-0')
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post('/api/products/products/bulk-import/', {
+            'file': SimpleUploadedFile('products.csv', b'sku,name,price,quantity\nP-0,Product 0,5.00,4\n'),
+        }, format='multipart')
+        self.assertEqual(response.data['updated'], 1)
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.reason, movement.delta, movement.balance), ('adjustment', -6, 4))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Needs row-level locking')
+class ConcurrentStockTestCase(TransactionTestCase):
+    workers = 40
+
+    def run_parallel(self, jobs):
+        barrier = threading.Barrier(len(jobs))
+        results = []
+
+        def run(deltas, reason):
+            try:
+                barrier.wait()
+                adjust_stock(deltas, reason)
+                results.append('ok')
+            except StockError:
+                results.append('rejected')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=job) for job in jobs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_parallel_increments_and_decrements(self):
+        seller = User.objects.create(username='seller_test', user_type='seller')
+        first, second = [Product.objects.create(seller=seller, name=f'P{i}', price=5, quantity=100) for i in range(2)]
+        # Half restock +5, half sell -3, touching both products in opposite key orders
+        jobs = [
+            ({first.id: 5, second.id: 5}, 'restock') if i % 2 else ({second.id: -3, first.id: -3}, 'sale')
+            for i in range(self.workers)
+        ]
+        results = self.run_parallel(jobs)
+
+        self.assertEqual(results.count('ok'), self.workers)
+        expected = 100 + (self.workers // 2) * (5 - 3)
+        for product in (first, second):
+            product.refresh_from_db()
+            self.assertEqual(product.quantity, expected)
+            balances = list(
+                StockMovement.objects.filter(product=product).order_by('id').values_list('balance', flat=True)
+            )
+            self.assertEqual(len(balances), self.workers)
+            self.assertEqual(balances[-1], expected)
+
+    def test_parallel_decrements_never_go_negative(self):
+        seller = User.objects.create(username='seller_test', user_type='seller')
+        product = Product.objects.create(seller=seller, name='Scarce', price=5, quantity=10)
+        results = self.run_parallel([({product.id: -1}, 'sale')] * self.workers)
+
+        product.refresh_from_db()
+        self.assertEqual(results.count('ok'), 10)
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(StockMovement.objects.filter(product=product).count(), 10)
+
+
+class SeedDataTestCase(TestCase):
+    def seed(self, **options):
+        stdout = StringIO()
+        call_command('seed_data', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_demo_data_is_idempotent(self):
+        self.assertIn('Created 13 demo products', self.seed())
+        self.assertIn('Created 0 demo products', self.seed())
+        self.assertEqual(Product.objects.count(), 13)
+        self.assertEqual(Category.objects.count(), 5)
+        self.assertTrue(User.objects.get(username='seller1').check_password('password123'))
+
+    def test_generates_scaled_history(self):
+        from dashboard.models import SellerDailySales
+        from orders.models import Order, OrderItem
+
+        self.seed(sellers=3, customers=10, products=60, orders=200, days=30, seed=7, batch_size=50)
+        self.assertEqual(User.objects.filter(username__startswith='seed_seller_').count(), 3)
+        self.assertEqual(User.objects.filter(username__startswith='seed_customer_').count(), 10)
+        self.assertEqual(Product.objects.filter(sku__startswith='SEED-').count(), 60)
+        self.assertEqual(Order.objects.count(), 200)
+        self.assertTrue(User.objects.get(username='seed_customer_0').check_password('password123'))
+
+        # Old orders are settled, totals match their lines, rollups are rebuilt
+        self.assertFalse(Order.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=10), status__in=['pending', 'processing']
+        ).exists())
+        order = Order.objects.prefetch_related('items').first()
+        self.assertEqual(order.total_amount, sum(item.price * item.quantity for item in order.items.all()))
+        self.assertEqual(
+            SellerDailySales.objects.aggregate(total=Sum('items_sold'))['total'],
+            OrderItem.objects.aggregate(total=Sum('quantity'))['total'],
+        )
+
+        # Re-running tops users and products up instead of duplicating them
+        self.seed(sellers=3, customers=10, products=60, seed=7)
+        self.assertEqual(Product.objects.filter(sku__startswith='SEED-').count(), 60)
\ No newline at end of file
@@ -2,18 +2,62 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.parsers import MultiPartParser
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from .models import Product, Category
 from .serializers import ProductSerializer, CategorySerializer
+from .pagination import ProductCursorPagination, SearchResultsPagination
+from .search import search_products
+from .stock import RESTOCK, adjust_stock
+from .cache import CachedResponseMixin, CATEGORIES, PRODUCTS
+from . import bulk
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Columns ProductSerializer actually reads; keeps the seller join from pulling
+# password hashes, addresses and avatars for every row
+PRODUCT_LIST_FIELDS = (
+    'id', 'sku', 'name', 'description', 'price', 'quantity', 'image', 'is_active',
+    'created_at', 'updated_at',
+    'seller__id', 'seller__username', 'seller__first_name', 'seller__last_name',
+    'category__id', 'category__name',
+)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+
+def product_queryset():
+    """Products with seller and category joined in the same query"""
+    return Product.objects.select_related('seller', 'category').only(*PRODUCT_LIST_FIELDS)
+
+
+def visible_products(user):
+    """
+    Filter products based on user type:
+    - Sellers: See only their own products
+    - Customers: See only active products from all sellers
+    - Admins: See all products
+    """
+    queryset = product_queryset()
+
+    if user.is_seller:
+        return queryset.filter(seller=user)
+    elif user.is_staff:
+        return queryset
+    else:
+        return queryset.filter(is_active=True)
+
+
+def shares_catalog(user):
+    """Customers all see the same active catalog"""
+    return not (user.is_seller or user.is_staff)
+
+
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    cache_name = 'categories'
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -21,25 +65,23 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return [IsAuthenticated()]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductCursorPagination
+    cache_name = 'products'
 
     def get_queryset(self):
-        """
-        Filter products based on user type:
-        - Sellers: See only their own products
-        - Customers: See only active products from all sellers
-        - Admins: See all products
-        """
-        user = self.request.user
+        return visible_products(self.request.user)
+
+    def is_response_cacheable(self, request):
+        """Customers all see the same active catalog, so only their responses are cached"""
+        return shares_catalog(request.user)
 
-        if user.is_seller:
-            return Product.objects.filter(seller=user)
-        elif user.is_staff:
-            return Product.objects.all()
-        else:
-            return Product.objects.filter(is_active=True)
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            return [CATEGORIES, f"product:{self.kwargs['pk']}"]
+        return [CATEGORIES, PRODUCTS]
 
     def get_permissions(self):
         """
@@ -125,7 +167,7 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        products = Product.objects.filter(seller=request.user)
+        products = product_queryset().filter(seller=request.user)
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
@@ -151,8 +193,85 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        product.quantity += quantity
-        product.save()
+        balances = adjust_stock({product.id: quantity}, RESTOCK, user=request.user)
+        product.quantity = balances[product.id]
 
         serializer = self.get_serializer(product)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text product search (?q=...), ranked by relevance.
+        Every word is prefix-matched, so partial input works for type-ahead.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response(
+                {"error": "Search text (q) is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = SearchResultsPagination()
+        page = paginator.paginate_queryset(search_products(self.get_queryset(), text), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Create or update many products from a CSV or JSONL upload ("file" field).
+        Rows are matched to the seller's existing products by SKU; invalid rows
+        are reported individually and do not stop the import.
+        """
+        if not hasattr(request.user, 'is_seller') or not request.user.is_seller:
+            return Response(
+                {"error": "Only sellers can import products"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {"error": "Upload a CSV or JSONL file in the 'file' field"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format == 'ndjson':
+            file_format = 'jsonl'
+        if file_format not in bulk.FORMATS:
+            return Response(
+                {"error": f"Unsupported file format. Must be one of: {', '.join(bulk.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = bulk.import_products(request.user, upload, file_format)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the seller's catalog as CSV (default) or JSONL (?file_format=jsonl)
+        in the same layout bulk-import accepts.
+        """
+        if not hasattr(request.user, 'is_seller') or not request.user.is_seller:
+            return Response(
+                {"error": "Only sellers can export products"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in bulk.FORMATS:
+            return Response(
+                {"error": f"Unsupported file format. Must be one of: {', '.join(bulk.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            bulk.export_rows(Product.objects.filter(seller=request.user), file_format),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+        return response